@@ -0,0 +1,72 @@
+from sqlalchemy import select, insert, update, delete, literal, bindparam
+
+from base_datos import documentos, registros, personal
+from cache_tablas import registrar_cambio
+from identidad import clave_nombre
+from referencias import indexar_registros_personal, desindexar_registro
+
+# Sentencias parametrizadas de las operaciones puntuales de la interfaz. Se
+# construyen una sola vez; SQLAlchemy reutiliza su SQL compilado en cada llamada
+# y los valores viajan siempre como parámetros, nunca dentro del texto SQL
+
+_EXISTE_DOCUMENTO = select(literal(1)).where(documentos.c.codigo == bindparam("codigo")).limit(1)
+_EXISTE_REGISTRO = select(literal(1)).where(registros.c.codigo == bindparam("codigo")).limit(1)
+_EXISTE_PERSONAL = select(literal(1)).where(personal.c.clave_nombre == bindparam("clave")).limit(1)
+_ESTADO_DOCUMENTO = select(documentos.c.estado).where(documentos.c.codigo == bindparam("codigo"))
+
+_INSERTAR_REGISTRO = insert(registros)
+_INSERTAR_PERSONAL = insert(personal)
+_ELIMINAR_REGISTRO = delete(registros).where(registros.c.codigo == bindparam("b_codigo"))
+_ELIMINAR_PERSONAL = delete(personal).where(personal.c.nombre_completo == bindparam("b_nombre"))
+_ACTIVAR_PERSONAL = update(personal).where(personal.c.id == bindparam("b_id"))
+
+# Verificaciones de existencia: una fila como máximo, sin construir DataFrames
+def existe_documento(conn, codigo):
+    return conn.execute(_EXISTE_DOCUMENTO, {"codigo": codigo}).scalar() is not None
+
+def existe_registro(conn, codigo):
+    return conn.execute(_EXISTE_REGISTRO, {"codigo": codigo}).scalar() is not None
+
+# La persona se busca por su clave normalizada (sin acentos, títulos ni mayúsculas)
+def existe_personal(conn, nombre):
+    return conn.execute(_EXISTE_PERSONAL, {"clave": clave_nombre(nombre)}).scalar() is not None
+
+# Estado actual de un documento (None si no existe)
+def estado_documento(conn, codigo):
+    return conn.execute(_ESTADO_DOCUMENTO, {"codigo": codigo}).scalar()
+
+# Altas, bajas y cambios. Cada escritura registra el cambio de su tabla para
+# invalidar las cachés de lectura dentro de la misma transacción
+
+# Función para dar de alta un registro; devuelve False si el código ya existe
+def insertar_registro(conn, fila):
+    if existe_registro(conn, fila["codigo"]):
+        return False
+    conn.execute(_INSERTAR_REGISTRO, fila)
+    indexar_registros_personal(conn, [fila])
+    registrar_cambio(conn, "registros")
+    return True
+
+# Función para dar de alta a una persona; devuelve False si ya existe alguien
+# con la misma clave de nombre
+def insertar_personal(conn, fila):
+    if existe_personal(conn, fila["nombre_completo"]):
+        return False
+    conn.execute(_INSERTAR_PERSONAL, {**fila, "clave_nombre": clave_nombre(fila["nombre_completo"])})
+    registrar_cambio(conn, "personal")
+    return True
+
+def eliminar_registro(conn, codigo):
+    resultado = conn.execute(_ELIMINAR_REGISTRO, {"b_codigo": codigo})
+    desindexar_registro(conn, codigo)
+    registrar_cambio(conn, "registros")
+    return resultado.rowcount
+
+def eliminar_personal(conn, nombre):
+    resultado = conn.execute(_ELIMINAR_PERSONAL, {"b_nombre": nombre})
+    registrar_cambio(conn, "personal")
+    return resultado.rowcount
+
+def cambiar_activo_personal(conn, id_personal, activo):
+    conn.execute(_ACTIVAR_PERSONAL, {"b_id": id_personal, "activo": 1 if activo else 0})
+    registrar_cambio(conn, "personal")
@@ -0,0 +1,94 @@
+# Benchmark de latencia de la búsqueda de texto completo (FTS5) frente a LIKE.
+#   python -m benchmarks.bench_busqueda [--documentos 50000]
+import os
+import random
+import argparse
+import itertools
+import tempfile
+import time
+from sqlalchemy import insert, select, or_
+
+from base_datos import setup_database, documentos, documento_pasos, documento_riesgos
+from busqueda import indexar_documentos, buscar_documentos
+
+# Vocabulario con distribución de Zipf: unas pocas palabras muy frecuentes y
+# una cola larga. Las palabras reales se colocan en distintos rangos para medir
+# consultas frecuentes, intermedias y raras
+TAMANO_VOCABULARIO = 20_000
+PALABRAS_REALES = {5: "calidad", 40: "paciente", 200: "proveedores", 900: "evaluación",
+                   3000: "esterilización", 8000: "auditoría", 15000: "indicador"}
+VOCABULARIO = [PALABRAS_REALES.get(rango, f"termino{rango}") for rango in range(TAMANO_VOCABULARIO)]
+PESOS_ACUMULADOS = list(itertools.accumulate(1 / (rango + 1) for rango in range(TAMANO_VOCABULARIO)))
+
+CONSULTAS = ["calidad", "paciente", "evaluación proveedores", "esterilización", "audit", "indicador calidad"]
+
+def _frase(rnd, n):
+    return " ".join(rnd.choices(VOCABULARIO, cum_weights=PESOS_ACUMULADOS, k=n))
+
+# Función para poblar la base con procedimientos sintéticos
+def poblar(engine, n_documentos, lote=2000):
+    rnd = random.Random(42)
+    with engine.begin() as conn:
+        for base in range(0, n_documentos, lote):
+            rango = range(base, min(base + lote, n_documentos))
+            conn.execute(insert(documentos), [{
+                "codigo": f"PR-{i:06d}",
+                "nombre_documento": _frase(rnd, 4),
+                "objetivo": _frase(rnd, 30),
+                "alcance": _frase(rnd, 20),
+                "estado": "Aprobado",
+            } for i in rango])
+            conn.execute(insert(documento_pasos), [{
+                "documento_codigo": f"PR-{i:06d}", "orden": orden,
+                "numero": str(orden + 1), "responsable": _frase(rnd, 2), "descripcion": _frase(rnd, 40),
+            } for i in rango for orden in range(6)])
+            conn.execute(insert(documento_riesgos), [{
+                "documento_codigo": f"PR-{i:06d}", "orden": orden, "tipo": "riesgo", "texto": _frase(rnd, 12),
+            } for i in rango for orden in range(3)])
+        indexar_documentos(conn)
+
+# Búsqueda equivalente sin índice: subcadena en documentos y tablas hijas
+def buscar_like(conn, consulta):
+    pasos = select(documento_pasos.c.documento_codigo).where(documento_pasos.c.descripcion.contains(consulta))
+    riesgos = select(documento_riesgos.c.documento_codigo).where(documento_riesgos.c.texto.contains(consulta))
+    return conn.execute(select(documentos.c.codigo).where(or_(
+        documentos.c.nombre_documento.contains(consulta),
+        documentos.c.objetivo.contains(consulta),
+        documentos.c.alcance.contains(consulta),
+        documentos.c.codigo.in_(pasos),
+        documentos.c.codigo.in_(riesgos),
+    )).limit(20)).all()
+
+def medir(conn, buscar, repeticiones):
+    resultados = {}
+    for consulta in CONSULTAS:
+        t0 = time.perf_counter()
+        for _ in range(repeticiones):
+            buscar(conn, consulta)
+        resultados[consulta] = (time.perf_counter() - t0) * 1000 / repeticiones
+    return resultados
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de búsqueda de texto completo")
+    parser.add_argument("--documentos", type=int, default=50_000)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, *_ = setup_database(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        t0 = time.perf_counter()
+        poblar(engine, args.documentos)
+        print(f"Corpus: {args.documentos} documentos con 6 pasos y 3 riesgos "
+              f"(generación e indexado {time.perf_counter() - t0:.1f} s)")
+        with engine.connect() as conn:
+            fts = medir(conn, buscar_documentos, args.repeticiones)
+            like = medir(conn, buscar_like, max(1, args.repeticiones // 10))
+        engine.dispose()
+
+    print(f"{'consulta':<28}{'FTS5 (ms)':>12}{'LIKE (ms)':>12}")
+    for consulta in CONSULTAS:
+        print(f"{consulta:<28}{fts[consulta]:>12.2f}{like[consulta]:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
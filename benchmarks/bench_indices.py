@@ -0,0 +1,105 @@
+# Benchmark de las consultas frecuentes con y sin los índices de la migración 1.
+#   python -m benchmarks.bench_indices [--documentos 100000]
+import os
+import random
+import argparse
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import insert, select, func, text
+
+from base_datos import setup_database, documentos, registros, cambios_estado
+from migraciones import _m001_indices
+
+ESTADOS_DOC = ["Borrador", "En Revisión", "Aprobado", "Obsoleto"]
+
+# Función para poblar la base con datos sintéticos
+def poblar(engine, n_documentos, lote=5000):
+    rnd = random.Random(42)
+    inicio = datetime(2020, 1, 1)
+    with engine.begin() as conn:
+        for base in range(0, n_documentos, lote):
+            rango = range(base, min(base + lote, n_documentos))
+            conn.execute(insert(documentos), [{
+                "codigo": f"PR-{i:06d}",
+                "nombre_documento": f"Procedimiento {i}",
+                "responsable_actualizacion": f"Responsable {i % 2000}",
+                # La mayoría aprobados, pocos obsoletos: el caso típico del catálogo
+                "estado": rnd.choices(ESTADOS_DOC, weights=[10, 5, 80, 5])[0],
+            } for i in rango])
+            conn.execute(insert(registros), [{
+                "codigo": f"F-{i:06d}",
+                "nombre_registro": f"Formato {i}",
+                "documento_origen": f"PR-{rnd.randrange(n_documentos):06d}",
+                "estado": "Inactivo" if rnd.random() < 0.02 else "Activo",
+            } for i in rango])
+            conn.execute(insert(cambios_estado), [{
+                "documento_codigo": f"PR-{rnd.randrange(n_documentos):06d}",
+                "estado_anterior": "Borrador",
+                "nuevo_estado": "En Revisión",
+                "fecha_cambio": inicio + timedelta(minutes=rnd.randrange(2_000_000)),
+            } for i in rango for _ in range(3)])
+
+# Consultas medidas: (nombre, función que construye la sentencia con un valor aleatorio)
+def consultas(n_documentos):
+    return [
+        ("histórico por documento", lambda r: select(cambios_estado)
+            .where(cambios_estado.c.documento_codigo == f"PR-{r.randrange(n_documentos):06d}")
+            .order_by(cambios_estado.c.fecha_cambio.desc())),
+        ("registros por documento origen", lambda r: select(registros)
+            .where(registros.c.documento_origen == f"PR-{r.randrange(n_documentos):06d}")),
+        ("registros inactivos", lambda r: select(func.count())
+            .select_from(registros).where(registros.c.estado == "Inactivo")),
+        ("documentos obsoletos", lambda r: select(func.count())
+            .select_from(documentos).where(documentos.c.estado == "Obsoleto")),
+        ("verificación de personal", lambda r: select(func.count())
+            .select_from(documentos)
+            .where(documentos.c.responsable_actualizacion == f"Responsable {r.randrange(2000)}")),
+    ]
+
+# Función para medir el tiempo medio por consulta en milisegundos
+def medir(engine, n_documentos, repeticiones):
+    resultados = {}
+    with engine.connect() as conn:
+        for nombre, construir in consultas(n_documentos):
+            rnd = random.Random(7)
+            t0 = time.perf_counter()
+            for _ in range(repeticiones):
+                conn.execute(construir(rnd)).fetchall()
+            resultados[nombre] = (time.perf_counter() - t0) * 1000 / repeticiones
+    return resultados
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de índices del esquema")
+    parser.add_argument("--documentos", type=int, default=100_000)
+    parser.add_argument("--repeticiones", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, *_ = setup_database(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        # Partir de un esquema sin índices, como las bases anteriores a la migración
+        with engine.begin() as conn:
+            for tabla in (documentos, registros, cambios_estado):
+                for indice in tabla.indexes:
+                    conn.execute(text(f"DROP INDEX IF EXISTS {indice.name}"))
+
+        t0 = time.perf_counter()
+        poblar(engine, args.documentos)
+        print(f"Datos generados: {args.documentos} documentos, {args.documentos} registros, "
+              f"{3 * args.documentos} cambios de estado ({time.perf_counter() - t0:.1f} s)")
+
+        sin_indices = medir(engine, args.documentos, args.repeticiones)
+        with engine.begin() as conn:
+            _m001_indices(conn)
+            conn.execute(text("ANALYZE"))
+        con_indices = medir(engine, args.documentos, args.repeticiones)
+        engine.dispose()
+
+    print(f"{'consulta':<32}{'sin índices (ms)':>18}{'con índices (ms)':>18}{'mejora':>10}")
+    for nombre, antes in sin_indices.items():
+        despues = con_indices[nombre]
+        print(f"{nombre:<32}{antes:>18.3f}{despues:>18.3f}{antes / despues:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+# Suite de benchmarks (pytest-benchmark) de las rutas principales sobre un
+# corpus sintético: validación de esquema, ingesta, las consultas paginadas de
+# las pestañas, roles y formatos por documento, cambios de estado e histórico.
+# No requiere Streamlit ni navegador.
+#   python -m pytest benchmarks/bench_suite.py [--benchmark-autosave]
+#       [--benchmark-compare --benchmark-compare-fail=mean:50%]
+# Cada escala (1000, 10000 y 100000 documentos) es un parámetro; por defecto
+# se omite la de 100000, que se activa con CONTROLDOC_BENCH_ESCALAS=1000,10000,100000
+import os
+import sys
+import json
+import random
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+# Los módulos de la aplicación están en la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, insert
+
+from base_datos import setup_database, documentos, registros, personal, cambios_estado
+from consultas import COLUMNAS_LISTADO, COLUMNAS_PERSONAL, COLUMNAS_REGISTROS, consultar_pagina, contar_filas
+from ingesta import cargar_lote
+from secciones import roles_de_documento, formatos_de_documento
+from flujo import aplicar_transicion
+from indicadores import transiciones_por_mes
+from revisiones import revisiones_proximas, resumen_revisiones
+from busqueda import buscar_documentos
+from esquema import validar_procedimiento
+from benchmarks.corpus import generar_corpus
+
+ESCALAS_ACTIVAS = {int(e) for e in os.environ.get("CONTROLDOC_BENCH_ESCALAS", "1000,10000").split(",")}
+ESCALAS = [
+    pytest.param(escala, marks=pytest.mark.skipif(
+        escala not in ESCALAS_ACTIVAS, reason="escala no incluida en CONTROLDOC_BENCH_ESCALAS"))
+    for escala in (1000, 10000, 100000)
+]
+TAMANO_PAGINA = 25
+
+# Registros de formato: uno por documento, como los que se dan de alta en la pestaña 3
+def poblar_registros(engine, codigos, lote=5000):
+    rnd = random.Random(3)
+    with engine.begin() as conn:
+        for inicio in range(0, len(codigos), lote):
+            conn.execute(insert(registros), [{
+                "codigo": f"F-{inicio + n:06d}", "nombre_registro": f"Formato {inicio + n}", "version": "1.0",
+                "documento_origen": codigo, "medio_almacenamiento": rnd.choice(["Físico", "Digital"]),
+                "tiempo_retencion": "2 años", "disposicion_final": "Archivado",
+                "estado": "Inactivo" if rnd.random() < 0.05 else "Activo",
+            } for n, codigo in enumerate(codigos[inicio:inicio + lote])])
+
+# Corpus sintético de cada escala, generado una sola vez
+@pytest.fixture(scope="module", params=ESCALAS)
+def corpus(request):
+    return request.param, list(generar_corpus(request.param))
+
+# Base con el corpus ya cargado y un registro por documento. Las pruebas de una
+# misma escala la comparten en el orden del archivo: los cambios de estado van
+# después de las consultas y el histórico al final
+@pytest.fixture(scope="module")
+def base(corpus, tmp_path_factory):
+    escala, archivos = corpus
+    engine, *_ = setup_database(f"sqlite:///{tmp_path_factory.mktemp('bench') / 'bench.db'}")
+    cargar_lote(engine, archivos)
+    with engine.connect() as conn:
+        codigos = conn.execute(select(documentos.c.codigo).order_by(documentos.c.codigo)).scalars().all()
+    poblar_registros(engine, codigos)
+    yield engine, codigos
+    engine.dispose()
+
+@pytest.fixture
+def grupo(benchmark, corpus):
+    benchmark.group = f"{corpus[0]} documentos"
+    return benchmark
+
+def test_validacion_esquema(grupo, corpus):
+    procedimientos = [json.loads(contenido) for _, contenido in corpus[1]]
+    grupo.pedantic(lambda: [validar_procedimiento(p) for p in procedimientos], rounds=3)
+
+# Ingesta inicial: cada ronda parte de una base vacía
+def test_ingesta(grupo, corpus, tmp_path):
+    rondas = iter(range(3))
+
+    def base_vacia():
+        engine, *_ = setup_database(f"sqlite:///{tmp_path / f'ingesta_{next(rondas)}.db'}")
+        return (engine, corpus[1]), {}
+
+    grupo.pedantic(cargar_lote, setup=base_vacia, rounds=3)
+
+# Recarga del mismo corpus: todos los archivos resultan "sin cambios"
+def test_reingesta_sin_cambios(grupo, corpus, base):
+    grupo.pedantic(cargar_lote, args=(base[0], corpus[1]), rounds=3)
+
+# Las consultas paginadas son las que ejecuta tabla_paginada en control.py:
+# el total filtrado y la página visible, ordenada por la primera columna
+def _tabla_paginada(conn, tabla, columnas, filtros, rnd):
+    total = contar_filas(conn, tabla, filtros)
+    paginas = max(1, -(-total // TAMANO_PAGINA))
+    return consultar_pagina(conn, tabla, columnas, filtros, orden=columnas[0],
+                            pagina=rnd.randint(1, min(paginas, 40)), tamano=TAMANO_PAGINA)
+
+def test_tabla_paginada_documentos(grupo, base):
+    rnd = random.Random(7)
+    with base[0].connect() as conn:
+        grupo(lambda: _tabla_paginada(conn, documentos, COLUMNAS_LISTADO, {}, rnd))
+
+def test_tabla_paginada_registros_filtrada(grupo, base):
+    rnd = random.Random(7)
+    with base[0].connect() as conn:
+        grupo(lambda: _tabla_paginada(conn, registros, COLUMNAS_REGISTROS, {"estado": "Activo"}, rnd))
+
+def test_tabla_paginada_personal(grupo, base):
+    rnd = random.Random(7)
+    with base[0].connect() as conn:
+        grupo(lambda: _tabla_paginada(conn, personal, COLUMNAS_PERSONAL, {}, rnd))
+
+# Roles y formatos de cada documento, leídos de las tablas de pasos y formatos
+def test_roles_de_documento(grupo, base):
+    engine, codigos = base
+    with engine.connect() as conn:
+        grupo(lambda: [roles_de_documento(conn, codigo) for codigo in codigos])
+
+def test_formatos_de_documento(grupo, base):
+    engine, codigos = base
+    with engine.connect() as conn:
+        grupo(lambda: [formatos_de_documento(conn, codigo) for codigo in codigos])
+
+def test_busqueda_texto_completo(grupo, base):
+    rnd = random.Random(7)
+    with base[0].connect() as conn:
+        grupo(lambda: buscar_documentos(conn, rnd.choice(["requisición", "temperatura", "paciente"])))
+
+def test_revisiones_proximas(grupo, base):
+    with base[0].connect() as conn:
+        grupo(lambda: (revisiones_proximas(conn, 30), resumen_revisiones(conn)))
+
+# Cambios de estado. Solo se eligen documentos en Borrador, desde donde ambas
+# transiciones están permitidas, y cada uno una sola vez: así nunca se mide un
+# rechazo. Generador propio para que la selección no dependa de otras pruebas
+def _transicion(engine, nuevo_estado, cantidad, rnd):
+    def elegir():
+        with engine.connect() as conn:
+            borradores = conn.execute(
+                select(documentos.c.codigo).where(documentos.c.estado == "Borrador").order_by(documentos.c.codigo)
+            ).scalars().all()
+        return (rnd.sample(borradores, min(cantidad, len(borradores))),), {}
+
+    def aplicar(codigos):
+        with engine.begin() as conn:
+            resultado = aplicar_transicion(conn, codigos, nuevo_estado, "benchmark")
+        if resultado["rechazados"]:
+            raise RuntimeError(f"transición rechazada en el benchmark: {resultado['rechazados'][0]}")
+
+    return aplicar, elegir
+
+def test_cambio_estado_individual(grupo, base):
+    aplicar, elegir = _transicion(base[0], "En Revisión", 1, random.Random(11))
+    grupo.pedantic(aplicar, setup=elegir, rounds=20)
+
+def test_cambio_estado_masivo(grupo, base):
+    aplicar, elegir = _transicion(base[0], "Obsoleto", 200, random.Random(13))
+    grupo.pedantic(aplicar, setup=elegir, rounds=3)
+
+def test_historico_por_documento(grupo, base):
+    engine, codigos = base
+    rnd = random.Random(7)
+    with engine.connect() as conn:
+        grupo(lambda: conn.execute(
+            select(cambios_estado)
+            .where(cambios_estado.c.documento_codigo == rnd.choice(codigos))
+            .order_by(cambios_estado.c.fecha_cambio.desc())
+        ).all())
+
+def test_transiciones_por_mes(grupo, base):
+    with base[0].connect() as conn:
+        grupo(lambda: transiciones_por_mes(conn))
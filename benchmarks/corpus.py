@@ -0,0 +1,123 @@
+# Generador de procedimientos JSON sintéticos con el mismo esquema que lee la
+# pestaña "Subir JSON" (y la carga masiva).
+#   python -m benchmarks.corpus --documentos 1000 --salida corpus/ [--zip]
+import os
+import json
+import random
+import zipfile
+import argparse
+from datetime import date, timedelta
+
+AREAS = ["AL", "BS", "CA", "CH", "EN", "FA", "LB", "MI", "QX", "UR"]
+MESES = ["ENE", "FEB", "MAR", "ABR", "MAY", "JUN", "JUL", "AGO", "SEP", "OCT", "NOV", "DIC"]
+RESPONSABLES = [
+    "Departamento solicitante", "Personal de almacén", "Jefatura de compras", "Enfermera jefe de piso",
+    "Químico responsable", "Coordinación de calidad", "Médico adscrito", "Jefatura de enfermería",
+    "Personal de farmacia", "Dirección médica", "Dirección administrativa", "Personal de mantenimiento",
+]
+VERBOS = ["Verifica", "Registra", "Solicita", "Revisa", "Autoriza", "Entrega", "Notifica", "Archiva",
+          "Evalúa", "Documenta", "Supervisa", "Corrobora"]
+OBJETOS = ["la requisición de material", "el expediente del paciente", "la bitácora de temperatura",
+           "el inventario de insumos", "la orden de trabajo", "el resultado de laboratorio",
+           "la solicitud de compra", "el reporte de incidencias", "la lista de verificación"]
+RIESGOS = ["Falta de existencia de productos.", "Entrega errónea de material.",
+           "Registro incompleto en la bitácora.", "Identificación incorrecta del paciente.",
+           "Pérdida de la cadena de frío.", "Retraso en la atención.", "Uso de formato obsoleto."]
+BARRERAS = ["Verificar las listas antes de la entrega.", "Realizar inventario semanal.",
+            "Doble verificación de identidad.", "Capacitación anual del personal.",
+            "Monitoreo diario de temperatura.", "Auditorías internas trimestrales."]
+NOMBRES = ["Ana", "Luis", "María", "José", "Carmen", "Jorge", "Lucía", "Miguel", "Sofía", "Ricardo"]
+APELLIDOS = ["García", "Hernández", "López", "Martínez", "Pérez", "Sánchez", "Ramírez", "Torres",
+             "Flores", "Rivera", "Gómez", "Díaz"]
+CARGOS = ["Jefatura de Calidad", "Dirección Médica", "Coordinación de Enfermería",
+          "Jefatura de Compras", "Dirección Administrativa", "Responsable Sanitario"]
+
+def _fecha(d):
+    return f"{d.day:02d} {MESES[d.month - 1]} {d.year}"
+
+def _persona(rnd):
+    return f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}"
+
+def _actividad(rnd):
+    texto = f"{rnd.choice(VERBOS)} {rnd.choice(OBJETOS)}"
+    if rnd.random() < 0.3:
+        texto += f" en el formato F-{rnd.randrange(1000):03d}"
+    return texto + "."
+
+# Función para generar el procedimiento número `i`
+def generar_procedimiento(i, rnd, pasos=(4, 12)):
+    area = AREAS[i % len(AREAS)]
+    codigo = f"PR-{area}-{i:06d}"
+    emision = date(2018, 1, 1) + timedelta(days=rnd.randrange(3000))
+    revision = emision + timedelta(days=730)
+    roles = rnd.sample(RESPONSABLES, 3)
+    elaboro, reviso, autorizo = _persona(rnd), _persona(rnd), _persona(rnd)
+    return {
+        "Código": codigo,
+        "Nombre del Documento": f"PROCEDIMIENTO {i} DE {rnd.choice(OBJETOS).upper()}",
+        "Versión vigente": f"{rnd.randrange(1, 6):02d}",
+        "Fecha de emisión": _fecha(emision),
+        "Fecha de revisión": _fecha(revision),
+        "Objetivo": f"Asegurar que {rnd.choice(RESPONSABLES).lower()} {rnd.choice(VERBOS).lower()} "
+                    f"{rnd.choice(OBJETOS)} en tiempo y forma.",
+        "Alcance": f"Aplica a {rnd.choice(RESPONSABLES).lower()} y {rnd.choice(RESPONSABLES).lower()} del hospital.",
+        "Responsabilidades": {
+            "Actualización": roles[0],
+            "Supervisión": f"{roles[1]}, {roles[2]}",
+        },
+        "Desarrollo del Proceso": {"table": [
+            {"No.": str(n + 1), "Responsable": rnd.choice(roles), "Actividad": _actividad(rnd)}
+            for n in range(rnd.randint(*pasos))
+        ]},
+        "Control de Cambios": {"table": [
+            {"Número": str(n + 1), "Fecha": (emision + timedelta(days=200 * n)).strftime("%d/%m/%y"),
+             "Descripción del Cambio": "Alta de documento" if n == 0 else "Actualización de actividades",
+             "Realizado por": elaboro, "Aprobado por": autorizo}
+            for n in range(rnd.randint(1, 4))
+        ]},
+        "Gestión de Riesgos": {
+            "Ponderación de riesgos": rnd.sample(RIESGOS, rnd.randint(2, 5)),
+            "Barreras de seguridad": rnd.sample(BARRERAS, rnd.randint(2, 4)),
+        },
+        "Documentos de Referencia": {"table": [
+            {"Nombre del Documento": f"Formato {n}", "Código": f"FT-{area}-{rnd.randrange(100):02d}"}
+            for n in range(rnd.randint(1, 4))
+        ]},
+        "Autorizaciones": {"table": [
+            {"Elaboró": elaboro, "Revisó": reviso, "Autorizó": autorizo},
+            {"Cargo Elaboró": rnd.choice(CARGOS), "Cargo Revisó": rnd.choice(CARGOS),
+             "Cargo Autorizó": rnd.choice(CARGOS)},
+        ]},
+    }
+
+# Función para generar el corpus como pares (nombre, contenido en bytes), el
+# mismo formato que reciben ingesta.cargar_lote y la carga masiva de la interfaz
+def generar_corpus(n_documentos, semilla=42):
+    rnd = random.Random(semilla)
+    for i in range(n_documentos):
+        procedimiento = generar_procedimiento(i, rnd)
+        yield f"{procedimiento['Código']}.json", json.dumps(procedimiento, ensure_ascii=False).encode("utf-8")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera procedimientos JSON sintéticos")
+    parser.add_argument("--documentos", type=int, default=1000)
+    parser.add_argument("--salida", default="corpus", help="Directorio (o archivo .zip con --zip)")
+    parser.add_argument("--zip", action="store_true", help="Empaquetar los JSON en un solo ZIP")
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    corpus = generar_corpus(args.documentos, args.semilla)
+    if args.zip:
+        with zipfile.ZipFile(args.salida, "w", zipfile.ZIP_DEFLATED) as zf:
+            for nombre, contenido in corpus:
+                zf.writestr(nombre, contenido)
+    else:
+        os.makedirs(args.salida, exist_ok=True)
+        for nombre, contenido in corpus:
+            with open(os.path.join(args.salida, nombre), "wb") as f:
+                f.write(contenido)
+    print(f"{args.documentos} procedimientos generados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import re
+from sqlalchemy import text, select, or_, literal
+
+from base_datos import documentos, documento_pasos, documento_riesgos
+
+# Índice de texto completo (SQLite FTS5) sobre los campos descriptivos del
+# procedimiento; los pasos y riesgos se concatenan desde las tablas hijas
+TABLA_FTS = "busqueda_documentos"
+
+DDL_FTS = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5(
+    codigo UNINDEXED, nombre_documento, objetivo, alcance, pasos, riesgos,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+# Pesos de bm25 por columna: el nombre pesa más que el texto de los pasos
+PESOS_BM25 = "0.0, 10.0, 4.0, 2.0, 1.0, 1.0"
+
+def _usa_fts(conn):
+    return conn.dialect.name == "sqlite"
+
+# Función para crear la tabla virtual si no existe
+def crear_indice(conn):
+    if _usa_fts(conn):
+        conn.execute(text(DDL_FTS))
+
+# Función para (re)indexar documentos dentro de la transacción actual.
+# Sin `codigos` se reconstruye el índice completo
+def indexar_documentos(conn, codigos=None):
+    if not _usa_fts(conn):
+        return
+    filtro, parametros = "", {}
+    if codigos is not None:
+        codigos = list(codigos)
+        if not codigos:
+            return
+        marcadores = ", ".join(f":c{i}" for i in range(len(codigos)))
+        parametros = {f"c{i}": codigo for i, codigo in enumerate(codigos)}
+        filtro = f" WHERE d.codigo IN ({marcadores})"
+        conn.execute(text(f"DELETE FROM {TABLA_FTS} WHERE codigo IN ({marcadores})"), parametros)
+    else:
+        conn.execute(text(f"DELETE FROM {TABLA_FTS}"))
+    conn.execute(text(f"""
+        INSERT INTO {TABLA_FTS} (codigo, nombre_documento, objetivo, alcance, pasos, riesgos)
+        SELECT d.codigo, d.nombre_documento, d.objetivo, d.alcance,
+               (SELECT group_concat(p.responsable || ' ' || p.descripcion, ' ')
+                  FROM documento_pasos p WHERE p.documento_codigo = d.codigo),
+               (SELECT group_concat(r.texto, ' ')
+                  FROM documento_riesgos r WHERE r.documento_codigo = d.codigo)
+        FROM documentos d{filtro}
+    """), parametros)
+
+# Función para convertir el texto del usuario en una consulta FTS5 segura:
+# cada palabra va entre comillas y la última admite prefijo
+def _consulta_fts(consulta):
+    palabras = re.findall(r"\w+", consulta)
+    if not palabras:
+        return ""
+    return " ".join(f'"{p}"' for p in palabras) + "*"
+
+# Función para buscar procedimientos; devuelve filas con código, nombre,
+# puntuación (menor es mejor) y un fragmento con las coincidencias resaltadas
+def buscar_documentos(conn, consulta, limite=20):
+    if _usa_fts(conn):
+        expresion = _consulta_fts(consulta)
+        if not expresion:
+            return []
+        return conn.execute(text(f"""
+            SELECT f.codigo, d.nombre_documento, d.estado,
+                   bm25({TABLA_FTS}, {PESOS_BM25}) AS puntuacion,
+                   snippet({TABLA_FTS}, -1, '**', '**', '…', 16) AS fragmento
+            FROM {TABLA_FTS} f JOIN documentos d ON d.codigo = f.codigo
+            WHERE {TABLA_FTS} MATCH :expresion
+            ORDER BY puntuacion
+            LIMIT :limite
+        """), {"expresion": expresion, "limite": limite}).mappings().all()
+
+    # Otros motores: búsqueda por subcadena sin ranking
+    consulta = consulta.strip()
+    if not consulta:
+        return []
+    coincide_pasos = select(documento_pasos.c.documento_codigo).where(
+        documento_pasos.c.descripcion.icontains(consulta, autoescape=True))
+    coincide_riesgos = select(documento_riesgos.c.documento_codigo).where(
+        documento_riesgos.c.texto.icontains(consulta, autoescape=True))
+    return conn.execute(
+        select(documentos.c.codigo, documentos.c.nombre_documento, documentos.c.estado,
+               literal(0.0).label("puntuacion"), documentos.c.objetivo.label("fragmento"))
+        .where(or_(
+            documentos.c.nombre_documento.icontains(consulta, autoescape=True),
+            documentos.c.objetivo.icontains(consulta, autoescape=True),
+            documentos.c.alcance.icontains(consulta, autoescape=True),
+            documentos.c.codigo.in_(coincide_pasos),
+            documentos.c.codigo.in_(coincide_riesgos),
+        ))
+        .order_by(documentos.c.codigo)
+        .limit(limite)
+    ).mappings().all()
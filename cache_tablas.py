@@ -0,0 +1,126 @@
+import threading
+from collections import OrderedDict
+from sqlalchemy import select, update, insert
+
+from base_datos import versiones_tabla
+from perfilado import medir, tamano_en_bytes
+
+# Caché de lecturas por tabla, compartida por todas las sesiones del proceso.
+# Cada entrada guarda la versión de la tabla con la que se cargó; una escritura
+# en la tabla incrementa su versión (registrar_cambio) y solo invalida sus entradas.
+# Las claves incluyen términos de búsqueda y páginas, así que el número de
+# entradas se limita a MAX_ENTRADAS descartando las usadas hace más tiempo
+MAX_ENTRADAS = 256
+_cache = OrderedDict()
+_estadisticas = {}
+_lock = threading.Lock()
+
+# Función para leer la versión actual de una tabla (0 si nunca ha cambiado)
+def version_tabla(conn, tabla):
+    version = conn.execute(
+        select(versiones_tabla.c.version).where(versiones_tabla.c.tabla == tabla)
+    ).scalar()
+    return version or 0
+
+# Función para registrar una escritura; debe llamarse dentro de la misma
+# transacción que modifica las tablas para que la invalidación sea atómica
+def registrar_cambio(conn, *tablas):
+    for tabla in tablas:
+        resultado = conn.execute(
+            update(versiones_tabla)
+            .where(versiones_tabla.c.tabla == tabla)
+            .values(version=versiones_tabla.c.version + 1)
+        )
+        if resultado.rowcount == 0:
+            conn.execute(insert(versiones_tabla).values(tabla=tabla, version=1))
+
+def _contar(tabla, campo):
+    stats = _estadisticas.setdefault(tabla, {"aciertos": 0, "fallos": 0})
+    stats[campo] += 1
+
+# Función para cargar datos de una tabla con caché. `clave` distingue varias
+# consultas sobre la misma tabla y `cargar` recibe la conexión y devuelve el valor.
+# Se devuelve una copia para que la página pueda modificar el DataFrame sin
+# alterar la entrada compartida
+def cargar_con_cache(engine, tabla, clave, cargar):
+    with medir(f"{tabla} {clave}", "cargador") as medicion:
+        with engine.connect() as conn:
+            version = version_tabla(conn, tabla)
+            with _lock:
+                entrada = _cache.get((tabla, clave))
+                if entrada is not None and entrada[0] == version:
+                    _cache.move_to_end((tabla, clave))
+                    _contar(tabla, "aciertos")
+                    valor = entrada[1]
+                else:
+                    valor = None
+            if valor is None:
+                valor = cargar(conn)
+                with _lock:
+                    _contar(tabla, "fallos")
+                    # Descartar las entradas de versiones anteriores de la tabla
+                    for llave in [k for k, v in _cache.items() if k[0] == tabla and v[0] != version]:
+                        del _cache[llave]
+                    _cache[(tabla, clave)] = (version, valor)
+                    _cache.move_to_end((tabla, clave))
+                    while len(_cache) > MAX_ENTRADAS:
+                        _cache.popitem(last=False)
+            elif medicion:
+                medicion["tipo"] = "caché"
+        if medicion:
+            medicion["filas"] = len(valor) if hasattr(valor, "__len__") else None
+            medicion["bytes"] = tamano_en_bytes(valor)
+    return valor.copy() if hasattr(valor, "copy") else valor
+
+# Caché de las secciones ya procesadas del detalle de un documento. La clave
+# lleva el código, la versión y la huella del contenido, así que una entrada no
+# queda obsoleta: si el documento cambia cambia su clave, y las entradas que ya
+# no se consultan salen por antigüedad al superar MAX_SECCIONES
+MAX_SECCIONES = 512
+_secciones = OrderedDict()
+
+def cargar_seccion_con_cache(engine, codigo, version, huella, seccion, cargar):
+    clave = (codigo, version, huella, seccion)
+    with medir(f"sección {seccion} {codigo}", "cargador") as medicion:
+        with _lock:
+            valor = _secciones.get(clave)
+            if valor is not None:
+                _secciones.move_to_end(clave)
+                _contar("secciones", "aciertos")
+        if valor is None:
+            with engine.connect() as conn:
+                valor = cargar(conn)
+            with _lock:
+                _contar("secciones", "fallos")
+                _secciones[clave] = valor
+                while len(_secciones) > MAX_SECCIONES:
+                    _secciones.popitem(last=False)
+        elif medicion:
+            medicion["tipo"] = "caché"
+        if medicion:
+            medicion["filas"] = len(valor) if hasattr(valor, "__len__") else None
+            medicion["bytes"] = tamano_en_bytes(valor)
+    return valor.copy() if hasattr(valor, "copy") else valor
+
+# Función para vaciar la caché de una tabla o de todas
+def limpiar_cache(tabla=None):
+    with _lock:
+        for llave in [k for k in _cache if tabla is None or k[0] == tabla]:
+            del _cache[llave]
+        if tabla in (None, "secciones"):
+            _secciones.clear()
+
+# Función para obtener las métricas de aciertos y fallos por tabla
+def estadisticas_cache():
+    with _lock:
+        filas = []
+        for tabla, stats in sorted(_estadisticas.items()):
+            total = stats["aciertos"] + stats["fallos"]
+            filas.append({
+                "tabla": tabla,
+                "aciertos": stats["aciertos"],
+                "fallos": stats["fallos"],
+                "tasa_aciertos": round(stats["aciertos"] / total, 3) if total else 0.0,
+                "entradas": len(_secciones) if tabla == "secciones" else sum(1 for k in _cache if k[0] == tabla),
+            })
+        return filas
@@ -0,0 +1,90 @@
+import pandas as pd
+from sqlalchemy import select, func, or_, and_
+
+from base_datos import documentos, personal
+
+# Columnas cortas del listado de documentos (sin las secciones en JSON)
+COLUMNAS_LISTADO = [
+    "codigo", "nombre_documento", "version", "fecha_emision", "fecha_revision",
+    "responsable_actualizacion", "responsable_supervision", "responsable_ejecucion", "estado"
+]
+
+# Columnas de encabezado que se muestran al seleccionar un documento
+COLUMNAS_ENCABEZADO = COLUMNAS_LISTADO + ["objetivo", "alcance", "comentarios_revision", "huella_contenido"]
+
+# Columnas del directorio de personal que usa la interfaz (sin la clave interna)
+COLUMNAS_PERSONAL = ["id", "nombre_completo", "puesto", "area", "correo", "activo"]
+
+# Columnas del listado de registros de formatos
+COLUMNAS_REGISTROS = [
+    "codigo", "nombre_registro", "version", "documento_origen", "responsable_recoleccion",
+    "medio_almacenamiento", "tiempo_retencion", "disposicion_final", "estado"
+]
+
+# Función para obtener los códigos de documento en orden (para selectores)
+def cargar_codigos(conn):
+    return conn.execute(select(documentos.c.codigo).order_by(documentos.c.codigo)).scalars().all()
+
+# Función para contar los documentos registrados
+def contar_documentos(conn):
+    return conn.execute(select(func.count()).select_from(documentos)).scalar()
+
+# Función para leer el directorio de personal ordenado por nombre
+def cargar_directorio_personal(conn, columnas=COLUMNAS_PERSONAL):
+    return pd.read_sql(
+        select(*[personal.c[col] for col in columnas]).order_by(personal.c.nombre_completo), conn
+    )
+
+# Función para leer un solo documento con las columnas indicadas; devuelve None si no existe
+def cargar_documento(conn, codigo, columnas=COLUMNAS_ENCABEZADO):
+    fila = conn.execute(
+        select(*[documentos.c[col] for col in columnas]).where(documentos.c.codigo == codigo)
+    ).mappings().first()
+    return dict(fila) if fila else None
+
+# Función para construir las condiciones WHERE de una tabla paginada.
+# `filtros` compara por igualdad; `texto` busca la subcadena (sin distinguir
+# mayúsculas) en cualquiera de las columnas indicadas
+def _condiciones(tabla, filtros=None, texto="", columnas_texto=()):
+    condiciones = [tabla.c[col] == valor for col, valor in (filtros or {}).items()]
+    if texto:
+        condiciones.append(or_(*[
+            tabla.c[col].icontains(texto, autoescape=True) for col in columnas_texto
+        ]))
+    return and_(True, *condiciones)
+
+# Función para contar las filas que cumplen los filtros
+def contar_filas(conn, tabla, filtros=None, texto="", columnas_texto=()):
+    return conn.execute(
+        select(func.count()).select_from(tabla)
+        .where(_condiciones(tabla, filtros, texto, columnas_texto))
+    ).scalar()
+
+# Función para obtener los códigos de documento que cumplen los filtros
+def cargar_codigos_filtrados(conn, filtros=None, texto="", columnas_texto=()):
+    return conn.execute(
+        select(documentos.c.codigo)
+        .where(_condiciones(documentos, filtros, texto, columnas_texto))
+        .order_by(documentos.c.codigo)
+    ).scalars().all()
+
+# Función para leer una página ordenada y filtrada en la base de datos.
+# El orden por la clave primaria desempata para que las páginas sean estables
+def consultar_pagina(conn, tabla, columnas, filtros=None, texto="", columnas_texto=(),
+                     orden=None, descendente=False, pagina=1, tamano=25):
+    consulta = select(*[tabla.c[col] for col in columnas]).where(
+        _condiciones(tabla, filtros, texto, columnas_texto)
+    )
+    if orden:
+        columna_orden = tabla.c[orden]
+        consulta = consulta.order_by(columna_orden.desc() if descendente else columna_orden.asc())
+    consulta = consulta.order_by(tabla.c.id).limit(tamano).offset((pagina - 1) * tamano)
+    return pd.read_sql(consulta, conn)
+
+# Función para obtener los valores distintos de una columna (opciones de filtro)
+def valores_distintos(conn, tabla, columna):
+    return conn.execute(
+        select(tabla.c[columna]).distinct()
+        .where(tabla.c[columna].is_not(None))
+        .order_by(tabla.c[columna])
+    ).scalars().all()
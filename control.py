@@ -1,89 +1,69 @@
-import re
 import io
+import tempfile
 import streamlit as st
 import pandas as pd
-import json
-from sqlalchemy import create_engine, Table, Column, Integer, String, Text, MetaData, insert, delete, update, select
+from sqlalchemy import select
 import matplotlib.pyplot as plt
 from st_aggrid import AgGrid, GridOptionsBuilder
 from st_aggrid.shared import GridUpdateMode
-from datetime import datetime
+from datetime import date
 import altair as alt
+from ingesta import cargar_lote, cargar_archivo_grande, CUARENTENA, UMBRAL_FLUJO
+from lector_json import resumir_json
+from base_datos import (
+    setup_database, documento_pasos, documento_riesgos, documento_referencias,
+    documento_cambios, documento_autorizaciones, documento_formatos
+)
+from cache_tablas import (
+    cargar_con_cache, cargar_seccion_con_cache, limpiar_cache, estadisticas_cache
+)
+from consultas import (
+    COLUMNAS_LISTADO, COLUMNAS_ENCABEZADO, COLUMNAS_PERSONAL, COLUMNAS_REGISTROS, cargar_codigos,
+    contar_documentos, cargar_directorio_personal, cargar_documento, contar_filas, consultar_pagina,
+    valores_distintos, cargar_codigos_filtrados
+)
+from flujo import ESTADOS, estados_siguientes, aplicar_transicion
+from acceso_datos import (
+    existe_documento, estado_documento, insertar_registro, insertar_personal, eliminar_registro,
+    eliminar_personal, cambiar_activo_personal
+)
+from versiones import listar_revisiones, comparar_revisiones
+from identidad import grupos_duplicados, conciliar_personal, sugerir_duplicados, fusionar_personal
+from referencias import ORIGENES_DOCUMENTO, ORIGENES_REGISTRO, contar_referencias, reasignar_responsabilidades
+from busqueda import buscar_documentos
+from indicadores import (
+    documentos_por_estado, registros_por, transiciones_por_mes, personal_por_area
+)
+from exportacion import TABLAS_EXPORTABLES, MIME_FORMATOS, exportar_tabla
+from revisiones import resumen_revisiones, revisiones_vencidas, revisiones_proximas, revisiones_sin_fecha
+from secciones import (
+    cargar_seccion, formatos_de_documento, documentos_con_formato, documentos_por_rol,
+    referencias_de_registros, formatos_sin_registro
+)
 from st_aggrid.shared import GridUpdateMode
 from st_aggrid import AgGrid, GridOptionsBuilder
+from perfilado import ACTIVO, iniciar_corrida, finalizar_corrida, medir, medido, instrumentar_engine
 
-# Configuración de la base de datos mejorada
-def setup_database():
-    engine = create_engine('sqlite:///control_documental.db')
-    metadata = MetaData()
-    
-    # Tabla de documentos
-    documentos = Table('documentos', metadata,
-        Column('id', Integer, primary_key=True, autoincrement=True),
-        Column('codigo', String, unique=True),
-        Column('nombre_documento', String),
-        Column('version', String),
-        Column('fecha_emision', String),
-        Column('fecha_revision', String),
-        Column('objetivo', Text),
-        Column('alcance', Text),
-        Column('responsable_actualizacion', String),
-        Column('responsable_ejecucion', String),
-        Column('responsable_supervision', String),
-        Column('pasos', Text),
-        Column('historial_cambios', Text),
-        Column('riesgos', Text),
-        Column('barreras_seguridad', Text),
-        Column('documentos_referencia', Text),
-        Column('autorizaciones', Text),
-        Column('estado', String, default="Borrador"),
-        Column('comentarios_revision', Text, default="")
-    )
-    
-    # Tabla de registros
-    registros = Table('registros', metadata,
-        Column('id', Integer, primary_key=True, autoincrement=True),
-        Column('codigo', String, unique=True),
-        Column('nombre_registro', String),
-        Column('version', String),
-        Column('documento_origen', String),
-        Column('responsable_recoleccion', String),
-        Column('medio_almacenamiento', String),
-        Column('tiempo_retencion', String),
-        Column('disposicion_final', String),
-        Column('estado', String, default="Activo")
-    )
-    
-    # Tabla de personal autorizado
-    personal = Table('personal', metadata,
-        Column('id', Integer, primary_key=True, autoincrement=True),
-        Column('nombre_completo', String, unique=True),
-        Column('puesto', String),
-        Column('area', String),
-        Column('correo', String),
-        Column('activo', Integer, default=1)
-    )
-    
-    # Tabla de cambios de estado
-    cambios_estado = Table('cambios_estado', metadata,
-        Column('id', Integer, primary_key=True, autoincrement=True),
-        Column('documento_codigo', String),
-        Column('estado_anterior', String),
-        Column('nuevo_estado', String),
-        Column('comentarios', Text),
-        Column('fecha_cambio', String)
-    )
-    
-    metadata.create_all(engine)
-    return engine, documentos, registros, personal, cambios_estado
-    
-# Inicialización de la base de datos mejorada (sin indentación)
-engine, documentos, registros, personal, cambios_estado = setup_database()
-
-# Configuración de la aplicación Streamlit
+# Configuración de la aplicación Streamlit; debe ser la primera instrucción de
+# Streamlit, antes del spinner de la primera llamada en caché
 st.set_page_config(page_title="Sistema Integrado ISO 9001:2015", layout="wide")
+
+# Inicialización de la base de datos: el engine, su pool y la verificación del
+# esquema se crean una sola vez por proceso y se reutilizan en cada rerun
+@st.cache_resource
+def obtener_base_datos():
+    engine, *tablas = setup_database()
+    instrumentar_engine(engine)
+    return (engine, *tablas)
+
+engine, documentos, registros, personal, cambios_estado = obtener_base_datos()
+
 st.title("📋 Sistema de Gestión Documental y Registros ISO 9001:2015")
 
+# Perfilado de la ejecución: se activa con CONTROLDOC_PERFILADO=1 o desde la barra lateral
+perfilado_activo = st.sidebar.toggle("⏱️ Perfilado de la ejecución", value=ACTIVO, key="perfilado")
+iniciar_corrida("control.py", perfilado_activo)
+
 # Configuración de las pestañas con el nuevo orden y nombres actualizados
 tabs = st.tabs([
     "Subir JSON", 
@@ -95,187 +75,318 @@ tabs = st.tabs([
     "Dashboard"
 ])
 
-# Funciones para cargar datos con caché
-@st.cache_data
-def cargar_datos():
+# AgGrid y la construcción de sus opciones, medidos en el panel de perfilado
+mostrar_aggrid = medido("AgGrid", "render")(AgGrid)
+
+@medido("GridOptionsBuilder.build", "render")
+def construir_opciones(gb):
+    return gb.build()
+
+# Funciones para cargar datos con caché por tabla: una escritura solo invalida
+# la tabla modificada (ver cache_tablas.registrar_cambio)
+def cargar_codigos_documentos():
     try:
-        with engine.connect() as conn:
-            return pd.read_sql("SELECT * FROM documentos", conn)
+        return cargar_con_cache(engine, "documentos", "codigos", cargar_codigos)
     except Exception as e:
-        st.error(f"Error al cargar los datos de documentos: {e}")
-        return pd.DataFrame()
+        st.error(f"Error al cargar los códigos de documentos: {e}")
+        return []
+
+def cargar_total_documentos():
+    try:
+        return cargar_con_cache(engine, "documentos", "total", contar_documentos)
+    except Exception as e:
+        st.error(f"Error al contar los documentos: {e}")
+        return 0
+
+# Encabezado de un solo documento, consultado al seleccionarlo
+def cargar_detalle_documento(codigo):
+    try:
+        return cargar_con_cache(engine, "documentos", ("detalle", codigo),
+                                lambda conn: cargar_documento(conn, codigo))
+    except Exception as e:
+        st.error(f"Error al cargar el documento {codigo}: {e}")
+        return None
+
+# Secciones del detalle de un documento como DataFrames listos para mostrar.
+# Se leen de las tablas hijas solo cuando la sección se despliega
+def _df_pasos(conn, codigo):
+    return pd.DataFrame(cargar_seccion(conn, documento_pasos, codigo),
+                        columns=["numero", "responsable", "descripcion"]).rename(columns={
+        "numero": "No.", "responsable": "Responsable", "descripcion": "Descripción"
+    })
+
+def _df_riesgos(conn, codigo):
+    filas_riesgos = cargar_seccion(conn, documento_riesgos, codigo)
+    riesgos = [f["texto"] for f in filas_riesgos if f["tipo"] == "riesgo"]
+    barreras = [f["texto"] for f in filas_riesgos if f["tipo"] == "barrera"]
+    # Asegurar que ambas listas tengan el mismo tamaño
+    max_len = max(len(riesgos), len(barreras))
+    riesgos.extend([""] * (max_len - len(riesgos)))
+    barreras.extend([""] * (max_len - len(barreras)))
+    return pd.DataFrame({"Ponderación de riesgos": riesgos, "Barreras de seguridad": barreras})
+
+def _df_referencias(conn, codigo):
+    return pd.DataFrame(cargar_seccion(conn, documento_referencias, codigo),
+                        columns=["nombre", "codigo_referencia"]).rename(columns={
+        "nombre": "Nombre del Documento", "codigo_referencia": "Código"
+    })
+
+def _df_cambios(conn, codigo):
+    return pd.DataFrame(cargar_seccion(conn, documento_cambios, codigo),
+                        columns=["numero", "fecha", "descripcion", "realizado_por", "aprobado_por"]).rename(columns={
+        "numero": "Número", "fecha": "Fecha", "descripcion": "Descripción del Cambio",
+        "realizado_por": "Realizado por", "aprobado_por": "Aprobado por"
+    })
+
+def _df_autorizaciones(conn, codigo):
+    return pd.DataFrame(cargar_seccion(conn, documento_autorizaciones, codigo),
+                        columns=["rol", "nombre", "cargo"]).rename(columns={
+        "rol": "Rol", "nombre": "Nombre", "cargo": "Cargo"
+    })
+
+SECCIONES_DETALLE = {
+    "pasos": _df_pasos,
+    "riesgos": _df_riesgos,
+    "referencias": _df_referencias,
+    "cambios": _df_cambios,
+    "autorizaciones": _df_autorizaciones,
+}
 
-@st.cache_data
-def cargar_registros():
+# Función para cargar una sección del documento con la caché de secciones
+# (clave código + versión + huella del contenido)
+def cargar_seccion_documento(detalles, seccion):
+    codigo = detalles["codigo"]
     try:
-        with engine.connect() as conn:
-            return pd.read_sql("SELECT * FROM registros", conn)
+        return cargar_seccion_con_cache(
+            engine, codigo, detalles["version"], detalles["huella_contenido"], seccion,
+            lambda conn: SECCIONES_DETALLE[seccion](conn, codigo)
+        )
     except Exception as e:
-        st.error(f"Error al cargar los datos de registros: {e}")
+        st.error(f"Error al cargar la sección {seccion} del documento {codigo}: {e}")
         return pd.DataFrame()
 
-@st.cache_data
+# Función para mostrar una sección en AgGrid con alto de fila ajustado al texto
+def mostrar_seccion_aggrid(df):
+    gb = GridOptionsBuilder.from_dataframe(df)
+    gb.configure_default_column(wrapText=True, autoHeight=True)  # Ajustar texto y alto
+    grid_options = construir_opciones(gb)
+    mostrar_aggrid(
+        df,
+        gridOptions=grid_options,
+        height=300,
+        fit_columns_on_grid_load=True,
+        theme="streamlit"
+    )
+
 def cargar_personal():
     try:
-        with engine.connect() as conn:
-            return pd.read_sql("SELECT * FROM personal", conn)
+        return cargar_con_cache(engine, "personal", "directorio", cargar_directorio_personal)
     except Exception as e:
         st.error(f"Error al cargar los datos de personal: {e}")
         return pd.DataFrame()
 
-# Función para extraer formatos mencionados en los pasos del procedimiento
-def extraer_formatos(pasos_json):
-    formatos = []
+# Valores distintos de una columna (opciones de filtros y selectores)
+def cargar_valores(tabla, columna):
     try:
-        pasos = json.loads(pasos_json) if pasos_json else []
-        patron = r'F-\d{3}'  # Patrón para buscar formatos tipo F-001, F-123, etc.
-        
-        for paso in pasos:
-            descripcion = paso.get('Descripción', '')
-            encontrados = re.findall(patron, descripcion)
-            formatos.extend(encontrados)
-        
-        # Eliminar duplicados y ordenar
-        return sorted(list(set(formatos)))
+        return cargar_con_cache(engine, tabla.name, ("valores", columna),
+                                lambda conn: valores_distintos(conn, tabla, columna))
     except Exception as e:
-        st.error(f"Error al extraer formatos: {e}")
+        st.error(f"Error al cargar los valores de {tabla.name}.{columna}: {e}")
         return []
 
-# Función para extraer roles de los pasos
-def extraer_roles(pasos_json):
-    roles = []
-    try:
-        pasos = json.loads(pasos_json) if pasos_json else []
-        
-        for paso in pasos:
-            responsable = paso.get('Responsable', '')
-            if responsable and responsable not in roles:
-                roles.append(responsable)
-        
-        return roles
-    except Exception as e:
-        st.error(f"Error al extraer roles: {e}")
-        return []
+# Función para mostrar los controles de una tabla cuyo orden, filtros y
+# paginación se resuelven en SQL. Devuelve la página pedida y el total filtrado
+def tabla_paginada(clave, tabla, columnas, columnas_texto, filtros=None):
+    col_orden, col_desc, col_buscar, col_tamano = st.columns([2, 1, 2, 1])
+    with col_orden:
+        orden = st.selectbox("Ordenar por:", columnas, key=f"{clave}_orden")
+    with col_desc:
+        descendente = st.toggle("Descendente", key=f"{clave}_desc")
+    with col_buscar:
+        texto = st.text_input("Buscar:", key=f"{clave}_buscar").strip()
+    with col_tamano:
+        tamano = st.selectbox("Filas:", [10, 25, 50, 100], index=1, key=f"{clave}_tamano")
 
-# Función para cargar contenido JSON
-def load_json_content(uploaded_json):
+    filtros = filtros or {}
+    clave_filtros = (tuple(sorted(filtros.items())), texto)
     try:
-        json_content = json.load(uploaded_json)
-        return json_content
-    except json.JSONDecodeError as e:
-        st.error(f"Error al decodificar el archivo JSON: {e}")
-        return None
+        total = cargar_con_cache(
+            engine, tabla.name, ("total",) + clave_filtros,
+            lambda conn: contar_filas(conn, tabla, filtros, texto, columnas_texto)
+        )
+        # Ajustar la página actual si los filtros redujeron el número de páginas
+        total_paginas = max(1, -(-total // tamano))
+        st.session_state[f"{clave}_pagina"] = min(st.session_state.get(f"{clave}_pagina", 1), total_paginas)
+        pagina = st.number_input(
+            f"Página (de {total_paginas}):", min_value=1, max_value=total_paginas, step=1,
+            key=f"{clave}_pagina"
+        )
+        df_pagina = cargar_con_cache(
+            engine, tabla.name, ("pagina", tuple(columnas), orden, descendente, pagina, tamano) + clave_filtros,
+            lambda conn: consultar_pagina(conn, tabla, columnas, filtros, texto, columnas_texto,
+                                          orden, descendente, pagina, tamano)
+        )
+        return df_pagina, total
     except Exception as e:
-        st.error(f"Error inesperado al leer el archivo JSON: {e}")
-        return None
+        st.error(f"Error al consultar {tabla.name}: {e}")
+        return pd.DataFrame(columns=columnas), 0
+
+# Función para mostrar una vista previa resumida y plegada del JSON subido;
+# se lee en flujo, sin construir el árbol completo
+def vista_previa_json(uploaded_json):
+    with st.expander("👁️ Vista previa del JSON (resumen)", expanded=False):
+        try:
+            st.json(resumir_json(uploaded_json), expanded=False)
+        except ValueError as e:
+            st.warning(f"No se pudo generar la vista previa: {e}")
+        finally:
+            uploaded_json.seek(0)
     
-# Cargar datos
-df = cargar_datos()
-df_registros = cargar_registros()
-df_personal = cargar_personal()
+# Métricas de la caché de datos en la barra lateral
+with st.sidebar.expander("🗄️ Caché de datos", expanded=False):
+    st.dataframe(pd.DataFrame(estadisticas_cache()), use_container_width=True)
+    if st.button("Vaciar caché", key="vaciar_cache"):
+        limpiar_cache()
+
+# Función para exportar una tabla a un archivo temporal por bloques y ofrecer
+# su descarga; la consulta no se materializa completa en un DataFrame
+def boton_exportacion(nombre_tabla, formato, etiqueta, clave):
+    if st.button(etiqueta, key=f"preparar_{clave}"):
+        try:
+            with st.spinner("Generando archivo..."):
+                archivo = tempfile.TemporaryFile()
+                filas = exportar_tabla(engine, nombre_tabla, formato, archivo)
+                archivo.seek(0)
+            st.download_button(
+                label=f"⬇️ Descargar {nombre_tabla}.{formato} ({filas} filas)",
+                data=archivo,
+                file_name=f"{nombre_tabla}.{formato}",
+                mime=MIME_FORMATOS[formato],
+                key=f"descargar_{clave}"
+            )
+        except ImportError as e:
+            st.error(f"Falta una librería para este formato: {e.name}")
+        except Exception as e:
+            st.error(f"Error al exportar: {str(e)}")
+
+# Exportación completa de tablas (incluido el histórico de cambios de estado)
+with st.sidebar.expander("📤 Exportar tablas", expanded=False):
+    tabla_exportar = st.selectbox("Tabla", list(TABLAS_EXPORTABLES), key="tabla_exportar")
+    formato_exportar = st.selectbox("Formato", list(MIME_FORMATOS), key="formato_exportar")
+    boton_exportacion(tabla_exportar, formato_exportar, "Preparar exportación", "tablas")
 
 # Tab 1: Subir JSON
-with tabs[0]:
+with tabs[0], medir("Tab 1: Subir JSON"):
     st.header("Subir archivo JSON y extraer datos")
     uploaded_json = st.file_uploader("Selecciona un archivo JSON", type=["json"], key="json_upload")
     
     if uploaded_json is not None:
-        json_content = load_json_content(uploaded_json)
-        if json_content:
-            st.success("Contenido del archivo JSON cargado correctamente.")
-            st.json(json_content)
-            
-            # Extraer datos del JSON como antes
-            registro_json = {
-                "codigo": json_content.get("Código", ""),
-                "nombre_documento": json_content.get("Nombre del Documento", ""),
-                "version": json_content.get("Versión vigente", ""),
-                "fecha_emision": json_content.get("Fecha de emisión", ""),
-                "fecha_revision": json_content.get("Fecha de revisión", ""),
-                "objetivo": json_content.get("Objetivo", ""),
-                "alcance": json_content.get("Alcance", ""),
-                "responsable_actualizacion": json_content.get("Responsabilidades", {}).get("Actualización", ""),
-                "responsable_ejecucion": "",  # Se completará después de procesar los pasos
-                "responsable_supervision": json_content.get("Responsabilidades", {}).get("Supervisión", ""),
-                "pasos": json.dumps(json_content.get("Desarrollo del Proceso", {}).get("table", []), ensure_ascii=False),
-                "historial_cambios": json.dumps(json_content.get("Control de Cambios", {}).get("table", []), ensure_ascii=False),
-                "riesgos": json.dumps(json_content.get("Gestión de Riesgos", {}).get("Ponderación de riesgos", []), ensure_ascii=False),
-                "barreras_seguridad": json.dumps(json_content.get("Gestión de Riesgos", {}).get("Barreras de seguridad", []), ensure_ascii=False),
-                "documentos_referencia": json.dumps(json_content.get("Documentos de Referencia", {}).get("table", []), ensure_ascii=False),
-                "autorizaciones": json.dumps(json_content.get("Autorizaciones", {}).get("table", []), ensure_ascii=False),
-                "estado": "Borrador",
-                "comentarios_revision": ""
-            }
-            
-            # Extraer roles de los pasos y completar responsable_ejecucion
-            pasos_str = registro_json["pasos"]
-            roles = extraer_roles(pasos_str)
-            registro_json["responsable_ejecucion"] = ", ".join(roles)
-            
-            # Insertar personal de las autorizaciones en la tabla de personal
-            try:
-                autorizaciones = json.loads(registro_json["autorizaciones"])
-                personal_registrar = []
-                
-                for auth in autorizaciones:
-                    nombre = auth.get("Nombre", "")
-                    puesto = auth.get("Puesto", "")
-                    if nombre and puesto:
-                        personal_registrar.append({
-                            "nombre_completo": nombre,
-                            "puesto": puesto,
-                            "area": "",  # Se puede completar manualmente después
-                            "correo": "",  # Se puede completar manualmente después
-                            "activo": 1
-                        })
-                
-                # Insertar en tabla de personal si no existen ya
-                if personal_registrar:
-                    with engine.connect() as conn:
-                        for persona in personal_registrar:
-                            existing = conn.execute(
-                                select(personal).where(personal.c.nombre_completo == persona["nombre_completo"])
-                            ).fetchone()
-                            
-                            if not existing:
-                                conn.execute(insert(personal), persona)
-                        conn.commit()
-            except Exception as e:
-                st.warning(f"Error al procesar personal de autorizaciones: {str(e)}")
-            
-            # Extraer formatos mencionados en los pasos
-            formatos = extraer_formatos(pasos_str)
-            
-            # Verificar si el documento ya existe
+        vista_previa_json(uploaded_json)
+
+        # Guardar con el núcleo de ingesta compartido con la carga masiva. Si la
+        # huella del contenido coincide con la registrada no se escribe nada.
+        # Un archivo que no cumple el esquema se rechaza antes de tocar la base;
+        # los archivos muy grandes se leen en flujo
+        if uploaded_json.size >= UMBRAL_FLUJO:
+            with st.spinner("Cargando archivo grande en flujo..."):
+                resultado = cargar_archivo_grande(engine, uploaded_json.name, uploaded_json,
+                                                  cuarentena=CUARENTENA)
+        else:
+            resultado = cargar_lote(engine, [(uploaded_json.name, uploaded_json.getvalue())],
+                                    trabajadores=1, cuarentena=CUARENTENA)[0]
+        if resultado["resultado"] == "insertado":
+            # Formatos mencionados en los pasos, leídos del índice de formatos
             with engine.connect() as conn:
-                existing = pd.read_sql(f"SELECT * FROM documentos WHERE codigo = '{registro_json['codigo']}'", conn)
-                if existing.empty:
-                    conn.execute(insert(documentos), registro_json)
-                    conn.commit()
-                    st.success("Datos extraídos e insertados en la base de datos con estado inicial Borrador.")
-                    
-                    # Mostrar formatos detectados y opción para registrarlos
-                    if formatos:
-                        st.subheader("Formatos detectados en el procedimiento")
-                        for formato in formatos:
-                            st.info(f"Formato detectado: {formato}")
-                        
-                        st.warning("Los formatos detectados pueden ser registrados en la pestaña 'Control de Registros'")
-                else:
-                    st.warning("El documento ya existe en la base de datos.")
-            st.cache_data.clear()
+                formatos = formatos_de_documento(conn, resultado["codigo"])
+            st.success("Datos extraídos e insertados en la base de datos con estado inicial Borrador.")
+
+            # Mostrar formatos detectados y opción para registrarlos
+            if formatos:
+                st.subheader("Formatos detectados en el procedimiento")
+                for formato in formatos:
+                    st.info(f"Formato detectado: {formato}")
+
+                st.warning("Los formatos detectados pueden ser registrados en la pestaña 'Control de Registros'")
+        elif resultado["resultado"] == "actualizado":
+            st.success(f"El documento ya existía y su contenido cambió: se actualizó ({resultado['detalle']}).")
+        elif resultado["resultado"] == "sin cambios":
+            st.info("El documento ya existe y su contenido no ha cambiado.")
+        elif resultado["resultado"] == "rechazado":
+            st.error("El archivo no cumple el esquema de procedimientos y no se guardó:\n\n"
+                     + "\n".join(f"- {error}" for error in resultado["errores"]))
+        else:
+            st.error(f"No se pudo guardar el documento: {resultado['detalle']}")
+        # Avisos que no impiden la carga (p. ej. una fecha de revisión irreconocible,
+        # que deja el documento en "sin fecha" del calendario de revisiones)
+        for aviso in resultado.get("avisos", []):
+            st.warning(f"Aviso: {aviso}")
+
+    # Carga masiva de varios JSON o archivos ZIP
+    with st.expander("📦 Carga masiva (varios JSON o ZIP)", expanded=False):
+        archivos_lote = st.file_uploader(
+            "Selecciona archivos JSON o ZIP",
+            type=["json", "zip"],
+            accept_multiple_files=True,
+            key="json_upload_lote"
+        )
+        if archivos_lote and st.button("📥 Procesar lote", type="primary"):
+            with st.spinner(f"Procesando {len(archivos_lote)} archivo(s)..."):
+                resultados = cargar_lote(engine, [(a.name, a.getvalue()) for a in archivos_lote],
+                                         cuarentena=CUARENTENA)
+            df_resultados = pd.DataFrame(resultados).drop(columns=["errores", "avisos"], errors="ignore")
+            conteo = df_resultados["resultado"].value_counts()
+            col_ins, col_act, col_sin, col_rec, col_err = st.columns(5)
+            col_ins.metric("Insertados", int(conteo.get("insertado", 0)))
+            col_act.metric("Actualizados", int(conteo.get("actualizado", 0)))
+            col_sin.metric("Sin cambios", int(conteo.get("sin cambios", 0)))
+            col_rec.metric("Rechazados", int(conteo.get("rechazado", 0)))
+            col_err.metric("Con error", int(conteo.get("error", 0)))
+            if conteo.get("rechazado", 0) and CUARENTENA:
+                st.warning(f"Los archivos rechazados se copiaron a la cuarentena: {CUARENTENA}")
+            st.dataframe(df_resultados, use_container_width=True)
 
     # Botón para actualizar el Control de Documentos
     if st.button("🔄 Actualizar Control de Documentos"):
-        st.cache_data.clear()  # Limpiar la caché para recargar los datos
+        limpiar_cache()  # Limpiar la caché para recargar los datos
         st.success("Control de Documentos actualizado correctamente.")
 
 # Tab 2: Control de Documentos
-with tabs[1]:
+with tabs[1], medir("Tab 2: Control de Documentos"):
     st.header("📂 Control de Documentos")
-    
+
+    # Búsqueda de texto completo en nombre, objetivo, alcance, pasos y riesgos
+    consulta_busqueda = st.text_input(
+        "🔎 Buscar procedimientos:",
+        placeholder="Ej: evaluación de proveedores",
+        key="busqueda_docs"
+    ).strip()
+    if consulta_busqueda:
+        try:
+            resultados_busqueda = cargar_con_cache(
+                engine, "documentos", ("busqueda", consulta_busqueda),
+                lambda conn: buscar_documentos(conn, consulta_busqueda)
+            )
+            if resultados_busqueda:
+                st.caption(f"{len(resultados_busqueda)} resultado(s)")
+                for resultado in resultados_busqueda:
+                    st.markdown(
+                        f"**{resultado['codigo']}** · {resultado['nombre_documento']} "
+                        f"· _{resultado['estado']}_  \n{resultado['fragmento']}"
+                    )
+            else:
+                st.info("Sin resultados para la búsqueda.")
+        except Exception as e:
+            st.error(f"Error en la búsqueda: {str(e)}")
+
     # Verificar si hay documentos registrados
-    if not df.empty:
+    total_documentos = cargar_total_documentos()
+    if total_documentos:
+        # Orden, búsqueda y paginación en la base de datos: solo se lee la página visible
+        df, _ = tabla_paginada(
+            "docs", documentos, COLUMNAS_LISTADO,
+            ["codigo", "nombre_documento", "responsable_actualizacion", "responsable_supervision"]
+        )
+
         # Preparar los datos para la tabla
         df["tipo_documento"] = df["codigo"].apply(lambda x: "Procedimiento" if x.startswith("PR") else "Otro")
         df["fecha_vigencia"] = df["fecha_revision"]  # Fecha de vigencia es igual a la fecha de revisión
@@ -300,11 +411,10 @@ with tabs[1]:
         # Mostrar la tabla con AgGrid
         st.subheader("📋 Documentos Registrados")
         gb = GridOptionsBuilder.from_dataframe(df_tabla)
-        gb.configure_pagination(paginationPageSize=10)
-        gb.configure_default_column(filterable=True, sortable=True)
-        grid_options = gb.build()
+        gb.configure_default_column(filterable=False, sortable=False)
+        grid_options = construir_opciones(gb)
 
-        AgGrid(
+        mostrar_aggrid(
             df_tabla,
             gridOptions=grid_options,
             height=400,
@@ -315,11 +425,11 @@ with tabs[1]:
         st.info("📭 No hay documentos registrados. Suba un documento en la pestaña 1 para comenzar.")
 
 # Tab 3: Control de Registros
-with tabs[2]:
+with tabs[2], medir("Tab 3: Control de Registros"):
     st.header("📁 Control de Registros")
     
-    # Cargar registros con manejo de DataFrame vacío
-    registros_df = cargar_registros()
+    # Solo se cargan los códigos; el listado se pagina en la base de datos
+    codigos_registros = cargar_valores(registros, "codigo")
     
     # --- Sección para agregar nuevos registros ---
     with st.expander("➕ Agregar Nuevo Registro", expanded=False):
@@ -331,7 +441,7 @@ with tabs[2]:
                 version = st.text_input("Versión:", value="1.0")
             with col2:
                 # Obtener documentos existentes de manera segura
-                doc_options = [""] + df["codigo"].tolist() if not df.empty else [""]
+                doc_options = [""] + cargar_codigos_documentos()
                 documento_origen = st.selectbox("Documento Origen:", options=doc_options)
                 responsable_recoleccion = st.text_input("Responsable de Recolección:")
             
@@ -353,33 +463,30 @@ with tabs[2]:
                     st.error("❌ Campos obligatorios: Código y Nombre del Registro")
                 else:
                     try:
-                        # Verificar existencia usando SQLAlchemy Core
-                        with engine.connect() as conn:
-                            existing = conn.execute()
-                            select(registros).where(registros.c.codigo == codigo)
-                            fetchone()
-                            
-                        if existing:
-                            st.warning(f"⚠️ El código {codigo} ya está registrado")
-                        else:
-                            nuevo_registro = {
-                                "codigo": codigo,
-                                "nombre_registro": nombre_registro,
-                                "version": version,
-                                "documento_origen": documento_origen,
-                                "responsable_recoleccion": responsable_recoleccion,
-                                "medio_almacenamiento": medio_almacenamiento,
-                                "tiempo_retencion": tiempo_retencion,
-                                "disposicion_final": disposicion_final,
-                                "estado": "Activo"
-                            }
-                            
-                            with engine.connect() as conn:
-                                conn.execute(insert(registros), nuevo_registro)
-                                conn.commit()
-                            
+                        nuevo_registro = {
+                            "codigo": codigo,
+                            "nombre_registro": nombre_registro,
+                            "version": version,
+                            "documento_origen": documento_origen,
+                            "responsable_recoleccion": responsable_recoleccion,
+                            "medio_almacenamiento": medio_almacenamiento,
+                            "tiempo_retencion": tiempo_retencion,
+                            "disposicion_final": disposicion_final,
+                            "estado": "Activo"
+                        }
+
+                        # Verificación de existencia y alta en la misma transacción; el
+                        # documento origen pudo eliminarse después de cargar la lista
+                        with engine.begin() as conn:
+                            origen_valido = not documento_origen or existe_documento(conn, documento_origen)
+                            creado = origen_valido and insertar_registro(conn, nuevo_registro)
+
+                        if not origen_valido:
+                            st.error(f"❌ El documento origen {documento_origen} ya no existe")
+                        elif creado:
                             st.success(f"✅ Registro {codigo} creado exitosamente")
-                            st.cache_data.clear()
+                        else:
+                            st.warning(f"⚠️ El código {codigo} ya está registrado")
                             
                     except Exception as e:
                         st.error(f"🚨 Error crítico: {str(e)}")
@@ -387,67 +494,89 @@ with tabs[2]:
     # --- Sección de visualización y filtrado ---
     st.subheader("Registros Existentes")
     
-    if not registros_df.empty:
-        # Mostrar tabla con AgGrid para mejor interactividad
-        gb = GridOptionsBuilder.from_dataframe(registros_df)
-        gb.configure_pagination(enabled=True)
-        gb.configure_default_column(filterable=True, sortable=True)
-        grid_options = gb.build()
-        
-        AgGrid(
-            registros_df,
-            gridOptions=grid_options,
-            height=300,
-            theme="streamlit",
-            fit_columns_on_grid_load=True
-        )
-        
-        # --- Filtrado por documento origen ---
+    if codigos_registros:
+        # --- Filtrado por documento origen y estado (se aplica en SQL) ---
         st.subheader("Filtrado Avanzado")
         col_filtro1, col_filtro2 = st.columns(2)
         with col_filtro1:
             doc_filtro = st.selectbox(
                 "Filtrar por Documento Origen:",
-                options=["Todos"] + registros_df["documento_origen"].unique().tolist()
+                options=["Todos"] + cargar_valores(registros, "documento_origen")
             )
         
         with col_filtro2:
             estado_filtro = st.selectbox(
                 "Filtrar por Estado:",
-                options=["Todos"] + registros_df["estado"].unique().tolist()
+                options=["Todos"] + cargar_valores(registros, "estado")
             )
         
-        # Aplicar filtros
-        filtered_df = registros_df.copy()
+        filtros_registros = {}
         if doc_filtro != "Todos":
-            filtered_df = filtered_df[filtered_df["documento_origen"] == doc_filtro]
+            filtros_registros["documento_origen"] = doc_filtro
         if estado_filtro != "Todos":
-            filtered_df = filtered_df[filtered_df["estado"] == estado_filtro]
+            filtros_registros["estado"] = estado_filtro
+
+        registros_pagina, total_filtrados = tabla_paginada(
+            "registros", registros, COLUMNAS_REGISTROS,
+            ["codigo", "nombre_registro", "responsable_recoleccion"],
+            filtros_registros
+        )
+
+        # Mostrar tabla con AgGrid para mejor interactividad
+        gb = GridOptionsBuilder.from_dataframe(registros_pagina)
+        gb.configure_default_column(filterable=False, sortable=False)
+        grid_options = construir_opciones(gb)
+        
+        mostrar_aggrid(
+            registros_pagina,
+            gridOptions=grid_options,
+            height=300,
+            theme="streamlit",
+            fit_columns_on_grid_load=True
+        )
             
-        st.metric("Registros Filtrados", len(filtered_df))
+        st.metric("Registros Filtrados", total_filtrados)
         
     else:
         st.info("📭 No hay registros disponibles. Crea uno usando el formulario superior")
 
+    # --- Formatos mencionados en los procedimientos (índice precalculado) ---
+    with st.expander("🔗 Formatos referenciados en procedimientos", expanded=False):
+        try:
+            with engine.connect() as conn:
+                referencias = referencias_de_registros(conn)
+                sin_registro = formatos_sin_registro(conn)
+
+            col_ref, col_sin = st.columns(2)
+            with col_ref:
+                st.markdown("*Registros y documentos que los mencionan*")
+                if referencias:
+                    st.dataframe(pd.DataFrame(referencias), use_container_width=True)
+                else:
+                    st.info("No hay registros dados de alta.")
+            with col_sin:
+                st.markdown("*Formatos detectados sin registro*")
+                if sin_registro:
+                    st.dataframe(pd.DataFrame(sin_registro), use_container_width=True)
+                else:
+                    st.success("Todos los formatos detectados tienen registro.")
+        except Exception as e:
+            st.error(f"Error al cargar el índice de formatos: {str(e)}")
+
     # --- Sección de eliminación segura ---
     with st.expander("🗑️ Eliminar Registro", expanded=False):
-        if not registros_df.empty:
+        if codigos_registros:
             registro_a_eliminar = st.selectbox(
                 "Seleccione registro a eliminar:",
-                registros_df["codigo"],
+                codigos_registros,
                 key="delete_registro"
             )
             
             if st.button("Confirmar Eliminación", key="confirm_delete_reg"):
                 try:
-                    with engine.connect() as conn:
-                        with conn.begin():
-                            conn.execute(
-                                delete(registros)
-                                .where(registros.c.codigo == registro_a_eliminar)
-                            )
+                    with engine.begin() as conn:
+                        eliminar_registro(conn, registro_a_eliminar)
                     st.success(f"✅ Registro {registro_a_eliminar} eliminado")
-                    st.cache_data.clear()
                     st.experimental_rerun()
                 except Exception as e:
                     st.error(f"🚨 Error al eliminar: {str(e)}")
@@ -455,17 +584,48 @@ with tabs[2]:
             st.warning("No hay registros para eliminar")
 
 # Tab 4: Documentos
-with tabs[3]:
+with tabs[3], medir("Tab 4: Documentos"):
     st.header("📝 Documentos")
-    
+
+    # Documentos que mencionan un formato o en los que un rol ejecuta algún paso,
+    # consultados en las tablas de secciones. Las tablas hijas se reescriben con
+    # cada carga de documentos, por eso se cachean con la versión de documentos
+    with st.expander("🔎 Buscar documentos por formato o rol", expanded=False):
+        try:
+            col_formato, col_rol = st.columns(2)
+            with col_formato:
+                formatos_detectados = cargar_con_cache(
+                    engine, "documentos", ("valores", "formato"),
+                    lambda conn: valores_distintos(conn, documento_formatos, "formato"))
+                formato_buscado = st.selectbox("Formato:", [""] + formatos_detectados, key="buscar_formato")
+                if formato_buscado:
+                    st.dataframe(pd.DataFrame({"codigo": cargar_con_cache(
+                        engine, "documentos", ("con_formato", formato_buscado),
+                        lambda conn: documentos_con_formato(conn, formato_buscado))}),
+                        use_container_width=True)
+            with col_rol:
+                roles_pasos = cargar_con_cache(
+                    engine, "documentos", ("valores", "responsable"),
+                    lambda conn: valores_distintos(conn, documento_pasos, "responsable"))
+                rol_buscado = st.selectbox("Rol responsable de pasos:", [""] + roles_pasos, key="buscar_rol")
+                if rol_buscado:
+                    st.dataframe(pd.DataFrame({"codigo": cargar_con_cache(
+                        engine, "documentos", ("por_rol", rol_buscado),
+                        lambda conn: documentos_por_rol(conn, rol_buscado))}),
+                        use_container_width=True)
+        except Exception as e:
+            st.error(f"Error en la búsqueda por formato o rol: {str(e)}")
+
     # Verificar si hay documentos registrados
-    if not df.empty:
+    codigos_documentos = cargar_codigos_documentos()
+    if codigos_documentos:
         documento_seleccionado = st.selectbox(
             "Seleccione un documento:",
-            df["codigo"],
+            codigos_documentos,
             key="doc_detalles"
         )
-        detalles = df[df["codigo"] == documento_seleccionado].iloc[0]
+        # Solo se consulta el encabezado del documento seleccionado
+        detalles = cargar_detalle_documento(documento_seleccionado) or dict.fromkeys(COLUMNAS_ENCABEZADO, "")
 
         # Mostrar información en el orden solicitado
         st.subheader("📄 Información del Documento")
@@ -483,124 +643,81 @@ with tabs[3]:
         st.write(f"*Ejecución:* {detalles['responsable_ejecucion']}")
         st.write(f"*Supervisión:* {detalles['responsable_supervision']}")
 
+        # Historial de versiones y comparación entre dos revisiones
+        with st.expander("🕓 Historial de versiones", expanded=False):
+            try:
+                with engine.connect() as conn:
+                    revisiones_doc = listar_revisiones(conn, documento_seleccionado)
+                st.dataframe(revisiones_doc, use_container_width=True)
+
+                numeros = revisiones_doc["revision"].tolist()
+                if len(numeros) > 1:
+                    col_a, col_b = st.columns(2)
+                    revision_a = col_a.selectbox("Revisión anterior", numeros, index=1, key="revision_a")
+                    revision_b = col_b.selectbox("Revisión posterior", numeros, index=0, key="revision_b")
+                    with engine.connect() as conn:
+                        diferencias = comparar_revisiones(conn, documento_seleccionado, revision_a, revision_b)
+                    if diferencias:
+                        for campo, diff in diferencias.items():
+                            st.markdown(f"**{campo}**")
+                            st.code(diff, language="diff")
+                    else:
+                        st.info("Las revisiones seleccionadas tienen el mismo contenido.")
+            except Exception as e:
+                st.error(f"Error al cargar el historial de versiones: {str(e)}")
+
+        # Cada sección se consulta y se dibuja solo si el usuario la despliega;
+        # al cambiar de documento únicamente se lee el encabezado
+        st.caption("Active una sección para consultarla.")
+
         # Desarrollo del Proceso
-        st.subheader("📋 Desarrollo del Proceso")
-        try:
-            pasos = json.loads(detalles["pasos"]) if detalles["pasos"] else []
-            if pasos:
-                # Crear un DataFrame para los pasos
-                df_pasos = pd.DataFrame(pasos)
-
-                # Configurar AgGrid para ajustar el alto de las filas
-                gb = GridOptionsBuilder.from_dataframe(df_pasos)
-                gb.configure_default_column(wrapText=True, autoHeight=True)  # Ajustar texto y alto
-                grid_options = gb.build()
-
-                # Mostrar la tabla con AgGrid
-                AgGrid(
-                    df_pasos,
-                    gridOptions=grid_options,
-                    height=300,
-                    fit_columns_on_grid_load=True,
-                    theme="streamlit"
-                )
+        if st.toggle("📋 Desarrollo del Proceso", key="ver_pasos"):
+            df_pasos = cargar_seccion_documento(detalles, "pasos")
+            if not df_pasos.empty:
+                mostrar_seccion_aggrid(df_pasos)
             else:
                 st.info("No se han registrado pasos para este documento.")
-        except Exception as e:
-            st.error(f"Error al cargar los pasos: {str(e)}")
 
         # Gestión de Riesgos
-        st.subheader("⚠️ Gestión de Riesgos")
-        try:
-            # Convertir los datos de riesgos y barreras de seguridad en listas
-            riesgos = json.loads(detalles["riesgos"]) if detalles["riesgos"] else []
-            barreras = json.loads(detalles["barreras_seguridad"]) if detalles["barreras_seguridad"] else []
-
-            if riesgos or barreras:
-                # Asegurar que ambas listas tengan el mismo tamaño
-                max_len = max(len(riesgos), len(barreras))
-                riesgos.extend([""] * (max_len - len(riesgos)))
-                barreras.extend([""] * (max_len - len(barreras)))
-
-                # Crear el DataFrame
-                df_riesgos = pd.DataFrame({
-                    "Ponderación de riesgos": riesgos,
-                    "Barreras de seguridad": barreras
-                })
-
-                # Configurar AgGrid para ajustar el alto de las filas
-                gb = GridOptionsBuilder.from_dataframe(df_riesgos)
-                gb.configure_default_column(wrapText=True, autoHeight=True)  # Ajustar texto y alto
-                grid_options = gb.build()
-
-                # Mostrar la tabla con AgGrid
-                AgGrid(
-                    df_riesgos,
-                    gridOptions=grid_options,
-                    height=300,
-                    fit_columns_on_grid_load=True,
-                    theme="streamlit"
-                )
+        if st.toggle("⚠️ Gestión de Riesgos", key="ver_riesgos"):
+            df_riesgos = cargar_seccion_documento(detalles, "riesgos")
+            if not df_riesgos.empty:
+                mostrar_seccion_aggrid(df_riesgos)
             else:
                 st.info("No se han registrado riesgos ni barreras de seguridad.")
-        except Exception as e:
-            st.error(f"Error al cargar la gestión de riesgos: {str(e)}")
+
         # Documentos de Referencia
-        st.subheader("📚 Documentos de Referencia")
-        try:
-            documentos_referencia = json.loads(detalles["documentos_referencia"]) if detalles["documentos_referencia"] else []
-            if documentos_referencia:
-                df_referencia = pd.DataFrame(documentos_referencia)
+        if st.toggle("📚 Documentos de Referencia", key="ver_referencias"):
+            df_referencia = cargar_seccion_documento(detalles, "referencias")
+            if not df_referencia.empty:
                 st.dataframe(df_referencia, use_container_width=True)
             else:
                 st.info("No se han registrado documentos de referencia.")
-        except Exception as e:
-            st.error(f"Error al cargar los documentos de referencia: {str(e)}")
 
         # Control de Cambios
-        st.subheader("🔄 Control de Cambios")
-        try:
-            cambios = json.loads(detalles["historial_cambios"]) if detalles["historial_cambios"] else []
-            if cambios:
-                df_cambios = pd.DataFrame(cambios)
+        if st.toggle("🔄 Control de Cambios", key="ver_cambios"):
+            df_cambios = cargar_seccion_documento(detalles, "cambios")
+            if not df_cambios.empty:
                 st.dataframe(df_cambios, use_container_width=True)
             else:
                 st.info("No se han registrado cambios para este documento.")
-        except Exception as e:
-            st.error(f"Error al cargar el control de cambios: {str(e)}")
 
         # Autorizaciones
-        st.subheader("🖋️ Autorizaciones")
-        try:
-            autorizaciones = json.loads(detalles["autorizaciones"]) if detalles["autorizaciones"] else []
-
-            if autorizaciones and len(autorizaciones) == 2:
-                # Extraer nombres y cargos de las autorizaciones
-                nombres = autorizaciones[0]
-                cargos = autorizaciones[1]
-
-                # Crear la estructura de la tabla con el formato solicitado (sin la columna vacía)
-                data_autorizaciones = [
-                    {"Rol": "Elaboró", "Nombre": nombres.get("Elaboró", ""), "Cargo": cargos.get("Cargo Elaboró", "")},
-                    {"Rol": "Revisó", "Nombre": nombres.get("Revisó", ""), "Cargo": cargos.get("Cargo Revisó", "")},
-                    {"Rol": "Autorizó", "Nombre": nombres.get("Autorizó", ""), "Cargo": cargos.get("Cargo Autorizó", "")}
-                ]
-
-                # Convertir a DataFrame
-                df_autorizaciones = pd.DataFrame(data_autorizaciones)
-
-                # Mostrar la tabla con el formato solicitado
+        if st.toggle("🖋️ Autorizaciones", key="ver_autorizaciones"):
+            df_autorizaciones = cargar_seccion_documento(detalles, "autorizaciones")
+            if not df_autorizaciones.empty:
                 st.dataframe(df_autorizaciones, use_container_width=True)
             else:
                 st.info("No se han registrado autorizaciones o el formato es incorrecto.")
-        except Exception as e:
-            st.error(f"Error al cargar las autorizaciones: {str(e)}")
 
     else:
         st.info("📭 No hay documentos disponibles. Suba un documento en la pestaña 1 para comenzar.")
 
+# Orígenes de las referencias al personal con su etiqueta para la interfaz
+ETIQUETAS_ORIGEN = {**ORIGENES_DOCUMENTO, **ORIGENES_REGISTRO}
+
 # Tab 5: Personal Autorizado
-with tabs[4]:
+with tabs[4], medir("Tab 5: Personal Autorizado"):
     st.header("👥 Gestión de Personal Autorizado")
     
     # Cargar personal con manejo de errores
@@ -629,51 +746,51 @@ with tabs[4]:
                     st.error("❌ Los campos 'Nombre Completo' y 'Puesto' son obligatorios.")
                 else:
                     try:
-                        # Verificar si el personal ya existe en la base de datos
-                        with engine.connect() as conn:
-                            existente = conn.execute(
-                                select(personal).where(personal.c.nombre_completo == nombre_completo.strip())
-                            ).fetchone()
-                            
-                            if existente:
-                                st.warning(f"⚠️ El personal '{nombre_completo}' ya está registrado.")
-                            else:
-                                # Insertar el nuevo registro en la base de datos
-                                nuevo_personal = {
-                                    "nombre_completo": nombre_completo.strip(),
-                                    "puesto": puesto.strip(),
-                                    "area": area.strip(),
-                                    "correo": correo.strip().lower(),
-                                    "activo": 1 if activo else 0
-                                }
-                                
-                                conn.execute(insert(personal), nuevo_personal)
-                                conn.commit()
-                                
-                                st.success("✅ Personal registrado exitosamente.")
-                                st.cache_data.clear()  # Limpiar la caché
-                                # Recargar los datos manualmente
-                                personal_df = cargar_personal()
+                        nuevo_personal = {
+                            "nombre_completo": nombre_completo.strip(),
+                            "puesto": puesto.strip(),
+                            "area": area.strip(),
+                            "correo": correo.strip().lower(),
+                            "activo": 1 if activo else 0
+                        }
+
+                        # Verificación de existencia y alta en la misma transacción
+                        with engine.begin() as conn:
+                            creado = insertar_personal(conn, nuevo_personal)
+
+                        if creado:
+                            st.success("✅ Personal registrado exitosamente.")
+                            # Recargar los datos manualmente
+                            personal_df = cargar_personal()
+                        else:
+                            st.warning(f"⚠️ El personal '{nombre_completo}' ya está registrado.")
                     except Exception as e:
                         st.error(f"🚨 Error al guardar en la base de datos: {str(e)}")
 
     # --- Listado y Gestión ---
     st.subheader("Listado de Personal")
 
+    grid_response = {"selected_rows": []}
     if not personal_df.empty:
+        # Orden, búsqueda y paginación en la base de datos
+        personal_pagina, _ = tabla_paginada(
+            "personal", personal, COLUMNAS_PERSONAL,
+            ["nombre_completo", "puesto", "area", "correo"]
+        )
+
         # Preprocesar los datos para que sean compatibles con AgGrid
-        personal_df = personal_df.astype(str)  # Convertir todos los datos a cadenas de texto
-        personal_df["Estado"] = personal_df["activo"].apply(lambda x: "✅ Activo" if x == "1" else "❌ Inactivo")
+        personal_pagina = personal_pagina.astype(str)  # Convertir todos los datos a cadenas de texto
+        personal_pagina["Estado"] = personal_pagina["activo"].apply(lambda x: "✅ Activo" if x == "1" else "❌ Inactivo")
 
         # Configurar AgGrid interactivo
-        gb = GridOptionsBuilder.from_dataframe(personal_df)
-        gb.configure_pagination(paginationPageSize=10)
+        gb = GridOptionsBuilder.from_dataframe(personal_pagina)
+        gb.configure_default_column(filterable=False, sortable=False)
         gb.configure_selection('single', use_checkbox=True)
-        grid_options = gb.build()
+        grid_options = construir_opciones(gb)
 
         # Mostrar la tabla con AgGrid
-        grid_response = AgGrid(
-            personal_df,
+        grid_response = mostrar_aggrid(
+            personal_pagina,
             gridOptions=grid_options,
             height=300,
             update_mode=GridUpdateMode.SELECTION_CHANGED
@@ -695,202 +812,375 @@ with tabs[4]:
             
             if st.button("Actualizar Estado"):
                 try:
-                    with engine.connect() as conn:
-                        conn.execute(
-                            update(personal)
-                            .where(personal.c.id == selected_id)
-                            .values(activo=1 if nuevo_estado.startswith("✅") else 0)
-                        )
-                        conn.commit()
+                    with engine.begin() as conn:
+                        cambiar_activo_personal(conn, int(selected_id), nuevo_estado.startswith("✅"))
                         
                     st.success("Estado actualizado!")
-                    st.cache_data.clear()
                     st.experimental_rerun()
                 except Exception as e:
                     st.error(f"Error al actualizar: {str(e)}")
-    
-# --- Exportación de Datos ---
-if not personal_df.empty:
-    st.download_button(
-        label="📤 Exportar a CSV",
-        data=personal_df.to_csv(index=False).encode("utf-8"),
-        file_name="personal_autorizado.csv",
-        mime="text/csv"
-    )
-else:
-    st.info("📭 No hay personal registrado. Use el formulario superior para agregar nuevos registros.")
-    st.image("https://i.imgur.com/3JGhQnp.png", width=250)
 
-# --- Eliminación Segura ---
-with st.expander("🗑️ Eliminar Personal", expanded=False):
+    # --- Conciliación de duplicados ---
+    # Las personas con la misma clave de nombre (sin acentos, títulos ni
+    # mayúsculas) se fusionan en una sola; los nombres parecidos solo se sugieren
+    with st.expander("🧩 Conciliar duplicados del directorio", expanded=False):
+        try:
+            with engine.connect() as conn:
+                grupos = grupos_duplicados(conn)
+            if grupos:
+                st.dataframe(pd.DataFrame([
+                    {"conservar": filas[0]["nombre_completo"],
+                     "fusionar": ", ".join(f["nombre_completo"] for f in filas[1:])}
+                    for filas in grupos.values()
+                ]), use_container_width=True)
+                if st.button(f"Fusionar {len(grupos)} grupo(s) de duplicados", key="conciliar_personal"):
+                    with engine.begin() as conn:
+                        informe = conciliar_personal(conn)
+                    st.success(f"✅ {len(informe)} registro(s) fusionados.")
+            else:
+                st.info("No hay nombres duplicados en el directorio.")
+
+            if st.button("Buscar nombres parecidos", key="sugerir_personal"):
+                with engine.connect() as conn:
+                    st.session_state["sugerencias_personal"] = sugerir_duplicados(conn)
+            sugerencias = st.session_state.get("sugerencias_personal", [])
+            if sugerencias:
+                st.dataframe(pd.DataFrame(sugerencias), use_container_width=True)
+                indice = st.selectbox(
+                    "Sugerencia a fusionar (se conserva el primer nombre):",
+                    range(len(sugerencias)),
+                    format_func=lambda i: f"{sugerencias[i]['nombre_a']}  ←  {sugerencias[i]['nombre_b']}",
+                    key="sugerencia_personal"
+                )
+                if st.button("Fusionar sugerencia", key="fusionar_sugerencia"):
+                    with engine.begin() as conn:
+                        fusionar_personal(conn, sugerencias[indice]["id_a"], [sugerencias[indice]["id_b"]])
+                    st.session_state.pop("sugerencias_personal")
+                    st.success("✅ Registros fusionados.")
+        except Exception as e:
+            st.error(f"Error al conciliar el personal: {str(e)}")
+
+    # --- Exportación de Datos ---
     if not personal_df.empty:
-        personal_a_eliminar = st.selectbox(
-            "Seleccionar personal a eliminar:",
-            personal_df["nombre_completo"],
-            key="delete_personal"
-        )
-        
-        if st.button("Confirmar Eliminación Definitiva", type="primary"):
+        boton_exportacion("personal", "csv", "📤 Exportar a CSV", "personal")
+    else:
+        st.info("📭 No hay personal registrado. Use el formulario superior para agregar nuevos registros.")
+        st.image("https://i.imgur.com/3JGhQnp.png", width=250)
+
+    # --- Eliminación Segura ---
+    with st.expander("🗑️ Eliminar Personal", expanded=False), medir("Eliminar Personal"):
+        if not personal_df.empty:
+            personal_a_eliminar = st.selectbox(
+                "Seleccionar personal a eliminar:",
+                personal_df["nombre_completo"],
+                key="delete_personal"
+            )
+            
+            if st.button("Confirmar Eliminación Definitiva", type="primary"):
+                try:
+                    with engine.begin() as conn:
+                        # Verificar en el índice inverso todas las referencias a la
+                        # persona (responsables, autorizaciones y registros); solo se cuentan
+                        referencias_persona = contar_referencias(conn, personal_a_eliminar)
+
+                        if referencias_persona:
+                            detalle = ", ".join(f"{ETIQUETAS_ORIGEN[origen]}: {n}" for origen, n in referencias_persona.items())
+                            st.error(f"No se puede eliminar: está referenciado en {detalle}. "
+                                     "Reasigne sus responsabilidades primero.")
+                        else:
+                            eliminar_personal(conn, personal_a_eliminar)
+                            st.success(f"{personal_a_eliminar} eliminado")
+                except Exception as e:
+                    st.error(f"Error crítico: {str(e)}")
+        else:
+            st.warning("No hay personal para eliminar")
+
+    # --- Reasignación de responsabilidades ---
+    with st.expander("🔁 Reasignar responsabilidades", expanded=False), medir("Reasignar responsabilidades"):
+        if not personal_df.empty:
+            col_origen, col_destino = st.columns(2)
+            persona_origen = col_origen.selectbox("De:", personal_df["nombre_completo"], key="reasignar_origen")
+            persona_destino = col_destino.selectbox("A:", personal_df["nombre_completo"], key="reasignar_destino")
             try:
                 with engine.connect() as conn:
-                    # Verificar si el personal está asociado a documentos
-                    documentos_asociados = conn.execute(
-                        select(documentos)
-                        .where(documentos.c.responsable_actualizacion == personal_a_eliminar)
-                    ).fetchall()
-                    
-                    if documentos_asociados:
-                        st.error(f"No se puede eliminar: Está asignado en {len(documentos_asociados)} documentos")
+                    referencias_origen = contar_referencias(conn, persona_origen)
+                if referencias_origen:
+                    st.dataframe(pd.DataFrame(
+                        [{"Origen": ETIQUETAS_ORIGEN[o], "Documentos/registros": n} for o, n in referencias_origen.items()]
+                    ), use_container_width=True)
+                else:
+                    st.info(f"{persona_origen} no tiene responsabilidades asignadas.")
+
+                if referencias_origen and st.button("Reasignar todo", type="primary", key="reasignar_todo"):
+                    if persona_origen == persona_destino:
+                        st.error("❌ Seleccione dos personas distintas.")
                     else:
-                        conn.execute(
-                            delete(personal)
-                            .where(personal.c.nombre_completo == personal_a_eliminar)
-                        )
-                        conn.commit()
-                        st.success(f"{personal_a_eliminar} eliminado")
-                        st.cache_data.clear()
+                        # Una sola transacción: documentos, secciones, índices y registros
+                        with engine.begin() as conn:
+                            resumen = reasignar_responsabilidades(conn, persona_origen, persona_destino)
+                        st.success(f"✅ {sum(resumen.values())} referencia(s) reasignadas a {persona_destino}.")
             except Exception as e:
-                st.error(f"Error crítico: {str(e)}")
-    else:
-        st.warning("No hay personal para eliminar")
+                st.error(f"Error al reasignar: {str(e)}")
+
 # Tab 6: Ciclo Documental
-with tabs[5]:
+with tabs[5], medir("Tab 6: Ciclo Documental"):
     st.header("🔄 Ciclo Documental")
     
-    # Cargar documentos con verificación de errores
-    try:
-        documentos_df = cargar_datos()
-    except Exception as e:
-        st.error(f"Error al cargar documentos: {str(e)}")
-        documentos_df = pd.DataFrame()
-
-    if not documentos_df.empty:
-        # Selección de documento con verificación de columna
-        if "codigo" in documentos_df.columns:
-            documento_seleccionado = st.selectbox(
-                "Seleccione un documento:",
-                documentos_df["codigo"],
-                key="ciclo_doc"
-            )
-            doc_info = documentos_df[documentos_df["codigo"] == documento_seleccionado].iloc[0]
-            
-            # Estado actual con indicador visual
-            col_estado, col_acciones = st.columns([1, 2])
-            with col_estado:
-                estado_actual = doc_info["estado"]
-                color_map = {
-                    "Borrador": "gray",
-                    "En Revisión": "orange",
-                    "Aprobado": "green",
-                    "Obsoleto": "red"
-                }
-                st.markdown(f"""
-                *Estado Actual:*  
-                <span style='color:{color_map.get(estado_actual, "black")};
-                font-weight:bold;font-size:18px'>{estado_actual}</span>
-                """, unsafe_allow_html=True)
-            
-            with col_acciones:
-                nuevo_estado = st.selectbox(
-                    "Cambiar Estado a:",
-                    ["Borrador", "En Revisión", "Aprobado", "Obsoleto"],
-                    index=["Borrador", "En Revisión", "Aprobado", "Obsoleto"].index(estado_actual)
-                )
-                comentarios = st.text_area("Comentarios del Cambio:", height=100)
-                
-                if st.button("🏷️ Registrar Cambio de Estado", type="primary"):
-                    try:
-                        with engine.connect() as conn:
-                            with conn.begin():
-                                # Actualizar estado del documento
-                                conn.execute(
-                                    documentos.update()
-                                    .where(documentos.c.codigo == documento_seleccionado)
-                                    .values(estado=nuevo_estado)
-                                )
-                                
-                                # Registrar en histórico de cambios
-                                conn.execute(
-                                    insert(cambios_estado).values(
-                                        documento_codigo=documento_seleccionado,
-                                        estado_anterior=estado_actual,
-                                        nuevo_estado=nuevo_estado,
-                                        comentarios=comentarios,
-                                        fecha_cambio=datetime.now()
-                                    )
-                                )
-                                
+    # Solo se cargan los códigos; el estado se consulta para el documento elegido
+    codigos_ciclo = cargar_codigos_documentos()
+
+    if codigos_ciclo:
+        documento_seleccionado = st.selectbox(
+            "Seleccione un documento:",
+            codigos_ciclo,
+            key="ciclo_doc"
+        )
+        try:
+            estado_actual = cargar_con_cache(engine, "documentos", ("estado", documento_seleccionado),
+                                             lambda conn: estado_documento(conn, documento_seleccionado))
+        except Exception as e:
+            st.error(f"Error al consultar el estado de {documento_seleccionado}: {e}")
+            estado_actual = None
+        estado_actual = estado_actual or "Borrador"
+
+        # Estado actual con indicador visual
+        col_estado, col_acciones = st.columns([1, 2])
+        with col_estado:
+            color_map = {
+                "Borrador": "gray",
+                "En Revisión": "orange",
+                "Aprobado": "green",
+                "Obsoleto": "red"
+            }
+            st.markdown(f"""
+            *Estado Actual:*  
+            <span style='color:{color_map.get(estado_actual, "black")};
+            font-weight:bold;font-size:18px'>{estado_actual}</span>
+            """, unsafe_allow_html=True)
+
+        with col_acciones:
+            # Solo se ofrecen las transiciones permitidas por el flujo documental
+            opciones_estado = estados_siguientes(estado_actual)
+            nuevo_estado = st.selectbox("Cambiar Estado a:", opciones_estado)
+            comentarios = st.text_area("Comentarios del Cambio:", height=100)
+
+            if st.button("🏷️ Registrar Cambio de Estado", type="primary", disabled=not opciones_estado):
+                try:
+                    with engine.begin() as conn:
+                        resultado = aplicar_transicion(conn, [documento_seleccionado], nuevo_estado, comentarios)
+
+                    if resultado["rechazados"]:
+                        st.error(f"No se aplicó el cambio: {resultado['rechazados'][0]['motivo']}")
+                    else:
                         st.success("Estado actualizado e historial registrado!")
-                        st.cache_data.clear()
                         st.experimental_rerun()
-                        
-                    except Exception as e:
-                        st.error(f"Error en base de datos: {str(e)}")
 
-            # Histórico de cambios con paginación
-            st.subheader("📜 Histórico de Estados")
+                except Exception as e:
+                    st.error(f"Error en base de datos: {str(e)}")
+
+        # Histórico de cambios con paginación
+        st.subheader("📜 Histórico de Estados")
+        try:
+            with engine.connect() as conn:
+                historico = pd.read_sql(
+                    select(cambios_estado)
+                    .where(cambios_estado.c.documento_codigo == documento_seleccionado)
+                    .order_by(cambios_estado.c.fecha_cambio.desc()),
+                    conn
+                )
+
+                if not historico.empty:
+                    historico["fecha_cambio"] = historico["fecha_cambio"].dt.strftime("%Y-%m-%d %H:%M")
+                    gb = GridOptionsBuilder.from_dataframe(historico)
+                    gb.configure_pagination(paginationPageSize=5)
+                    gb.configure_columns(["id", "documento_codigo"], hide=True)
+                    mostrar_aggrid(historico, gridOptions=construir_opciones(gb), height=200)
+                else:
+                    st.info("No hay registro histórico para este documento")
+        except Exception as e:
+            st.error(f"Error al cargar histórico: {str(e)}")
+
+        # Cambio de estado masivo sobre un conjunto filtrado de documentos
+        with st.expander("📦 Cambio de estado masivo", expanded=False):
+            col_origen, col_texto = st.columns(2)
+            estado_origen = col_origen.selectbox("Documentos en estado:", ESTADOS, key="masivo_origen")
+            texto_masivo = col_texto.text_input("Código o nombre contiene:", key="masivo_texto")
             try:
                 with engine.connect() as conn:
-                    historico = pd.read_sql(
-                        select(cambios_estado)
-                        .where(cambios_estado.c.documento_codigo == documento_seleccionado)
-                        .order_by(cambios_estado.c.fecha_cambio.desc()),
-                        conn
+                    codigos_masivo = cargar_codigos_filtrados(
+                        conn, {"estado": estado_origen}, texto_masivo.strip(), ["codigo", "nombre_documento"]
                     )
-                    
-                    if not historico.empty:
-                        historico["fecha_cambio"] = historico["fecha_cambio"].dt.strftime("%Y-%m-%d %H:%M")
-                        gb = GridOptionsBuilder.from_dataframe(historico)
-                        gb.configure_pagination(paginationPageSize=5)
-                        gb.configure_columns(["id", "documento_codigo"], hide=True)
-                        AgGrid(historico, gridOptions=gb.build(), height=200)
-                    else:
-                        st.info("No hay registro histórico para este documento")
             except Exception as e:
-                st.error(f"Error al cargar histórico: {str(e)}")
+                st.error(f"Error al filtrar documentos: {str(e)}")
+                codigos_masivo = []
+
+            seleccion_masiva = st.multiselect(
+                f"Documentos a cambiar ({len(codigos_masivo)} coinciden):",
+                codigos_masivo, default=codigos_masivo, key="masivo_codigos"
+            )
+            opciones_masivo = estados_siguientes(estado_origen)
+            estado_destino = st.selectbox("Nuevo estado:", opciones_masivo, key="masivo_destino")
+            comentarios_masivo = st.text_area("Comentarios del cambio:", key="masivo_comentarios")
+
+            if st.button(f"Aplicar a {len(seleccion_masiva)} documento(s)", key="masivo_aplicar",
+                         disabled=not (seleccion_masiva and opciones_masivo)):
+                try:
+                    # Una sola transacción para todo el conjunto
+                    with engine.begin() as conn:
+                        resultado = aplicar_transicion(conn, seleccion_masiva, estado_destino, comentarios_masivo)
+                    st.success(f"{len(resultado['aplicados'])} documento(s) pasaron a {estado_destino}")
+                    if resultado["rechazados"]:
+                        st.warning(f"{len(resultado['rechazados'])} documento(s) no se modificaron")
+                        st.dataframe(pd.DataFrame(resultado["rechazados"]), use_container_width=True)
+                except Exception as e:
+                    st.error(f"Error en base de datos: {str(e)}")
 
-        else:
-            st.error("La columna 'codigo' no existe en los documentos")
     else:
         st.info("📭 No hay documentos registrados. Suba documentos en la pestaña 1 para comenzar")
         st.image("https://i.imgur.com/5m6Ql8f.png", width=300)
 
     # Sección de próximas revisiones
-with st.expander("📅 Próximas Revisiones Programadas", expanded=False):
-    if not documentos_df.empty and "fecha_revision" in documentos_df.columns:
-        hoy = datetime.now().date()
-        
-        try:
-            # Convertir las fechas con un formato específico
-            documentos_df["fecha_revision"] = pd.to_datetime(
-                documentos_df["fecha_revision"], format="%d %b %Y", errors="coerce"
-            )
-            
-            # Filtrar las próximas revisiones
-            proximas = documentos_df[
-                (documentos_df["fecha_revision"].notnull()) &
-                (documentos_df["fecha_revision"] > hoy)
-            ]
-            
-            if not proximas.empty:
-                st.dataframe(
-                    proximas[["codigo", "nombre_documento", "fecha_revision"]],
-                    column_config={
-                        "fecha_revision": st.column_config.DateColumn(
-                            "Próxima Revisión",
-                            format="DD/MM/YYYY"
-                        )
-                    }
-                )
-            else:
-                st.info("No hay revisiones pendientes")
-        except Exception as e:
-            st.error(f"Error al procesar las fechas de revisión: {str(e)}")
-    else:
-        st.warning("Datos incompletos para mostrar revisiones")
+with st.expander("📅 Próximas Revisiones Programadas", expanded=False), medir("Próximas Revisiones"):
+    # Consultas sobre la fecha normalizada e indexada (revision_programada)
+    dias_horizonte = st.number_input("Horizonte (días)", min_value=1, max_value=365, value=30, step=1,
+                                     key="dias_revision")
+    try:
+        proximas = cargar_con_cache(engine, "documentos", ("revisiones_proximas", dias_horizonte, date.today()),
+                                    lambda conn: revisiones_proximas(conn, dias_horizonte))
+        vencidas = cargar_con_cache(engine, "documentos", ("revisiones_vencidas", date.today()),
+                                    revisiones_vencidas)
+        sin_fecha = cargar_con_cache(engine, "documentos", "revisiones_sin_fecha", revisiones_sin_fecha)
+
+        configuracion_fecha = {
+            "revision_programada": st.column_config.DateColumn("Próxima Revisión", format="DD/MM/YYYY")
+        }
+        columnas_revision = ["codigo", "nombre_documento", "estado", "revision_programada"]
+        if not proximas.empty:
+            st.dataframe(proximas[columnas_revision], column_config=configuracion_fecha)
+        else:
+            st.info("No hay revisiones pendientes")
+
+        if not vencidas.empty:
+            st.warning(f"{len(vencidas)} documento(s) con la revisión vencida")
+            st.dataframe(vencidas[columnas_revision], column_config=configuracion_fecha)
+        if not sin_fecha.empty:
+            st.caption(f"{len(sin_fecha)} documento(s) sin una fecha de revisión reconocible")
+            st.dataframe(sin_fecha[["codigo", "nombre_documento", "fecha_revision"]])
+    except Exception as e:
+        st.error(f"Error al consultar las revisiones: {str(e)}")
 
 # Tab 7: Dashboard
-with tabs[6]:
+with tabs[6], medir("Tab 7: Dashboard"):
     st.header("📊 Dashboard")
-    # ... código existente para esta pestaña ...
 
+    # Indicadores agregados en SQL; cada uno se guarda en caché con la versión
+    # de la tabla de la que depende
+    try:
+        estados_df = cargar_con_cache(engine, "documentos", "dashboard_estados", documentos_por_estado)
+        # El resumen depende también de la fecha: la clave cambia cada día
+        hoy = date.today()
+        revisiones = cargar_con_cache(engine, "documentos", ("dashboard_revisiones", hoy),
+                                      lambda conn: resumen_revisiones(conn, hoy))
+        medios_df = cargar_con_cache(engine, "registros", "dashboard_medios",
+                                     lambda conn: registros_por(conn, "medio_almacenamiento"))
+        disposicion_df = cargar_con_cache(engine, "registros", "dashboard_disposicion",
+                                          lambda conn: registros_por(conn, "disposicion_final"))
+        transiciones_df = cargar_con_cache(engine, "cambios_estado", "dashboard_transiciones", transiciones_por_mes)
+        areas_df = cargar_con_cache(engine, "personal", "dashboard_areas", personal_por_area)
+    except Exception as e:
+        st.error(f"Error al calcular los indicadores: {str(e)}")
+        estados_df = medios_df = disposicion_df = transiciones_df = areas_df = pd.DataFrame()
+        revisiones = {"vencidas": 0, "proximas": 0, "vigentes": 0, "sin_fecha": 0}
+
+    # KPIs principales
+    col_total, col_vencidas, col_proximas, col_sin_fecha = st.columns(4)
+    col_total.metric("Documentos", int(estados_df["documentos"].sum()) if not estados_df.empty else 0)
+    col_vencidas.metric("Revisiones vencidas", revisiones["vencidas"])
+    col_proximas.metric("Revisiones en 30 días", revisiones["proximas"])
+    col_sin_fecha.metric("Sin fecha de revisión válida", revisiones["sin_fecha"])
+
+    col_izq, col_der = st.columns(2)
+    with col_izq:
+        st.subheader("Documentos por estado")
+        if not estados_df.empty:
+            st.altair_chart(
+                alt.Chart(estados_df).mark_bar().encode(
+                    x=alt.X("estado:N", title="Estado"),
+                    y=alt.Y("documentos:Q", title="Documentos"),
+                    color=alt.Color("estado:N", legend=None)
+                ),
+                use_container_width=True
+            )
+        else:
+            st.info("No hay documentos registrados.")
+
+    with col_der:
+        st.subheader("Personal por área")
+        if not areas_df.empty:
+            st.altair_chart(
+                alt.Chart(areas_df.melt("area", var_name="situacion", value_name="personas")).mark_bar().encode(
+                    x=alt.X("personas:Q", title="Personas"),
+                    y=alt.Y("area:N", title="Área", sort="-x"),
+                    color=alt.Color("situacion:N", title="")
+                ),
+                use_container_width=True
+            )
+        else:
+            st.info("No hay personal registrado.")
+
+    col_medio, col_disposicion = st.columns(2)
+    with col_medio:
+        st.subheader("Registros por medio de almacenamiento")
+        if not medios_df.empty:
+            st.altair_chart(
+                alt.Chart(medios_df).mark_arc().encode(
+                    theta="registros:Q",
+                    color=alt.Color("medio_almacenamiento:N", title="Medio")
+                ),
+                use_container_width=True
+            )
+        else:
+            st.info("No hay registros.")
+    with col_disposicion:
+        st.subheader("Registros por disposición final")
+        if not disposicion_df.empty:
+            st.altair_chart(
+                alt.Chart(disposicion_df).mark_arc().encode(
+                    theta="registros:Q",
+                    color=alt.Color("disposicion_final:N", title="Disposición")
+                ),
+                use_container_width=True
+            )
+        else:
+            st.info("No hay registros.")
+
+    st.subheader("Cambios de estado por mes")
+    if not transiciones_df.empty:
+        st.altair_chart(
+            alt.Chart(transiciones_df).mark_bar().encode(
+                x=alt.X("mes:O", title="Mes"),
+                y=alt.Y("cambios:Q", title="Cambios"),
+                color=alt.Color("nuevo_estado:N", title="Nuevo estado")
+            ),
+            use_container_width=True
+        )
+    else:
+        st.info("Aún no hay cambios de estado registrados.")
+
+# Panel de perfilado: desglose de la ejecución actual por sección, cargador,
+# consulta y renderizado
+mediciones = finalizar_corrida()
+if mediciones:
+    with st.sidebar.expander("⏱️ Desglose de la ejecución", expanded=True):
+        df_perfil = pd.DataFrame(mediciones)
+        total_ms = df_perfil.loc[df_perfil["tipo"] == "total", "ms"].sum()
+        st.metric("Tiempo total", f"{total_ms:.0f} ms")
+        st.dataframe(
+            df_perfil.groupby("tipo", as_index=False)
+            .agg(ms=("ms", "sum"), mediciones=("ms", "size"), filas=("filas", "sum"), bytes=("bytes", "sum")),
+            use_container_width=True
+        )
+        st.dataframe(
+            df_perfil[df_perfil["tipo"] != "total"].sort_values("ms", ascending=False),
+            use_container_width=True
+        )
@@ -0,0 +1,195 @@
+import difflib
+import unicodedata
+
+from fechas import parsear_fecha
+
+# Esquema de los procedimientos en JSON. Cada nodo indica su tipo y, según el
+# caso, sus propiedades, las propiedades requeridas o el esquema de sus elementos.
+# "validar" admite una función adicional que recibe el valor y devuelve errores;
+# "avisar" una que devuelve avisos, que se informan pero no rechazan el documento
+ROLES_AUTORIZACION = ("Elaboró", "Revisó", "Autorizó")
+
+TEXTO = {"tipo": "texto"}
+TEXTO_REQUERIDO = {"tipo": "texto", "no_vacio": True}
+
+# Una fecha irreconocible no impide la carga: revision_programada queda en NULL
+# y el documento aparece en el calendario como "sin fecha"
+def _avisar_fecha(valor):
+    if valor and parsear_fecha(valor) is None:
+        return [f"fecha no reconocida: {valor!r}"]
+    return []
+
+# Autorizaciones: el par nombres/cargos que produce el formato institucional
+# ({"Elaboró", ...}, {"Cargo Elaboró", ...}) o una lista de {"Nombre", "Puesto"}
+def _validar_autorizaciones(tabla):
+    if not tabla:
+        return []
+    if all(isinstance(a, dict) for a in tabla) and any(rol in tabla[0] for rol in ROLES_AUTORIZACION):
+        if len(tabla) != 2:
+            return [f"se esperaban 2 entradas (nombres y cargos), hay {len(tabla)}"]
+        nombres, cargos = tabla
+        errores = [f"falta el nombre de '{rol}'" for rol in ROLES_AUTORIZACION if not nombres.get(rol)]
+        errores += [f"falta 'Cargo {rol}'" for rol in ROLES_AUTORIZACION if f"Cargo {rol}" not in cargos]
+        return errores
+    errores = []
+    for i, auth in enumerate(tabla):
+        if not isinstance(auth, dict) or not auth.get("Nombre") or not auth.get("Puesto"):
+            errores.append(f"[{i}]: se esperaba un objeto con 'Nombre' y 'Puesto'")
+    return errores
+
+ESQUEMA_PROCEDIMIENTO = {
+    "tipo": "objeto",
+    "requeridas": ["Código", "Desarrollo del Proceso"],
+    "propiedades": {
+        "Código": TEXTO_REQUERIDO,
+        "Nombre del Documento": TEXTO,
+        "Versión vigente": TEXTO,
+        "Fecha de emisión": {"tipo": "texto", "avisar": _avisar_fecha},
+        "Fecha de revisión": {"tipo": "texto", "avisar": _avisar_fecha},
+        "Objetivo": TEXTO,
+        "Alcance": TEXTO,
+        "Responsabilidades": {
+            "tipo": "objeto",
+            "propiedades": {"Actualización": TEXTO, "Supervisión": TEXTO},
+        },
+        "Desarrollo del Proceso": {
+            "tipo": "objeto",
+            "requeridas": ["table"],
+            "propiedades": {"table": {
+                "tipo": "lista",
+                "min": 1,
+                "elementos": {
+                    "tipo": "objeto",
+                    "requeridas": ["Responsable"],
+                    "una_de": ["Actividad", "Descripción"],
+                    "propiedades": {"No.": TEXTO, "Responsable": TEXTO,
+                                    "Actividad": TEXTO, "Descripción": TEXTO},
+                },
+            }},
+        },
+        "Control de Cambios": {
+            "tipo": "objeto",
+            "propiedades": {"table": {"tipo": "lista", "elementos": {
+                "tipo": "objeto",
+                "propiedades": {"Número": TEXTO, "Fecha": TEXTO, "Descripción del Cambio": TEXTO,
+                                "Realizado por": TEXTO, "Aprobado por": TEXTO},
+            }}},
+        },
+        "Gestión de Riesgos": {
+            "tipo": "objeto",
+            "propiedades": {
+                "Ponderación de riesgos": {"tipo": "lista", "elementos": TEXTO},
+                "Barreras de seguridad": {"tipo": "lista", "elementos": TEXTO},
+            },
+        },
+        "Documentos de Referencia": {
+            "tipo": "objeto",
+            "propiedades": {"table": {"tipo": "lista", "elementos": {
+                "tipo": "objeto",
+                "propiedades": {"Nombre del Documento": TEXTO, "Código": TEXTO},
+            }}},
+        },
+        "Autorizaciones": {
+            "tipo": "objeto",
+            "propiedades": {"table": {"tipo": "lista", "validar": _validar_autorizaciones}},
+        },
+    },
+}
+
+# Clave normalizada para detectar secciones mal escritas (mayúsculas, acentos, espacios)
+def _normalizar(clave):
+    sin_acentos = unicodedata.normalize("NFKD", clave).encode("ascii", "ignore").decode()
+    return " ".join(sin_acentos.lower().split())
+
+_NOMBRES_TIPO = {"objeto": "un objeto", "lista": "una lista", "texto": "un texto"}
+
+# Función para compilar un nodo del esquema en una función
+# validar(valor, ruta, errores, avisos=None). El recorrido del esquema, los
+# conjuntos de claves y los normalizados se calculan una sola vez
+def compilar(nodo):
+    tipo = nodo["tipo"]
+    extra = nodo.get("validar")
+    aviso = nodo.get("avisar")
+
+    if tipo == "texto":
+        no_vacio = nodo.get("no_vacio", False)
+
+        def validar_texto(valor, ruta, errores, avisos=None):
+            if not isinstance(valor, str):
+                # Se aceptan números en campos de texto ("No.": 1)
+                if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                    return
+                errores.append(f"{ruta}: se esperaba un texto")
+                return
+            if no_vacio and not valor.strip():
+                errores.append(f"{ruta}: no puede estar vacío")
+            if extra:
+                errores.extend(f"{ruta}: {e}" for e in extra(valor))
+            if aviso and avisos is not None:
+                avisos.extend(f"{ruta}: {a}" for a in aviso(valor))
+        return validar_texto
+
+    if tipo == "lista":
+        validar_elemento = compilar(nodo["elementos"]) if "elementos" in nodo else None
+        minimo = nodo.get("min", 0)
+
+        def validar_lista(valor, ruta, errores, avisos=None):
+            if not isinstance(valor, list):
+                errores.append(f"{ruta}: se esperaba una lista")
+                return
+            if len(valor) < minimo:
+                errores.append(f"{ruta}: debe tener al menos {minimo} elemento(s)")
+            if validar_elemento:
+                for i, elemento in enumerate(valor):
+                    validar_elemento(elemento, f"{ruta}[{i}]", errores, avisos)
+            if extra:
+                errores.extend(f"{ruta}: {e}" for e in extra(valor))
+        return validar_lista
+
+    propiedades = {clave: compilar(sub) for clave, sub in nodo.get("propiedades", {}).items()}
+    requeridas = nodo.get("requeridas", [])
+    una_de = nodo.get("una_de", [])
+    normalizadas = {_normalizar(clave): clave for clave in propiedades}
+    conocidas = list(propiedades)
+
+    def validar_objeto(valor, ruta, errores, avisos=None):
+        if not isinstance(valor, dict):
+            errores.append(f"{ruta or 'documento'}: se esperaba {_NOMBRES_TIPO[tipo]}")
+            return
+        prefijo = f"{ruta}." if ruta else ""
+        for clave in requeridas:
+            if clave not in valor:
+                errores.append(f"{prefijo}{clave}: campo requerido")
+        if una_de and not any(valor.get(clave) for clave in una_de):
+            errores.append(f"{ruta}: se requiere {' o '.join(repr(c) for c in una_de)}")
+        for clave, sub in valor.items():
+            validar = propiedades.get(clave)
+            if validar:
+                validar(sub, f"{prefijo}{clave}", errores, avisos)
+                continue
+            # Clave desconocida: se rechaza si parece una sección mal escrita
+            parecida = normalizadas.get(_normalizar(clave)) or next(
+                iter(difflib.get_close_matches(clave, conocidas, n=1, cutoff=0.85)), None)
+            if parecida:
+                errores.append(f"{prefijo}{clave}: sección desconocida (¿'{parecida}'?)")
+        if extra:
+            errores.extend(f"{ruta}: {e}" for e in extra(valor))
+    return validar_objeto
+
+_validar_procedimiento = compilar(ESQUEMA_PROCEDIMIENTO)
+
+# Función para obtener el validador compilado de los elementos de una lista del
+# esquema, p. ej. ("Desarrollo del Proceso", "table"); lo usa la ingesta en flujo
+def validador_elementos(*ruta):
+    nodo = ESQUEMA_PROCEDIMIENTO
+    for clave in ruta:
+        nodo = nodo["propiedades"][clave]
+    return compilar(nodo["elementos"])
+
+# Función para validar un procedimiento; devuelve la lista de todos los errores
+# encontrados (vacía si es válido). Con `avisos` (una lista) se agregan ahí los
+# problemas que no impiden la carga, como una fecha irreconocible
+def validar_procedimiento(json_content, avisos=None):
+    errores = []
+    _validar_procedimiento(json_content, "", errores, avisos)
+    return errores
@@ -0,0 +1,141 @@
+# Exportación de tablas completas a CSV, XLSX o Parquet. Las filas se leen y
+# escriben por bloques, de modo que la memoria no depende del tamaño de la tabla.
+#   python -m exportacion cambios_estado --formato csv --salida historial.csv
+import sys
+import argparse
+import pandas as pd
+from sqlalchemy import select, Integer, Date, DateTime
+
+from base_datos import DB_URL, setup_database, documentos, registros, personal, cambios_estado
+
+TABLAS_EXPORTABLES = {
+    "documentos": documentos,
+    "registros": registros,
+    "personal": personal,
+    "cambios_estado": cambios_estado,
+}
+
+MIME_FORMATOS = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Límite de filas por hoja de Excel (incluido el encabezado)
+FILAS_POR_HOJA = 1_048_575
+
+# Función para leer una tabla por bloques de DataFrames
+def iterar_bloques(conn, tabla, tamano_bloque=5000):
+    resultado = conn.execution_options(yield_per=tamano_bloque).execute(
+        select(tabla).order_by(*tabla.primary_key.columns)
+    )
+    columnas = list(resultado.keys())
+    for bloque in resultado.partitions():
+        yield pd.DataFrame(bloque, columns=columnas)
+
+# CSV: el encabezado solo en el primer bloque
+def _escribir_csv(bloques, tabla, destino):
+    primero = True
+    for bloque in bloques:
+        destino.write(bloque.to_csv(index=False, header=primero).encode("utf-8"))
+        primero = False
+    if primero:
+        destino.write(pd.DataFrame(columns=[c.name for c in tabla.columns]).to_csv(index=False).encode("utf-8"))
+
+# XLSX: libro en modo de solo escritura de openpyxl; se abre otra hoja al
+# llegar al límite de filas de Excel
+def _escribir_xlsx(bloques, tabla, destino):
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    encabezado = [c.name for c in tabla.columns]
+    hoja, filas_hoja, numero_hoja = None, FILAS_POR_HOJA, 0
+    for bloque in bloques:
+        for fila in bloque.astype(object).where(bloque.notna(), None).itertuples(index=False):
+            if filas_hoja >= FILAS_POR_HOJA:
+                numero_hoja += 1
+                hoja = libro.create_sheet(tabla.name if numero_hoja == 1 else f"{tabla.name}_{numero_hoja}")
+                hoja.append(encabezado)
+                filas_hoja = 0
+            hoja.append(list(fila))
+            filas_hoja += 1
+    if hoja is None:
+        libro.create_sheet(tabla.name).append(encabezado)
+    libro.save(destino)
+
+# Esquema de Parquet fijado a partir de la tabla; inferirlo del primer bloque
+# fallaría si una columna viene vacía en ese bloque y con datos en otro
+def _esquema_parquet(tabla):
+    import pyarrow as pa
+
+    campos = []
+    for columna in tabla.columns:
+        if isinstance(columna.type, Integer):
+            tipo = pa.int64()
+        elif isinstance(columna.type, DateTime):
+            tipo = pa.timestamp("us")
+        elif isinstance(columna.type, Date):
+            tipo = pa.date32()
+        else:
+            tipo = pa.string()
+        campos.append(pa.field(columna.name, tipo))
+    return pa.schema(campos)
+
+def _escribir_parquet(bloques, tabla, destino):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    esquema = _esquema_parquet(tabla)
+    with pq.ParquetWriter(destino, esquema) as escritor:
+        for bloque in bloques:
+            escritor.write_table(pa.Table.from_pandas(bloque, schema=esquema, preserve_index=False))
+
+ESCRITORES = {
+    "csv": _escribir_csv,
+    "xlsx": _escribir_xlsx,
+    "parquet": _escribir_parquet,
+}
+
+# Función principal: exporta una tabla a `destino` (ruta o archivo binario
+# abierto). Devuelve el número de filas escritas
+def exportar_tabla(engine, nombre_tabla, formato, destino, tamano_bloque=5000):
+    if nombre_tabla not in TABLAS_EXPORTABLES:
+        raise ValueError(f"tabla no exportable: {nombre_tabla}")
+    if formato not in ESCRITORES:
+        raise ValueError(f"formato no soportado: {formato}")
+    tabla = TABLAS_EXPORTABLES[nombre_tabla]
+    filas = 0
+
+    def contar(bloques):
+        nonlocal filas
+        for bloque in bloques:
+            filas += len(bloque)
+            yield bloque
+
+    with engine.connect() as conn:
+        bloques = contar(iterar_bloques(conn, tabla, tamano_bloque))
+        if isinstance(destino, str):
+            with open(destino, "wb") as archivo:
+                ESCRITORES[formato](bloques, tabla, archivo)
+        else:
+            ESCRITORES[formato](bloques, tabla, destino)
+    return filas
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta una tabla de control documental.")
+    parser.add_argument("tabla", choices=sorted(TABLAS_EXPORTABLES), help="Tabla a exportar")
+    parser.add_argument("--formato", choices=sorted(ESCRITORES), default="csv", help="Formato de salida")
+    parser.add_argument("--salida", help="Archivo de salida (por defecto <tabla>.<formato>)")
+    parser.add_argument("--db", default=DB_URL, help=f"URL de la base de datos (por defecto {DB_URL})")
+    parser.add_argument("--bloque", type=int, default=5000, help="Filas leídas por bloque")
+    args = parser.parse_args(argv)
+
+    salida = args.salida or f"{args.tabla}.{args.formato}"
+    engine, *_ = setup_database(args.db)
+    filas = exportar_tabla(engine, args.tabla, args.formato, salida, tamano_bloque=args.bloque)
+    print(f"{filas} filas exportadas a {salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
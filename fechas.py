@@ -0,0 +1,45 @@
+import re
+from datetime import date, datetime
+
+# Abreviaturas de mes en español (y en inglés, por compatibilidad) usadas en los
+# campos "Fecha de emisión" / "Fecha de revisión" de los procedimientos
+MESES = {
+    "ENE": 1, "FEB": 2, "MAR": 3, "ABR": 4, "MAY": 5, "JUN": 6,
+    "JUL": 7, "AGO": 8, "SEP": 9, "SET": 9, "OCT": 10, "NOV": 11, "DIC": 12,
+    "JAN": 1, "APR": 4, "AUG": 8, "DEC": 12,
+}
+
+_PATRON_TEXTO = re.compile(
+    r"^(\d{1,2})[\s\-/.]+(?:de\s+)?([A-Za-zÁÉÍÓÚáéíóú]{3,})\.?[\s\-/.,]+(?:de\s+)?(\d{4})$", re.IGNORECASE
+)
+_PATRON_NUMERICO = re.compile(r"^(\d{1,2})[/\-.](\d{1,2})[/\-.](\d{4})$")
+_PATRON_ISO = re.compile(r"^(\d{4})-(\d{2})-(\d{2})")
+
+# Función para convertir una fecha de texto en date; devuelve None si no se reconoce.
+# Formatos aceptados: "01 JUL 2026", "1 de julio de 2026", "01/07/2026" (día/mes/año)
+# y ISO "2026-07-01"
+def parsear_fecha(texto):
+    if isinstance(texto, datetime):
+        return texto.date()
+    if isinstance(texto, date):
+        return texto
+    if not texto or not isinstance(texto, str):
+        return None
+    texto = " ".join(texto.strip().split())
+    try:
+        coincidencia = _PATRON_ISO.match(texto)
+        if coincidencia:
+            return date(*map(int, coincidencia.groups()))
+        coincidencia = _PATRON_NUMERICO.match(texto)
+        if coincidencia:
+            dia, mes, anio = map(int, coincidencia.groups())
+            return date(anio, mes, dia)
+        coincidencia = _PATRON_TEXTO.match(texto)
+        if coincidencia:
+            dia, nombre_mes, anio = coincidencia.groups()
+            mes = MESES.get(nombre_mes[:3].upper().translate(str.maketrans("ÁÉÍÓÚ", "AEIOU")))
+            if mes:
+                return date(int(anio), mes, int(dia))
+    except ValueError:
+        return None
+    return None
@@ -0,0 +1,99 @@
+from datetime import datetime
+from sqlalchemy import select, insert, update
+
+from base_datos import documentos, cambios_estado
+from cache_tablas import registrar_cambio
+
+# Ciclo documental: estados y transiciones permitidas desde cada estado.
+# Un documento obsoleto solo puede reabrirse como borrador de una nueva edición
+ESTADOS = ["Borrador", "En Revisión", "Aprobado", "Obsoleto"]
+
+TRANSICIONES = {
+    "Borrador": ["En Revisión", "Obsoleto"],
+    "En Revisión": ["Borrador", "Aprobado"],
+    "Aprobado": ["En Revisión", "Obsoleto"],
+    "Obsoleto": ["Borrador"],
+}
+
+# Máximo de códigos por consulta IN (límite de parámetros de SQLite)
+TAMANO_BLOQUE = 500
+
+# Función para saber si se puede pasar de un estado a otro
+def transicion_permitida(estado_actual, nuevo_estado):
+    return nuevo_estado in TRANSICIONES.get(estado_actual, [])
+
+# Función para obtener los estados a los que puede pasar un documento
+def estados_siguientes(estado_actual):
+    return TRANSICIONES.get(estado_actual, [])
+
+# Función para leer el estado actual de los documentos indicados. En PostgreSQL
+# las filas quedan bloqueadas (FOR UPDATE) hasta el final de la transacción;
+# SQLite ignora el bloqueo y serializa las escrituras de toda la base
+def _estados_actuales(conn, codigos):
+    actuales = {}
+    for inicio in range(0, len(codigos), TAMANO_BLOQUE):
+        bloque = codigos[inicio:inicio + TAMANO_BLOQUE]
+        actuales.update(conn.execute(
+            select(documentos.c.codigo, documentos.c.estado)
+            .where(documentos.c.codigo.in_(bloque))
+            .with_for_update()
+        ).all())
+    return actuales
+
+# Función para aplicar una transición a uno o varios documentos. Debe llamarse
+# dentro de una transacción: los documentos válidos se actualizan y su histórico
+# se inserta con executemany; los demás se devuelven como rechazados con el motivo.
+# Cada UPDATE exige además el estado leído: si otra sesión cambió un documento
+# entre la lectura y la escritura, ese documento se rechaza en lugar de registrar
+# un estado anterior falso en el histórico
+def aplicar_transicion(conn, codigos, nuevo_estado, comentarios="", fecha=None):
+    if nuevo_estado not in TRANSICIONES:
+        raise ValueError(f"estado desconocido: {nuevo_estado}")
+    fecha = fecha or datetime.now()
+    codigos = list(dict.fromkeys(codigos))
+    actuales = _estados_actuales(conn, codigos)
+
+    por_estado, rechazados = {}, []
+    for codigo in codigos:
+        if codigo not in actuales:
+            rechazados.append({"codigo": codigo, "estado": None, "motivo": "no existe"})
+        elif not transicion_permitida(actuales[codigo], nuevo_estado):
+            rechazados.append({"codigo": codigo, "estado": actuales[codigo],
+                               "motivo": f"no se permite {actuales[codigo]} → {nuevo_estado}"})
+        else:
+            por_estado.setdefault(actuales[codigo], []).append(codigo)
+
+    cambiados = set()
+    for anterior, grupo in por_estado.items():
+        for inicio in range(0, len(grupo), TAMANO_BLOQUE):
+            bloque = grupo[inicio:inicio + TAMANO_BLOQUE]
+            resultado = conn.execute(
+                update(documentos)
+                .where(documentos.c.codigo.in_(bloque), documentos.c.estado == anterior)
+                .values(estado=nuevo_estado)
+            )
+            if resultado.rowcount == len(bloque):
+                cambiados.update(bloque)
+                continue
+            # Alguno cambió de estado: los que no quedaron en el nuevo estado no
+            # pasaron el filtro de la actualización y se rechazan. Uno que otra
+            # sesión llevó a ese mismo estado se cuenta como aplicado
+            ahora = _estados_actuales(conn, bloque)
+            for codigo in bloque:
+                if ahora.get(codigo) == nuevo_estado:
+                    cambiados.add(codigo)
+                else:
+                    rechazados.append({"codigo": codigo, "estado": ahora.get(codigo),
+                                       "motivo": "el estado cambió durante la transición"})
+
+    aplicados = [codigo for codigo in codigos if codigo in cambiados]
+    if aplicados:
+        conn.execute(insert(cambios_estado), [{
+            "documento_codigo": codigo,
+            "estado_anterior": actuales[codigo],
+            "nuevo_estado": nuevo_estado,
+            "comentarios": comentarios,
+            "fecha_cambio": fecha,
+        } for codigo in aplicados])
+        registrar_cambio(conn, "documentos", "cambios_estado")
+    return {"aplicados": aplicados, "rechazados": rechazados}
@@ -0,0 +1,211 @@
+import re
+import sys
+import argparse
+import difflib
+import unicodedata
+from collections import defaultdict
+from sqlalchemy import select, insert, update, delete, bindparam
+
+from base_datos import DB_URL, setup_database, personal
+from cache_tablas import registrar_cambio
+
+# Índice de identidad del personal: cada nombre se reduce a una clave sin
+# acentos, mayúsculas, títulos ni signos, con las palabras ordenadas. "Ing. Juan
+# Pérez" y "JUAN PEREZ" comparten la clave "juan perez" y se tratan como la
+# misma persona al cargar documentos y al conciliar duplicados
+TITULOS = {
+    "ing", "lic", "licda", "dr", "dra", "mtro", "mtra", "mc", "msc", "enf", "qfb", "cp",
+    "arq", "psic", "sr", "sra", "srta", "prof", "profa", "tec", "lae", "maf", "hna",
+}
+TAMANO_BLOQUE = 500
+_NO_ALFANUMERICO = re.compile(r"[^a-z0-9ñ ]+")
+# Siglas con puntos ("Q.F.B.") se unen antes de quitar los signos
+_SIGLAS = re.compile(r"\b(?:[a-zñ]\.){2,}")
+
+# Función para calcular la clave normalizada de un nombre ("" si no queda nada)
+def clave_nombre(nombre):
+    if not nombre:
+        return ""
+    texto = unicodedata.normalize("NFKD", nombre.lower().replace("ñ", "\0"))
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).replace("\0", "ñ")
+    texto = _SIGLAS.sub(lambda m: m.group(0).replace(".", ""), texto)
+    palabras = [p for p in _NO_ALFANUMERICO.sub(" ", texto).split() if p not in TITULOS]
+    return " ".join(sorted(palabras))
+
+# Función para resolver un conjunto de personas contra el directorio con una
+# sola consulta por bloque de claves; da de alta las que no existen. Recibe
+# filas de personal y devuelve {clave: id} de todas ellas
+def resolver_personal(conn, personas):
+    por_clave = {}
+    for persona in personas:
+        clave = clave_nombre(persona["nombre_completo"])
+        if clave:
+            por_clave.setdefault(clave, persona)
+
+    ids = {}
+    claves = list(por_clave)
+    for inicio in range(0, len(claves), TAMANO_BLOQUE):
+        bloque = claves[inicio:inicio + TAMANO_BLOQUE]
+        for clave, id_personal in conn.execute(
+            select(personal.c.clave_nombre, personal.c.id)
+            .where(personal.c.clave_nombre.in_(bloque))
+            .order_by(personal.c.id)
+        ):
+            ids.setdefault(clave, id_personal)
+
+    faltantes = [{**persona, "clave_nombre": clave} for clave, persona in por_clave.items() if clave not in ids]
+    if faltantes:
+        conn.execute(insert(personal), faltantes)
+        registrar_cambio(conn, "personal")
+        for clave, id_personal in conn.execute(
+            select(personal.c.clave_nombre, personal.c.id)
+            .where(personal.c.clave_nombre.in_([f["clave_nombre"] for f in faltantes]))
+        ):
+            ids.setdefault(clave, id_personal)
+    return ids
+
+# Función para agrupar el directorio por clave; devuelve solo los grupos con
+# más de una persona, cada uno ordenado con la fila que se conserva primero
+# (activa, con más datos capturados y la más antigua)
+def grupos_duplicados(conn):
+    grupos = defaultdict(list)
+    for fila in conn.execute(
+        select(personal.c.id, personal.c.nombre_completo, personal.c.puesto, personal.c.area,
+               personal.c.correo, personal.c.activo, personal.c.clave_nombre)
+    ).mappings():
+        clave = fila["clave_nombre"] or clave_nombre(fila["nombre_completo"])
+        if clave:
+            grupos[clave].append(dict(fila))
+
+    def prioridad(fila):
+        capturados = sum(1 for campo in ("puesto", "area", "correo") if fila[campo])
+        return (-(fila["activo"] or 0), -capturados, fila["id"])
+
+    return {clave: sorted(filas, key=prioridad) for clave, filas in grupos.items() if len(filas) > 1}
+
+# Función para fusionar un grupo de personas en la primera de `filas`: completa
+# sus datos vacíos con los de las demás y elimina las duplicadas. Devuelve
+# (cambios de la fila conservada, ids eliminados) sin ejecutar nada
+def _plan_fusion(filas):
+    conservada, duplicadas = filas[0], filas[1:]
+    cambios = {"b_id": conservada["id"], "activo": max(f["activo"] or 0 for f in filas)}
+    for campo in ("puesto", "area", "correo"):
+        cambios[campo] = conservada[campo] or next((f[campo] for f in duplicadas if f[campo]), conservada[campo])
+    return cambios, [f["id"] for f in duplicadas]
+
+# Función para conciliar todo el directorio: fusiona cada grupo de la misma
+# clave en una sola fila, con una actualización y un borrado por bloques.
+# Devuelve una fila por persona eliminada (nombre conservado y eliminado)
+def conciliar_personal(conn):
+    grupos = grupos_duplicados(conn)
+    actualizaciones, eliminados, informe = [], [], []
+    for filas in grupos.values():
+        cambios, ids = _plan_fusion(filas)
+        actualizaciones.append(cambios)
+        eliminados.extend(ids)
+        informe.extend(
+            {"conservado": filas[0]["nombre_completo"], "eliminado": f["nombre_completo"]} for f in filas[1:]
+        )
+    if actualizaciones:
+        for inicio in range(0, len(eliminados), TAMANO_BLOQUE):
+            conn.execute(delete(personal).where(personal.c.id.in_(eliminados[inicio:inicio + TAMANO_BLOQUE])))
+        conn.execute(
+            update(personal).where(personal.c.id == bindparam("b_id")),
+            actualizaciones
+        )
+        registrar_cambio(conn, "personal")
+    return informe
+
+# Función para sugerir pares de claves distintas pero parecidas (errores de
+# captura, un apellido de más) que la conciliación automática no fusiona. Solo
+# se comparan claves que comparten una palabra poco frecuente
+def sugerir_duplicados(conn, umbral=0.9, max_bloque=200):
+    claves = {}
+    for id_personal, nombre, clave in conn.execute(
+        select(personal.c.id, personal.c.nombre_completo, personal.c.clave_nombre)
+    ):
+        clave = clave or clave_nombre(nombre)
+        if clave:
+            claves.setdefault(clave, (id_personal, nombre))
+
+    bloques = defaultdict(list)
+    for clave in claves:
+        for palabra in set(clave.split()):
+            if len(palabra) > 2:
+                bloques[palabra].append(clave)
+
+    comparados, sugerencias = set(), []
+    for bloque in bloques.values():
+        if len(bloque) < 2 or len(bloque) > max_bloque:
+            continue
+        for i, a in enumerate(bloque):
+            comparador = difflib.SequenceMatcher(None, b=a)
+            for b in bloque[i + 1:]:
+                par = (a, b) if a < b else (b, a)
+                if par in comparados:
+                    continue
+                comparados.add(par)
+                comparador.set_seq1(b)
+                if comparador.real_quick_ratio() >= umbral and comparador.quick_ratio() >= umbral:
+                    similitud = comparador.ratio()
+                    if similitud >= umbral:
+                        sugerencias.append({
+                            "id_a": claves[a][0], "nombre_a": claves[a][1],
+                            "id_b": claves[b][0], "nombre_b": claves[b][1],
+                            "similitud": round(similitud, 3),
+                        })
+    return sorted(sugerencias, key=lambda s: -s["similitud"])
+
+# Función para fusionar manualmente a varias personas en `id_conservado`. Las
+# responsabilidades de los nombres eliminados con otra clave (los parecidos que
+# propone sugerir_duplicados) se reasignan al nombre conservado en la misma
+# transacción; las de la misma clave ya se resuelven a la persona conservada
+def fusionar_personal(conn, id_conservado, ids):
+    # referencias depende de este módulo (clave_nombre)
+    from referencias import reasignar_responsabilidades
+
+    filas = [dict(f) for f in conn.execute(
+        select(personal.c.id, personal.c.nombre_completo, personal.c.puesto, personal.c.area,
+               personal.c.correo, personal.c.activo)
+        .where(personal.c.id.in_([id_conservado, *ids]))
+    ).mappings()]
+    filas.sort(key=lambda f: f["id"] != id_conservado)
+    if len(filas) < 2 or filas[0]["id"] != id_conservado:
+        return 0
+    cambios, eliminados = _plan_fusion(filas)
+    for fila in filas[1:]:
+        reasignar_responsabilidades(conn, fila["nombre_completo"], filas[0]["nombre_completo"])
+    conn.execute(delete(personal).where(personal.c.id.in_(eliminados)))
+    conn.execute(update(personal).where(personal.c.id == bindparam("b_id")), [cambios])
+    registrar_cambio(conn, "personal")
+    return len(eliminados)
+
+# Punto de entrada para conciliar el directorio sin interfaz:
+#   python -m identidad [--aplicar] [--sugerencias] [--db URL]
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Conciliación de duplicados del directorio de personal")
+    parser.add_argument("--db", default=DB_URL, help=f"URL de la base de datos (por defecto {DB_URL})")
+    parser.add_argument("--aplicar", action="store_true", help="Fusionar los duplicados (por omisión solo se listan)")
+    parser.add_argument("--sugerencias", action="store_true", help="Listar también los nombres parecidos")
+    args = parser.parse_args(argv)
+
+    engine, *_ = setup_database(args.db)
+    with engine.begin() as conn:
+        if args.aplicar:
+            informe = conciliar_personal(conn)
+            for fila in informe:
+                print(f"fusionado  {fila['eliminado']}  ->  {fila['conservado']}")
+            print(f"{len(informe)} registro(s) fusionados")
+        else:
+            grupos = grupos_duplicados(conn)
+            for filas in grupos.values():
+                print(" | ".join(f["nombre_completo"] for f in filas))
+            print(f"{len(grupos)} grupo(s) de duplicados; use --aplicar para fusionarlos")
+        if args.sugerencias:
+            for s in sugerir_duplicados(conn):
+                print(f"{s['similitud']:.3f}  {s['nombre_a']}  ~  {s['nombre_b']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+import pandas as pd
+from sqlalchemy import select, func, case, cast, String
+
+from base_datos import documentos, registros, personal, cambios_estado
+
+# Indicadores del Dashboard. Todas las funciones agregan en SQL (GROUP BY) y
+# devuelven DataFrames pequeños; ninguna carga tablas completas en memoria
+
+# Documentos por estado
+def documentos_por_estado(conn):
+    return pd.read_sql(
+        select(documentos.c.estado, func.count().label("documentos"))
+        .group_by(documentos.c.estado)
+        .order_by(documentos.c.estado),
+        conn
+    )
+
+# Registros agrupados por una columna (medio_almacenamiento, disposicion_final, ...)
+def registros_por(conn, columna):
+    etiqueta = func.coalesce(func.nullif(registros.c[columna], ""), "Sin especificar").label(columna)
+    return pd.read_sql(
+        select(etiqueta, func.count().label("registros"))
+        .group_by(etiqueta)
+        .order_by(etiqueta),
+        conn
+    )
+
+# Cambios de estado por mes y estado destino
+def transiciones_por_mes(conn):
+    mes = func.substr(cast(cambios_estado.c.fecha_cambio, String), 1, 7).label("mes")
+    return pd.read_sql(
+        select(mes, cambios_estado.c.nuevo_estado, func.count().label("cambios"))
+        .where(cambios_estado.c.fecha_cambio.is_not(None))
+        .group_by(mes, cambios_estado.c.nuevo_estado)
+        .order_by(mes),
+        conn
+    )
+
+# Personal activo e inactivo por área
+def personal_por_area(conn):
+    area = func.coalesce(func.nullif(personal.c.area, ""), "Sin área").label("area")
+    return pd.read_sql(
+        select(
+            area,
+            func.sum(case((personal.c.activo == 1, 1), else_=0)).label("activos"),
+            func.sum(case((personal.c.activo == 1, 0), else_=1)).label("inactivos"),
+        )
+        .group_by(area)
+        .order_by(area),
+        conn
+    )
@@ -0,0 +1,422 @@
+import io
+import os
+import sys
+import json
+import shutil
+import zipfile
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import insert, update, select, bindparam
+
+from base_datos import DB_URL, setup_database, documentos, documento_pasos, documento_riesgos
+from secciones import PATRON_FORMATO, filas_secciones, guardar_secciones, fila_paso, fila_riesgo
+from cache_tablas import registrar_cambio
+from busqueda import indexar_documentos
+from fechas import parsear_fecha
+from versiones import huellas_documento, registrar_revisiones
+from esquema import validar_procedimiento, validador_elementos
+from lector_json import recorrer_procedimiento
+from identidad import resolver_personal
+from referencias import indexar_documentos_personal
+
+# Columnas que se actualizan cuando el documento ya existe; el estado y los
+# comentarios de revisión pertenecen al ciclo documental y no se sobrescriben
+COLUMNAS_CONTENIDO = [
+    "nombre_documento", "version", "fecha_emision", "fecha_revision", "objetivo",
+    "alcance", "responsable_actualizacion", "responsable_ejecucion",
+    "responsable_supervision", "pasos", "historial_cambios", "riesgos",
+    "barreras_seguridad", "documentos_referencia", "autorizaciones", "revision_programada",
+    "huella_contenido"
+]
+
+# Los archivos de este tamaño o más se leen en flujo (ver cargar_archivo_grande)
+UMBRAL_FLUJO = 8 * 1024 * 1024
+FILAS_POR_BLOQUE = 1000
+
+# Listas que la lectura en flujo recorre elemento a elemento y columna de
+# documentos en la que se guardan
+SECUENCIAS_FLUJO = {
+    ("Desarrollo del Proceso", "table"): "pasos",
+    ("Gestión de Riesgos", "Ponderación de riesgos"): "riesgos",
+    ("Gestión de Riesgos", "Barreras de seguridad"): "barreras_seguridad",
+}
+TIPOS_RIESGO = {"riesgos": "riesgo", "barreras_seguridad": "barrera"}
+_VALIDADORES_FLUJO = {ruta: validador_elementos(*ruta) for ruta in SECUENCIAS_FLUJO}
+
+# Función para extraer los roles responsables de una lista de pasos
+def roles_de_pasos(pasos):
+    roles = []
+    for paso in pasos:
+        responsable = paso.get('Responsable', '')
+        if responsable and responsable not in roles:
+            roles.append(responsable)
+    return roles
+
+# Función para obtener el personal mencionado en las autorizaciones. Se aceptan
+# dos formatos: una lista de {"Nombre", "Puesto"} o el par de diccionarios
+# nombres/cargos que se muestra en la pestaña Documentos
+def personal_de_autorizaciones(autorizaciones):
+    personas = []
+    for auth in autorizaciones:
+        if isinstance(auth, dict) and auth.get("Nombre") and auth.get("Puesto"):
+            personas.append((auth["Nombre"], auth["Puesto"]))
+
+    if len(autorizaciones) == 2 and all(isinstance(a, dict) for a in autorizaciones):
+        nombres, cargos = autorizaciones
+        for rol in ("Elaboró", "Revisó", "Autorizó"):
+            nombre = nombres.get(rol, "")
+            puesto = cargos.get(f"Cargo {rol}", "")
+            if nombre and puesto:
+                personas.append((nombre, puesto))
+
+    return [
+        {"nombre_completo": nombre, "puesto": puesto, "area": "", "correo": "", "activo": 1}
+        for nombre, puesto in personas
+    ]
+
+# Función para convertir el JSON de un procedimiento en una fila de documentos
+def mapear_documento(json_content):
+    pasos = json_content.get("Desarrollo del Proceso", {}).get("table", [])
+    registro = {
+        "codigo": json_content.get("Código", ""),
+        "nombre_documento": json_content.get("Nombre del Documento", ""),
+        "version": json_content.get("Versión vigente", ""),
+        "fecha_emision": json_content.get("Fecha de emisión", ""),
+        "fecha_revision": json_content.get("Fecha de revisión", ""),
+        "revision_programada": parsear_fecha(json_content.get("Fecha de revisión", "")),
+        "objetivo": json_content.get("Objetivo", ""),
+        "alcance": json_content.get("Alcance", ""),
+        "responsable_actualizacion": json_content.get("Responsabilidades", {}).get("Actualización", ""),
+        "responsable_ejecucion": ", ".join(roles_de_pasos(pasos)),
+        "responsable_supervision": json_content.get("Responsabilidades", {}).get("Supervisión", ""),
+        "pasos": json.dumps(pasos, ensure_ascii=False),
+        "historial_cambios": json.dumps(json_content.get("Control de Cambios", {}).get("table", []), ensure_ascii=False),
+        "riesgos": json.dumps(json_content.get("Gestión de Riesgos", {}).get("Ponderación de riesgos", []), ensure_ascii=False),
+        "barreras_seguridad": json.dumps(json_content.get("Gestión de Riesgos", {}).get("Barreras de seguridad", []), ensure_ascii=False),
+        "documentos_referencia": json.dumps(json_content.get("Documentos de Referencia", {}).get("table", []), ensure_ascii=False),
+        "autorizaciones": json.dumps(json_content.get("Autorizaciones", {}).get("table", []), ensure_ascii=False),
+        "estado": "Borrador",
+        "comentarios_revision": ""
+    }
+    # La huella se calcula sobre los campos ya normalizados, de modo que el
+    # formato del archivo (espacios, orden de claves) no la altera
+    registro["huella_contenido"] = huellas_documento(registro)[1]
+    return registro
+
+# Función para expandir los archivos ZIP en sus JSON internos.
+# Recibe y devuelve pares (nombre, contenido en bytes)
+def expandir_archivos(archivos):
+    expandidos = []
+    for nombre, contenido in archivos:
+        if nombre.lower().endswith(".zip"):
+            with zipfile.ZipFile(io.BytesIO(contenido)) as zf:
+                for miembro in zf.infolist():
+                    if not miembro.is_dir() and miembro.filename.lower().endswith(".json"):
+                        expandidos.append((f"{nombre}/{miembro.filename}", zf.read(miembro)))
+        else:
+            expandidos.append((nombre, contenido))
+    return expandidos
+
+# Directorio donde la interfaz deja los archivos rechazados (opcional)
+CUARENTENA = os.environ.get("CONTROLDOC_CUARENTENA") or None
+
+# Función que se ejecuta en los procesos de trabajo: decodifica, valida contra
+# el esquema y mapea un archivo. Los archivos que no cumplen el esquema se
+# devuelven con todos sus errores y nunca llegan a la base de datos; los avisos
+# (p. ej. una fecha irreconocible) se informan sin impedir la carga
+def _parsear_archivo(archivo):
+    nombre, contenido = archivo
+    avisos = []
+    try:
+        try:
+            # utf-8-sig acepta el BOM igual que la lectura en flujo (lector_json),
+            # así el resultado no depende del tamaño del archivo
+            json_content = json.loads(contenido.decode("utf-8-sig") if isinstance(contenido, bytes) else contenido)
+        except ValueError as e:
+            errores = [f"JSON inválido: {e}"]
+        else:
+            errores = validar_procedimiento(json_content, avisos)
+        if errores:
+            return {"archivo": nombre, "registro": None, "personal": [], "secciones": None,
+                    "error": None, "errores": errores}
+        registro = mapear_documento(json_content)
+        personas = personal_de_autorizaciones(json.loads(registro["autorizaciones"]))
+        return {"archivo": nombre, "registro": registro, "personal": personas,
+                "secciones": filas_secciones(registro), "error": None, "errores": [], "avisos": avisos}
+    except Exception as e:
+        return {"archivo": nombre, "registro": None, "personal": [], "secciones": None,
+                "error": str(e), "errores": []}
+
+# Función para copiar un archivo rechazado a la cuarentena junto con un
+# archivo .errores.txt que lista sus errores de esquema
+def poner_en_cuarentena(directorio, nombre, contenido, errores):
+    os.makedirs(directorio, exist_ok=True)
+    destino = os.path.join(directorio, nombre.replace("\\", "/").strip("/").replace("/", "__"))
+    with open(destino, "wb") as f:
+        if hasattr(contenido, "read"):
+            shutil.copyfileobj(contenido, f)
+        else:
+            f.write(contenido)
+    with open(destino + ".errores.txt", "w", encoding="utf-8") as f:
+        f.write("\n".join(errores) + "\n")
+    return destino
+
+# Función para guardar un lote ya parseado en una sola transacción
+def _guardar_lote(conn, parseados):
+    resultados = []
+    por_codigo = {}
+    for item in parseados:
+        if item["errores"]:
+            resultados.append({"archivo": item["archivo"], "codigo": "", "resultado": "rechazado",
+                               "detalle": "; ".join(item["errores"]), "errores": item["errores"]})
+            continue
+        if item["error"]:
+            resultados.append({"archivo": item["archivo"], "codigo": "", "resultado": "error", "detalle": item["error"]})
+            continue
+        codigo = item["registro"]["codigo"]
+        if codigo in por_codigo:
+            previo = por_codigo[codigo]
+            resultados.append({"archivo": previo["archivo"], "codigo": codigo, "resultado": "omitido",
+                               "detalle": f"reemplazado por {item['archivo']} en el mismo lote"})
+        por_codigo[codigo] = item
+
+    if por_codigo:
+        # Una sola consulta trae la huella de los documentos existentes; los que
+        # no cambiaron se informan como "sin cambios" y no se vuelven a escribir
+        existentes = dict(conn.execute(
+            select(documentos.c.codigo, documentos.c.huella_contenido)
+            .where(documentos.c.codigo.in_(list(por_codigo)))
+        ).all())
+        for codigo in [c for c, item in por_codigo.items()
+                       if c in existentes and existentes[c] == item["registro"]["huella_contenido"]]:
+            item = por_codigo.pop(codigo)
+            resultados.append({"archivo": item["archivo"], "codigo": codigo, "resultado": "sin cambios",
+                               "detalle": "contenido idéntico al registrado"})
+
+    if por_codigo:
+        nuevos = [item["registro"] for codigo, item in por_codigo.items() if codigo not in existentes]
+        cambios = [
+            {**{col: item["registro"][col] for col in COLUMNAS_CONTENIDO}, "b_codigo": codigo}
+            for codigo, item in por_codigo.items() if codigo in existentes
+        ]
+        if nuevos:
+            conn.execute(insert(documentos), nuevos)
+        if cambios:
+            conn.execute(
+                update(documentos).where(documentos.c.codigo == bindparam("b_codigo")),
+                cambios
+            )
+        guardar_secciones(conn, por_codigo, [item["secciones"] for item in por_codigo.values()])
+        indexar_documentos(conn, por_codigo)
+        revisiones = registrar_revisiones(conn, [item["registro"] for item in por_codigo.values()])
+        indexar_documentos_personal(conn, [item["registro"] for item in por_codigo.values()])
+        registrar_cambio(conn, "documentos")
+
+        # Alta de personal nuevo: los nombres del lote se resuelven por su clave
+        # normalizada con una sola consulta, así "Ing. Juan Pérez" y "Juan Perez"
+        # no se registran como dos personas
+        resolver_personal(conn, [persona for item in por_codigo.values() for persona in item["personal"]])
+
+        for codigo, item in por_codigo.items():
+            detalle = f"revisión {revisiones[codigo]}" if revisiones[codigo] else "sin cambios de contenido"
+            avisos = item.get("avisos", [])
+            resultados.append({
+                "archivo": item["archivo"],
+                "codigo": codigo,
+                "resultado": "actualizado" if codigo in existentes else "insertado",
+                "detalle": "; ".join([detalle] + [f"aviso: {a}" for a in avisos]),
+                "avisos": avisos,
+            })
+    return resultados
+
+# Función para la primera pasada de la lectura en flujo: valida el documento
+# (las listas largas elemento a elemento) y arma su fila de documentos. Las
+# listas no se conservan como objetos, pero su texto serializado sí: la fila de
+# documentos, la huella y el historial de versiones guardan pasos y riesgos
+# completos. La memoria no está acotada; crece con ese texto (del orden del
+# tamaño del archivo) en lugar de con el árbol de objetos, varias veces mayor
+def _parsear_en_flujo(nombre, flujo):
+    errores, avisos = [], []
+    textos = {columna: [] for columna in SECUENCIAS_FLUJO.values()}
+    roles, formatos = [], set()
+
+    def al_elemento(ruta, indice, elemento):
+        columna = SECUENCIAS_FLUJO[ruta]
+        # El primer elemento se conserva en el documento y lo valida el esquema completo
+        if indice:
+            _VALIDADORES_FLUJO[ruta](elemento, f"{'.'.join(ruta)}[{indice}]", errores, avisos)
+        textos[columna].append(json.dumps(elemento, ensure_ascii=False))
+        if columna == "pasos" and isinstance(elemento, dict):
+            fila = fila_paso("", indice, elemento)
+            if fila["responsable"] and fila["responsable"] not in roles:
+                roles.append(fila["responsable"])
+            formatos.update(PATRON_FORMATO.findall(fila["descripcion"] or ""))
+
+    try:
+        try:
+            json_content = recorrer_procedimiento(flujo, SECUENCIAS_FLUJO, al_elemento)
+        except ValueError as e:
+            errores = [f"JSON inválido: {e}"]
+        else:
+            errores = validar_procedimiento(json_content, avisos) + errores
+        if errores:
+            return {"archivo": nombre, "registro": None, "personal": [], "secciones": None,
+                    "error": None, "errores": errores}
+        registro = mapear_documento(json_content)
+        # Mismo texto que json.dumps de la lista completa, así la huella coincide
+        # con la de un archivo pequeño del mismo contenido
+        for columna, partes in textos.items():
+            registro[columna] = "[" + ", ".join(partes) + "]"
+        registro["responsable_ejecucion"] = ", ".join(roles)
+        registro["huella_contenido"] = huellas_documento(registro)[1]
+        # Las secciones en flujo se insertan en la segunda pasada
+        secciones = filas_secciones({**registro, **{columna: "[]" for columna in textos}})
+        secciones["documento_formatos"] = [
+            {"documento_codigo": registro["codigo"], "formato": formato} for formato in sorted(formatos)
+        ]
+        personas = personal_de_autorizaciones(json.loads(registro["autorizaciones"]))
+        return {"archivo": nombre, "registro": registro, "personal": personas,
+                "secciones": secciones, "error": None, "errores": [], "avisos": avisos}
+    except Exception as e:
+        return {"archivo": nombre, "registro": None, "personal": [], "secciones": None,
+                "error": str(e), "errores": []}
+
+# Función para la segunda pasada: inserta los pasos y riesgos del documento
+# por bloques de FILAS_POR_BLOQUE filas
+def _insertar_secciones_en_flujo(conn, codigo, flujo):
+    bloques = {documento_pasos: [], documento_riesgos: []}
+
+    def al_elemento(ruta, indice, elemento):
+        columna = SECUENCIAS_FLUJO[ruta]
+        if columna == "pasos":
+            if not isinstance(elemento, dict):
+                return
+            tabla, fila = documento_pasos, fila_paso(codigo, indice, elemento)
+        else:
+            tabla, fila = documento_riesgos, fila_riesgo(codigo, indice, TIPOS_RIESGO[columna], elemento)
+        bloques[tabla].append(fila)
+        if len(bloques[tabla]) >= FILAS_POR_BLOQUE:
+            conn.execute(insert(tabla), bloques[tabla])
+            bloques[tabla] = []
+
+    recorrer_procedimiento(flujo, SECUENCIAS_FLUJO, al_elemento)
+    for tabla, filas in bloques.items():
+        if filas:
+            conn.execute(insert(tabla), filas)
+
+# Función para cargar un procedimiento muy grande sin construir su árbol JSON:
+# una pasada valida y arma la fila del documento, y si el contenido cambió una
+# segunda pasada inserta pasos y riesgos por bloques, todo en una transacción.
+# Solo las filas de las tablas hijas se procesan en bloques de tamaño fijo; el
+# texto de pasos y riesgos se mantiene completo (ver _parsear_en_flujo).
+# `flujo` es un archivo binario que admita seek; devuelve un resultado como cargar_lote
+def cargar_archivo_grande(engine, nombre, flujo, cuarentena=None):
+    item = _parsear_en_flujo(nombre, flujo)
+    if item["errores"] and cuarentena:
+        flujo.seek(0)
+        poner_en_cuarentena(cuarentena, nombre, flujo, item["errores"])
+    try:
+        with engine.begin() as conn:
+            resultado = _guardar_lote(conn, [item])[0]
+            if resultado["resultado"] in ("insertado", "actualizado"):
+                flujo.seek(0)
+                _insertar_secciones_en_flujo(conn, resultado["codigo"], flujo)
+                indexar_documentos(conn, [resultado["codigo"]])
+    except Exception as e:
+        resultado = {"archivo": nombre, "codigo": (item["registro"] or {}).get("codigo", ""),
+                     "resultado": "error", "detalle": f"carga revertida: {e}"}
+    return resultado
+
+# Función principal de carga masiva: parsea y valida en paralelo y guarda por
+# lotes. Devuelve un resultado por archivo (insertado, actualizado, sin cambios,
+# omitido, rechazado o error); con `cuarentena` los rechazados se copian ahí
+def cargar_lote(engine, archivos, tamano_lote=200, trabajadores=None, cuarentena=None):
+    archivos = expandir_archivos(archivos)
+    # Los archivos muy grandes se cargan en flujo, uno por transacción
+    grandes = [archivo for archivo in archivos if len(archivo[1]) >= UMBRAL_FLUJO]
+    archivos = [archivo for archivo in archivos if len(archivo[1]) < UMBRAL_FLUJO]
+    if trabajadores is None:
+        trabajadores = min(os.cpu_count() or 1, 8)
+
+    if trabajadores > 1 and len(archivos) > 1:
+        with ProcessPoolExecutor(max_workers=trabajadores) as pool:
+            parseados = list(pool.map(_parsear_archivo, archivos, chunksize=16))
+    else:
+        parseados = [_parsear_archivo(archivo) for archivo in archivos]
+
+    if cuarentena:
+        for (nombre, contenido), item in zip(archivos, parseados):
+            if item["errores"]:
+                poner_en_cuarentena(cuarentena, nombre, contenido, item["errores"])
+
+    resultados = []
+    for inicio in range(0, len(parseados), tamano_lote):
+        lote = parseados[inicio:inicio + tamano_lote]
+        try:
+            with engine.begin() as conn:
+                resultados.extend(_guardar_lote(conn, lote))
+        except Exception as e:
+            # La transacción del lote se revierte completa
+            resultados.extend(
+                {"archivo": item["archivo"], "codigo": (item["registro"] or {}).get("codigo", ""),
+                 "resultado": "error", "detalle": f"lote revertido: {e}"}
+                for item in lote
+            )
+    for nombre, contenido in grandes:
+        resultados.append(cargar_archivo_grande(engine, nombre, io.BytesIO(contenido), cuarentena))
+    return resultados
+
+# Función para resolver las rutas de la línea de comandos; los directorios
+# se recorren de forma recursiva buscando archivos .json y .zip
+def rutas_de_entrada(rutas):
+    encontradas = []
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            for raiz, _, nombres in os.walk(ruta):
+                encontradas.extend(
+                    os.path.join(raiz, n) for n in sorted(nombres)
+                    if n.lower().endswith((".json", ".zip"))
+                )
+        else:
+            encontradas.append(ruta)
+    return encontradas
+
+# Punto de entrada para la carga masiva sin interfaz:
+#   python -m ingesta <directorio|archivo.json|lote.zip> [...]
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Carga masiva de procedimientos JSON en la base de datos.")
+    parser.add_argument("archivos", nargs="+", help="Archivos .json/.zip o directorios a cargar")
+    parser.add_argument("--db", default=DB_URL, help=f"URL de la base de datos (por defecto {DB_URL})")
+    parser.add_argument("--lote", type=int, default=200, help="Documentos por transacción")
+    parser.add_argument("--trabajadores", type=int, default=None, help="Procesos para parsear los JSON")
+    parser.add_argument("--cuarentena", default=CUARENTENA,
+                        help="Directorio donde copiar los archivos rechazados por el esquema")
+    args = parser.parse_args(argv)
+
+    archivos, grandes = [], []
+    for ruta in rutas_de_entrada(args.archivos):
+        # Los JSON grandes no se leen a memoria: se cargan en flujo desde el disco
+        if ruta.lower().endswith(".json") and os.path.getsize(ruta) >= UMBRAL_FLUJO:
+            grandes.append(ruta)
+            continue
+        with open(ruta, "rb") as f:
+            archivos.append((ruta, f.read()))
+
+    engine, *_ = setup_database(args.db)
+    resultados = cargar_lote(engine, archivos, tamano_lote=args.lote, trabajadores=args.trabajadores,
+                             cuarentena=args.cuarentena)
+    for ruta in grandes:
+        with open(ruta, "rb") as f:
+            resultados.append(cargar_archivo_grande(engine, ruta, f, args.cuarentena))
+
+    resumen = {}
+    for r in resultados:
+        resumen[r["resultado"]] = resumen.get(r["resultado"], 0) + 1
+        linea = f"{r['resultado']:<12} {r['codigo'] or '-':<15} {r['archivo']}"
+        print(f"{linea}  ({r['detalle']})" if r["detalle"] else linea)
+    print("Resumen: " + ", ".join(f"{k}={v}" for k, v in sorted(resumen.items())))
+    return 1 if resumen.get("error") or resumen.get("rechazado") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+import json
+import codecs
+
+# Lector incremental de JSON para procedimientos muy grandes. Lee el archivo por
+# bloques y recorre los objetos clave por clave; las listas largas se entregan
+# elemento a elemento, de modo que nunca se construye el árbol completo en memoria
+TAMANO_LECTURA = 1 << 16
+_ESPACIOS = " \t\n\r"
+_NUMERICOS = "0123456789.eE+-"
+_decodificador = json.JSONDecoder()
+
+class LectorJSON:
+    def __init__(self, flujo, tamano_lectura=TAMANO_LECTURA):
+        self.flujo = flujo
+        self.tamano_lectura = tamano_lectura
+        self.decodificador = codecs.getincrementaldecoder("utf-8-sig")()
+        self.buffer = ""
+        self.pos = 0
+        self.consumidos = 0
+        self.agotado = False
+
+    # Función para agregar al buffer el siguiente bloque del archivo (al menos
+    # `minimo` caracteres); descarta lo ya consumido. Devuelve False al final
+    def _leer(self, minimo=1):
+        if self.agotado:
+            return False
+        self.consumidos += self.pos
+        partes = [self.buffer[self.pos:]]
+        leidos = 0
+        while leidos < minimo:
+            bloque = self.flujo.read(max(self.tamano_lectura, minimo))
+            if isinstance(bloque, str):
+                texto = bloque
+            else:
+                texto = self.decodificador.decode(bloque, final=not bloque)
+            partes.append(texto)
+            leidos += len(texto)
+            if not bloque:
+                self.agotado = True
+                break
+        self.buffer = "".join(partes)
+        self.pos = 0
+        return leidos > 0 or not self.agotado
+
+    def _error(self, mensaje):
+        return ValueError(f"{mensaje} (carácter {self.consumidos + self.pos})")
+
+    # Función para ver el siguiente carácter significativo sin consumirlo ("" al final)
+    def siguiente(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _ESPACIOS:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._leer():
+                return ""
+
+    def _consumir(self, caracter):
+        if self.siguiente() != caracter:
+            raise self._error(f"se esperaba '{caracter}'")
+        self.pos += 1
+
+    # Función para decodificar un valor completo. Si el valor queda cortado al
+    # final del buffer se lee más (cada vez el doble) y se vuelve a intentar
+    def valor(self):
+        self.siguiente()
+        extra = self.tamano_lectura
+        while True:
+            try:
+                valor, fin = _decodificador.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                if not self._leer(extra):
+                    raise self._error(e.msg)
+                extra *= 2
+                continue
+            # Un número o literal al final del buffer puede continuar en el
+            # siguiente bloque ("1." o "1.5e" se decodifican como 1 y 1.5)
+            if not self.agotado and (fin == len(self.buffer) or self.buffer[fin] in _NUMERICOS):
+                self._leer(extra)
+                extra *= 2
+                continue
+            self.pos = fin
+            return valor
+
+    # Generador de los elementos de una lista, decodificados de uno en uno
+    def elementos(self):
+        self._consumir("[")
+        if self.siguiente() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.valor()
+            caracter = self.siguiente()
+            self.pos += 1
+            if caracter == "]":
+                return
+            if caracter != ",":
+                self.pos -= 1
+                raise self._error("se esperaba ',' o ']'")
+
+    # Generador de las claves de un objeto. Quien lo recorre debe consumir el
+    # valor de cada clave (con valor(), elementos() o claves()) antes de pedir la siguiente
+    def claves(self):
+        self._consumir("{")
+        if self.siguiente() == "}":
+            self.pos += 1
+            return
+        while True:
+            if self.siguiente() != '"':
+                raise self._error("se esperaba el nombre de una clave")
+            clave = self.valor()
+            self._consumir(":")
+            yield clave
+            caracter = self.siguiente()
+            self.pos += 1
+            if caracter == "}":
+                return
+            if caracter != ",":
+                self.pos -= 1
+                raise self._error("se esperaba ',' o '}'")
+
+    # Función para comprobar que no queda contenido después del valor principal
+    def terminar(self):
+        if self.siguiente() != "":
+            raise self._error("contenido adicional después del JSON")
+
+# Función para recorrer un procedimiento en flujo. `secuencias` es un conjunto
+# de rutas de claves (tuplas) cuyas listas se entregan a `al_elemento(ruta,
+# indice, elemento)` sin guardarlas. Devuelve el resto del documento; en cada
+# lista recorrida en flujo solo se conserva su primer elemento
+def recorrer_procedimiento(flujo, secuencias, al_elemento):
+    lector = LectorJSON(flujo)
+    prefijos = {ruta[:i] for ruta in secuencias for i in range(1, len(ruta))}
+
+    def recorrer_objeto(ruta):
+        contenido = {}
+        for clave in lector.claves():
+            subruta = ruta + (clave,)
+            siguiente = lector.siguiente()
+            if subruta in secuencias and siguiente == "[":
+                contenido[clave] = []
+                for indice, elemento in enumerate(lector.elementos()):
+                    if indice == 0:
+                        contenido[clave].append(elemento)
+                    al_elemento(subruta, indice, elemento)
+            elif subruta in prefijos and siguiente == "{":
+                contenido[clave] = recorrer_objeto(subruta)
+            else:
+                contenido[clave] = lector.valor()
+        return contenido
+
+    documento = recorrer_objeto(()) if lector.siguiente() == "{" else lector.valor()
+    lector.terminar()
+    return documento
+
+def _truncar(valor, max_texto, max_elementos):
+    if isinstance(valor, str):
+        return valor if len(valor) <= max_texto else valor[:max_texto] + "…"
+    if isinstance(valor, list):
+        muestra = [_truncar(v, max_texto, max_elementos) for v in valor[:max_elementos]]
+        if len(valor) > max_elementos:
+            muestra.append(f"… {len(valor) - max_elementos} elemento(s) más")
+        return muestra
+    if isinstance(valor, dict):
+        return {k: _truncar(v, max_texto, max_elementos) for k, v in valor.items()}
+    return valor
+
+# Función para generar una vista previa resumida de un JSON en flujo: los
+# textos se recortan y de cada lista se muestran solo los primeros elementos
+# junto con el número de los que se omiten
+def resumir_json(flujo, max_texto=120, max_elementos=3):
+    lector = LectorJSON(flujo)
+
+    def resumir():
+        siguiente = lector.siguiente()
+        if siguiente == "{":
+            return {clave: resumir() for clave in lector.claves()}
+        if siguiente == "[":
+            muestra, total = [], 0
+            for elemento in lector.elementos():
+                if total < max_elementos:
+                    muestra.append(_truncar(elemento, max_texto, max_elementos))
+                total += 1
+            if total > max_elementos:
+                muestra.append(f"… {total - max_elementos} elemento(s) más")
+            return muestra
+        return _truncar(lector.valor(), max_texto, max_elementos)
+
+    resumen = resumir()
+    lector.terminar()
+    return resumen
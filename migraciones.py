@@ -0,0 +1,205 @@
+from datetime import datetime
+from sqlalchemy import insert, select, update, delete, inspect, bindparam, cast, func, String
+
+from base_datos import (
+    metadata, esquema_version, documentos, registros, personal, cambios_estado,
+    documento_pasos, documento_formatos, contenidos, documento_revisiones, referencias_personal
+)
+from busqueda import crear_indice, indexar_documentos
+from revisiones import recalcular_revisiones
+from versiones import CAMPOS_VERSIONADOS, huellas_documento, registrar_revisiones
+from secciones import PATRON_FORMATO, TABLAS_SECCIONES, filas_secciones, guardar_secciones
+from identidad import clave_nombre
+from referencias import reconstruir_indice
+
+# Función para añadir a una tabla existente una columna nueva del esquema;
+# create_all solo crea tablas completas
+def _agregar_columna(conn, columna):
+    tabla = columna.table.name
+    if columna.name not in {c["name"] for c in inspect(conn).get_columns(tabla)}:
+        tipo = columna.type.compile(dialect=conn.dialect)
+        conn.exec_driver_sql(f"ALTER TABLE {tabla} ADD COLUMN {columna.name} {tipo}")
+
+# Migración 1: índices secundarios sobre las columnas de búsqueda frecuente.
+# Las bases nuevas ya los reciben en create_all; checkfirst evita duplicarlos.
+# Se nombran explícitamente: los índices de migraciones posteriores pueden
+# depender de columnas que aún no existen en este punto
+INDICES_M001 = {
+    "ix_cambios_estado_documento_fecha", "ix_registros_documento_origen", "ix_registros_estado",
+    "ix_documentos_estado", "ix_documentos_responsable_actualizacion",
+}
+
+def _m001_indices(conn):
+    for tabla in (documentos, registros, cambios_estado):
+        for indice in tabla.indexes:
+            if indice.name in INDICES_M001:
+                indice.create(conn, checkfirst=True)
+
+# Migración 2: tablas hijas con las secciones del procedimiento, pobladas a
+# partir de las columnas JSON de los documentos existentes
+def _m002_secciones(conn, tamano_lote=500):
+    metadata.create_all(conn, tables=TABLAS_SECCIONES)
+    columnas = [documentos.c.codigo, documentos.c.pasos, documentos.c.riesgos,
+                documentos.c.barreras_seguridad, documentos.c.documentos_referencia,
+                documentos.c.historial_cambios, documentos.c.autorizaciones]
+    filas = conn.execute(select(*columnas)).mappings().all()
+    for inicio in range(0, len(filas), tamano_lote):
+        lote = [filas_secciones(fila) for fila in filas[inicio:inicio + tamano_lote]]
+        codigos = [fila["codigo"] for fila in filas[inicio:inicio + tamano_lote]]
+        guardar_secciones(conn, codigos, lote)
+
+# Migración 3: índice documento -> formatos, calculado desde la tabla de pasos
+def _m003_formatos(conn):
+    metadata.create_all(conn, tables=[documento_formatos])
+    conn.execute(delete(documento_formatos))
+    pares = set()
+    for codigo, descripcion in conn.execute(
+        select(documento_pasos.c.documento_codigo, documento_pasos.c.descripcion)
+    ):
+        pares.update((codigo, formato) for formato in PATRON_FORMATO.findall(descripcion or ""))
+    if pares:
+        conn.execute(insert(documento_formatos), [
+            {"documento_codigo": codigo, "formato": formato} for codigo, formato in sorted(pares)
+        ])
+
+# Migración 4: índice de texto completo para la búsqueda de procedimientos
+def _m004_busqueda(conn):
+    crear_indice(conn)
+    indexar_documentos(conn)
+
+# Migración 5: fecha de revisión normalizada e indexada para el calendario de
+# revisiones; se calcula desde el texto fecha_revision de cada documento
+def _m005_revision_programada(conn):
+    _agregar_columna(conn, documentos.c.revision_programada)
+    for indice in documentos.indexes:
+        if indice.name == "ix_documentos_revision_programada":
+            indice.create(conn, checkfirst=True)
+    recalcular_revisiones(conn)
+
+# Migración 6: fecha_cambio como marca de tiempo. Los valores guardados como
+# texto (str(datetime) o ISO con "T") se reescriben en el formato canónico; en
+# PostgreSQL además se cambia el tipo de la columna
+def _m006_fecha_cambio(conn):
+    columna = cambios_estado.c.fecha_cambio
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql(
+            "ALTER TABLE cambios_estado ALTER COLUMN fecha_cambio TYPE TIMESTAMP "
+            "USING NULLIF(fecha_cambio::text, '')::timestamp"
+        )
+        return
+    textos = conn.execute(select(cast(columna, String)).distinct().where(columna.is_not(None))).scalars().all()
+    cambios, invalidas = [], []
+    for texto in textos:
+        try:
+            cambios.append({"b_texto": texto, "fecha_cambio": datetime.fromisoformat(texto.strip())})
+        except ValueError:
+            invalidas.append(texto)
+    if cambios:
+        conn.execute(
+            update(cambios_estado).where(cast(columna, String) == bindparam("b_texto")),
+            cambios
+        )
+    # Las fechas irreconocibles quedan en NULL; el texto original se conserva
+    # al final de los comentarios del cambio
+    for texto in invalidas:
+        conn.execute(
+            update(cambios_estado)
+            .where(cast(columna, String) == texto)
+            .values(
+                fecha_cambio=None,
+                comentarios=func.coalesce(cambios_estado.c.comentarios, "") + f" [fecha original: {texto}]"
+            )
+        )
+
+# Migración 7: historial de versiones; cada documento existente recibe su
+# revisión 1 con el contenido actual
+def _m007_revisiones(conn, tamano_lote=500):
+    metadata.create_all(conn, tables=[contenidos, documento_revisiones])
+    columnas = [documentos.c.codigo] + [documentos.c[c] for c in CAMPOS_VERSIONADOS]
+    filas = conn.execute(select(*columnas)).mappings().all()
+    for inicio in range(0, len(filas), tamano_lote):
+        registrar_revisiones(conn, [dict(fila) for fila in filas[inicio:inicio + tamano_lote]])
+
+# Migración 8: huella del contenido de cada documento para omitir las recargas
+# sin cambios; se calcula con los mismos campos que usa la ingesta
+def _m008_huella_contenido(conn, tamano_lote=500):
+    _agregar_columna(conn, documentos.c.huella_contenido)
+    columnas = [documentos.c.codigo] + [documentos.c[c] for c in CAMPOS_VERSIONADOS]
+    filas = conn.execute(select(*columnas)).mappings().all()
+    for inicio in range(0, len(filas), tamano_lote):
+        conn.execute(
+            update(documentos).where(documentos.c.codigo == bindparam("b_codigo")),
+            [{"b_codigo": fila["codigo"], "huella_contenido": huellas_documento(fila)[1]}
+             for fila in filas[inicio:inicio + tamano_lote]]
+        )
+
+# Migración 9: clave normalizada de los nombres del personal con su índice.
+# Los duplicados que aparezcan no se fusionan aquí: se concilian con identidad
+def _m009_clave_personal(conn, tamano_lote=500):
+    _agregar_columna(conn, personal.c.clave_nombre)
+    for indice in personal.indexes:
+        if indice.name == "ix_personal_clave_nombre":
+            indice.create(conn, checkfirst=True)
+    filas = conn.execute(select(personal.c.id, personal.c.nombre_completo)).all()
+    for inicio in range(0, len(filas), tamano_lote):
+        conn.execute(
+            update(personal).where(personal.c.id == bindparam("b_id")),
+            [{"b_id": id_personal, "clave_nombre": clave_nombre(nombre)}
+             for id_personal, nombre in filas[inicio:inicio + tamano_lote]]
+        )
+
+# Migración 10: índice inverso de personas, construido desde los responsables,
+# las autorizaciones de los documentos y los responsables de los registros
+def _m010_referencias_personal(conn):
+    metadata.create_all(conn, tables=[referencias_personal])
+    reconstruir_indice(conn)
+
+# Migración 11: el índice inverso vuelve a construirse porque el responsable de
+# actualización también puede listar varios nombres separados por comas
+def _m011_referencias_listas(conn):
+    reconstruir_indice(conn)
+
+# Migración 12: las claves del personal y el índice inverso se recalculan con
+# los títulos y siglas añadidos a identidad.clave_nombre
+def _m012_claves_titulos(conn):
+    _m009_clave_personal(conn)
+    reconstruir_indice(conn)
+
+# Migraciones en orden: (versión, descripción, función que recibe la conexión)
+MIGRACIONES = [
+    (1, "Índices para consultas frecuentes", _m001_indices),
+    (2, "Tablas hijas de secciones del procedimiento", _m002_secciones),
+    (3, "Índice de formatos mencionados por documento", _m003_formatos),
+    (4, "Índice de texto completo de procedimientos", _m004_busqueda),
+    (5, "Fecha de revisión normalizada", _m005_revision_programada),
+    (6, "Fecha de cambio de estado como marca de tiempo", _m006_fecha_cambio),
+    (7, "Historial de versiones de documentos", _m007_revisiones),
+    (8, "Huella del contenido de los documentos", _m008_huella_contenido),
+    (9, "Clave normalizada del personal", _m009_clave_personal),
+    (10, "Índice inverso de referencias al personal", _m010_referencias_personal),
+    (11, "Índice de referencias con listas de responsables de actualización", _m011_referencias_listas),
+    (12, "Claves del personal con títulos y siglas adicionales", _m012_claves_titulos),
+]
+
+# Función para obtener la versión actual del esquema
+def version_actual(conn):
+    return max(conn.execute(select(esquema_version.c.version)).scalars(), default=0)
+
+# Función para aplicar las migraciones pendientes, cada una en su transacción
+def aplicar_migraciones(engine):
+    with engine.connect() as conn:
+        actual = version_actual(conn)
+
+    aplicadas = []
+    for version, descripcion, migrar in MIGRACIONES:
+        if version <= actual:
+            continue
+        with engine.begin() as conn:
+            migrar(conn)
+            conn.execute(insert(esquema_version).values(
+                version=version,
+                descripcion=descripcion,
+                fecha_aplicacion=datetime.now().isoformat(timespec="seconds")
+            ))
+        aplicadas.append(version)
+    return aplicadas
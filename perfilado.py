@@ -0,0 +1,124 @@
+import os
+import json
+import time
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import event
+
+# Instrumentación de las ejecuciones de la interfaz: tiempos por sección,
+# cargador, consulta y renderizado, con filas y bytes movidos. Cada rerun de
+# Streamlit abre una "corrida" que acumula sus mediciones; fuera de una corrida
+# (o con el perfilado desactivado) medir() no hace nada.
+#   CONTROLDOC_PERFILADO=1            activa la instrumentación
+#   CONTROLDOC_PERFILADO_LOG=ruta     además escribe cada corrida como JSON por línea
+ACTIVO = os.environ.get("CONTROLDOC_PERFILADO", "") not in ("", "0")
+RUTA_LOG = os.environ.get("CONTROLDOC_PERFILADO_LOG") or None
+
+_corrida = contextvars.ContextVar("corrida_perfilado", default=None)
+_seccion = contextvars.ContextVar("seccion_perfilado", default="")
+_lock_log = threading.Lock()
+
+# Función para estimar los bytes de un resultado sin copiarlo
+def tamano_en_bytes(valor):
+    if hasattr(valor, "memory_usage"):
+        return int(valor.memory_usage(index=False, deep=True).sum())
+    if isinstance(valor, (bytes, str)):
+        return len(valor)
+    return None
+
+def _filas(valor):
+    if hasattr(valor, "shape"):
+        return int(valor.shape[0])
+    if isinstance(valor, (list, tuple)):
+        return len(valor)
+    return None
+
+# Función para iniciar la corrida de un rerun; devuelve su lista de mediciones
+def iniciar_corrida(nombre="control", activo=None):
+    activo = ACTIVO if activo is None else activo
+    corrida = {"nombre": nombre, "inicio": time.perf_counter(), "fecha": datetime.now(), "mediciones": []}
+    _corrida.set(corrida if activo else None)
+    return corrida if activo else None
+
+# Función para cerrar la corrida actual. Devuelve sus mediciones y, si hay
+# archivo de log configurado, las agrega como una línea JSON
+def finalizar_corrida():
+    corrida = _corrida.get()
+    if corrida is None:
+        return []
+    _corrida.set(None)
+    total_ms = (time.perf_counter() - corrida["inicio"]) * 1000
+    mediciones = corrida["mediciones"] + [
+        {"seccion": "", "tipo": "total", "nombre": corrida["nombre"], "ms": round(total_ms, 2),
+         "filas": None, "bytes": None}
+    ]
+    if RUTA_LOG:
+        linea = json.dumps({"fecha": corrida["fecha"].isoformat(timespec="milliseconds"),
+                            "corrida": corrida["nombre"], "mediciones": mediciones},
+                           ensure_ascii=False, default=str)
+        with _lock_log, open(RUTA_LOG, "a", encoding="utf-8") as log:
+            log.write(linea + "\n")
+    return mediciones
+
+# Contexto para medir un bloque. El bloque puede completar filas y bytes en el
+# diccionario que se entrega; las mediciones anidadas heredan la sección
+@contextmanager
+def medir(nombre, tipo="seccion", filas=None, bytes_movidos=None):
+    corrida = _corrida.get()
+    if corrida is None:
+        yield {}
+        return
+    medicion = {"seccion": _seccion.get(), "tipo": tipo, "nombre": nombre, "ms": None,
+                "filas": filas, "bytes": bytes_movidos}
+    token = _seccion.set(nombre) if tipo == "seccion" else None
+    inicio = time.perf_counter()
+    try:
+        yield medicion
+    finally:
+        medicion["ms"] = round((time.perf_counter() - inicio) * 1000, 2)
+        if token is not None:
+            _seccion.reset(token)
+        corrida["mediciones"].append(medicion)
+
+# Decorador para medir una función; filas y bytes se toman del valor devuelto
+# o, en los renderizados, del primer argumento (el DataFrame que se muestra)
+def medido(nombre=None, tipo="cargador"):
+    def decorador(funcion):
+        etiqueta = nombre or funcion.__name__
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if _corrida.get() is None:
+                return funcion(*args, **kwargs)
+            with medir(etiqueta, tipo) as medicion:
+                valor = funcion(*args, **kwargs)
+                medido_sobre = args[0] if tipo == "render" and args else valor
+                medicion["filas"] = _filas(medido_sobre)
+                medicion["bytes"] = tamano_en_bytes(medido_sobre)
+            return valor
+        return envoltura
+    return decorador
+
+# Función para registrar el tiempo de cada sentencia SQL del engine en la
+# corrida activa (las filas leídas las informa el cargador que la ejecuta)
+def instrumentar_engine(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        if _corrida.get() is not None:
+            conn.info.setdefault("perfilado_inicio", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        corrida = _corrida.get()
+        inicios = conn.info.get("perfilado_inicio")
+        if corrida is None or not inicios:
+            return
+        ms = (time.perf_counter() - inicios.pop()) * 1000
+        corrida["mediciones"].append({
+            "seccion": _seccion.get(), "tipo": "consulta", "nombre": " ".join(statement.split())[:80],
+            "ms": round(ms, 2), "filas": cursor.rowcount if cursor.rowcount >= 0 else None, "bytes": None,
+        })
+    return engine
@@ -0,0 +1,254 @@
+import re
+import sys
+import json
+import argparse
+from collections import defaultdict
+from sqlalchemy import select, insert, update, delete, func, bindparam
+
+from base_datos import DB_URL, setup_database, documentos, registros, referencias_personal
+from cache_tablas import registrar_cambio
+from identidad import clave_nombre
+from secciones import ROLES_AUTORIZACION, filas_autorizaciones, filas_secciones, guardar_secciones
+from busqueda import indexar_documentos
+from versiones import CAMPOS_VERSIONADOS, huellas_documento, registrar_revisiones
+
+# Índice inverso persona -> lugares donde se le menciona. Cada fila guarda la
+# clave normalizada del nombre, el origen (columna o sección) y el código del
+# documento o registro. Se actualiza en cada escritura de documentos y
+# registros, y sirve para verificar bajas y reasignar responsabilidades
+ORIGENES_DOCUMENTO = {
+    "responsable_actualizacion": "Responsable de actualización",
+    "responsable_supervision": "Responsable de supervisión",
+    "responsable_ejecucion": "Responsable de ejecución",
+    "autorizaciones": "Autorizaciones",
+}
+ORIGENES_REGISTRO = {"responsable_recoleccion": "Responsable de recolección"}
+# Columnas de documentos que pueden listar varios nombres separados por comas
+COLUMNAS_LISTA = {"responsable_actualizacion", "responsable_supervision", "responsable_ejecucion"}
+TAMANO_BLOQUE = 500
+_SEPARADOR = re.compile(r"\s*,\s*")
+
+def _nombres(columna, valor):
+    if not valor:
+        return []
+    return [n for n in _SEPARADOR.split(valor) if n] if columna in COLUMNAS_LISTA else [valor]
+
+def _cargar_lista(texto):
+    try:
+        lista = json.loads(texto) if texto else []
+    except ValueError:
+        return []
+    return lista if isinstance(lista, list) else []
+
+# Función para generar las filas del índice de un documento (fila de documentos
+# con las columnas de responsables y las autorizaciones en JSON)
+def filas_documento(fila):
+    codigo = fila["codigo"]
+    filas = []
+    for columna in ORIGENES_DOCUMENTO:
+        if columna == "autorizaciones":
+            nombres = [a["nombre"] for a in filas_autorizaciones(_cargar_lista(fila.get("autorizaciones")))]
+        else:
+            nombres = _nombres(columna, fila.get(columna))
+        for nombre in nombres:
+            clave = clave_nombre(nombre)
+            if clave:
+                filas.append({"clave_nombre": clave, "origen": columna, "referencia": codigo, "nombre": nombre})
+    return filas
+
+def filas_registro(fila):
+    clave = clave_nombre(fila.get("responsable_recoleccion"))
+    if not clave:
+        return []
+    return [{"clave_nombre": clave, "origen": "responsable_recoleccion",
+             "referencia": fila["codigo"], "nombre": fila["responsable_recoleccion"]}]
+
+# Función para reemplazar en el índice las filas de varios documentos o
+# registros dentro de la transacción actual
+def _reindexar(conn, origenes, codigos, filas):
+    codigos = list(codigos)
+    for inicio in range(0, len(codigos), TAMANO_BLOQUE):
+        conn.execute(
+            delete(referencias_personal)
+            .where(referencias_personal.c.origen.in_(list(origenes)))
+            .where(referencias_personal.c.referencia.in_(codigos[inicio:inicio + TAMANO_BLOQUE]))
+        )
+    if filas:
+        conn.execute(insert(referencias_personal), filas)
+
+def indexar_documentos_personal(conn, filas_documentos):
+    filas_documentos = list(filas_documentos)
+    _reindexar(conn, ORIGENES_DOCUMENTO, [f["codigo"] for f in filas_documentos],
+               [fila for f in filas_documentos for fila in filas_documento(f)])
+
+def indexar_registros_personal(conn, filas_registros):
+    filas_registros = list(filas_registros)
+    _reindexar(conn, ORIGENES_REGISTRO, [f["codigo"] for f in filas_registros],
+               [fila for f in filas_registros for fila in filas_registro(f)])
+
+def desindexar_registro(conn, codigo):
+    _reindexar(conn, ORIGENES_REGISTRO, [codigo], [])
+
+# Función para reconstruir el índice completo desde documentos y registros
+def reconstruir_indice(conn):
+    conn.execute(delete(referencias_personal))
+    columnas = [documentos.c.codigo, documentos.c.autorizaciones] + [
+        documentos.c[c] for c in ORIGENES_DOCUMENTO if c != "autorizaciones"
+    ]
+    filas = conn.execute(select(*columnas)).mappings().all()
+    for inicio in range(0, len(filas), TAMANO_BLOQUE):
+        nuevas = [fila for f in filas[inicio:inicio + TAMANO_BLOQUE] for fila in filas_documento(f)]
+        if nuevas:
+            conn.execute(insert(referencias_personal), nuevas)
+    nuevas = [fila for f in conn.execute(select(registros.c.codigo, registros.c.responsable_recoleccion)).mappings()
+              for fila in filas_registro(f)]
+    if nuevas:
+        conn.execute(insert(referencias_personal), nuevas)
+
+_CONTAR_REFERENCIAS = (
+    select(referencias_personal.c.origen, func.count(func.distinct(referencias_personal.c.referencia)))
+    .where(referencias_personal.c.clave_nombre == bindparam("clave"))
+    .group_by(referencias_personal.c.origen)
+)
+
+# Función para contar las referencias a una persona por origen (solo conteos
+# sobre el índice); devuelve {origen: número}, vacío si no se le menciona
+def contar_referencias(conn, nombre):
+    return dict(conn.execute(_CONTAR_REFERENCIAS, {"clave": clave_nombre(nombre)}).all())
+
+# Función para reemplazar en una lista de nombres los que corresponden a la
+# clave; los repetidos que resulten se eliminan conservando el orden
+def _reemplazar_lista(nombres, clave, destino):
+    resultado = []
+    for nombre in nombres:
+        nombre = destino if clave_nombre(nombre) == clave else nombre
+        if nombre not in resultado:
+            resultado.append(nombre)
+    return resultado
+
+# Función para reemplazar el nombre en los campos indicados de una lista de
+# objetos JSON (autorizaciones o pasos); con `en_lista` cada campo se trata como
+# nombres separados por comas. Devuelve True si cambió algo
+def _reemplazar_en_objetos(objetos, campos, clave, destino, en_lista=False):
+    cambio = False
+    for objeto in objetos:
+        if not isinstance(objeto, dict):
+            continue
+        for campo in campos:
+            valor = objeto.get(campo)
+            if not isinstance(valor, str):
+                continue
+            nombres = [n for n in _SEPARADOR.split(valor) if n] if en_lista else [valor]
+            if any(clave_nombre(nombre) == clave for nombre in nombres):
+                objeto[campo] = ", ".join(_reemplazar_lista(nombres, clave, destino))
+                cambio = True
+    return cambio
+
+# Función para reescribir un documento con `destino` en lugar de la persona de
+# `clave`; devuelve la fila modificada o None si no cambió
+def _reasignar_documento(fila, clave, destino):
+    nueva = dict(fila)
+    for columna in ORIGENES_DOCUMENTO:
+        if columna == "autorizaciones":
+            autorizaciones = _cargar_lista(fila[columna])
+            if _reemplazar_en_objetos(autorizaciones, ("Nombre", *ROLES_AUTORIZACION), clave, destino):
+                nueva[columna] = json.dumps(autorizaciones, ensure_ascii=False)
+        else:
+            nombres = _nombres(columna, fila[columna])
+            reemplazados = _reemplazar_lista(nombres, clave, destino)
+            if reemplazados != nombres:
+                nueva[columna] = ", ".join(reemplazados)
+    # La ejecución se deriva de los pasos: se reasignan también sus responsables,
+    # que pueden nombrar a varias personas separadas por comas
+    pasos = _cargar_lista(fila["pasos"])
+    if _reemplazar_en_objetos(pasos, ("Responsable",), clave, destino, en_lista=True):
+        nueva["pasos"] = json.dumps(pasos, ensure_ascii=False)
+    if nueva == dict(fila):
+        return None
+    nueva["huella_contenido"] = huellas_documento(nueva)[1]
+    return nueva
+
+# Función para reasignar todas las responsabilidades de una persona a otra en
+# la transacción actual: columnas de responsables, autorizaciones, pasos y
+# registros. Se apoya en el índice para tocar solo los documentos y registros
+# afectados. Devuelve {origen: número de documentos o registros modificados}
+def reasignar_responsabilidades(conn, nombre_origen, nombre_destino):
+    clave = clave_nombre(nombre_origen)
+    if not clave or clave == clave_nombre(nombre_destino):
+        return {}
+    referencias = conn.execute(
+        select(referencias_personal.c.origen, referencias_personal.c.referencia)
+        .where(referencias_personal.c.clave_nombre == clave)
+    ).all()
+    por_origen = defaultdict(set)
+    for origen, referencia in referencias:
+        por_origen[origen].add(referencia)
+    resumen = {origen: len(codigos) for origen, codigos in por_origen.items()}
+
+    codigos_documentos = sorted({c for o in ORIGENES_DOCUMENTO for c in por_origen.get(o, ())})
+    columnas = [documentos.c.codigo] + [documentos.c[c] for c in CAMPOS_VERSIONADOS]
+    modificados = []
+    for inicio in range(0, len(codigos_documentos), TAMANO_BLOQUE):
+        for fila in conn.execute(
+            select(*columnas).where(documentos.c.codigo.in_(codigos_documentos[inicio:inicio + TAMANO_BLOQUE]))
+        ).mappings():
+            nueva = _reasignar_documento(fila, clave, nombre_destino)
+            if nueva:
+                modificados.append(nueva)
+
+    if modificados:
+        conn.execute(
+            update(documentos).where(documentos.c.codigo == bindparam("b_codigo")),
+            [{"b_codigo": f["codigo"], **{c: f[c] for c in [*CAMPOS_VERSIONADOS, "huella_contenido"]}}
+             for f in modificados]
+        )
+        codigos = [f["codigo"] for f in modificados]
+        guardar_secciones(conn, codigos, [filas_secciones(f) for f in modificados])
+        indexar_documentos(conn, codigos)
+        registrar_revisiones(conn, modificados)
+        indexar_documentos_personal(conn, modificados)
+        registrar_cambio(conn, "documentos")
+
+    codigos_registros = sorted(por_origen.get("responsable_recoleccion", ()))
+    if codigos_registros:
+        for inicio in range(0, len(codigos_registros), TAMANO_BLOQUE):
+            conn.execute(
+                update(registros)
+                .where(registros.c.codigo.in_(codigos_registros[inicio:inicio + TAMANO_BLOQUE]))
+                .values(responsable_recoleccion=nombre_destino)
+            )
+        indexar_registros_personal(conn, [
+            {"codigo": codigo, "responsable_recoleccion": nombre_destino} for codigo in codigos_registros
+        ])
+        registrar_cambio(conn, "registros")
+    return resumen
+
+# Punto de entrada para consultar o reasignar sin interfaz:
+#   python -m referencias "Nombre" [--reasignar "Otro nombre"] [--reconstruir] [--db URL]
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Referencias del personal en documentos y registros")
+    parser.add_argument("nombre", nargs="?", help="Persona a consultar")
+    parser.add_argument("--reasignar", metavar="DESTINO", help="Reasignar sus responsabilidades a esta persona")
+    parser.add_argument("--reconstruir", action="store_true", help="Reconstruir el índice completo")
+    parser.add_argument("--db", default=DB_URL, help=f"URL de la base de datos (por defecto {DB_URL})")
+    args = parser.parse_args(argv)
+
+    engine, *_ = setup_database(args.db)
+    with engine.begin() as conn:
+        if args.reconstruir:
+            reconstruir_indice(conn)
+        if args.nombre and args.reasignar:
+            resumen = reasignar_responsabilidades(conn, args.nombre, args.reasignar)
+            for origen, n in resumen.items():
+                print(f"{n:>6}  {origen}")
+            print(f"Responsabilidades de {args.nombre} reasignadas a {args.reasignar}")
+        elif args.nombre:
+            conteos = contar_referencias(conn, args.nombre)
+            for origen, n in conteos.items():
+                print(f"{n:>6}  {origen}")
+            print(f"{sum(conteos.values())} referencia(s) a {args.nombre}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
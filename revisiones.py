@@ -0,0 +1,133 @@
+# Calendario de revisiones de procedimientos sobre la columna normalizada
+# documentos.revision_programada (indexada). Uso en línea de comandos:
+#   python -m revisiones [--dias 30] [--recalcular] [--db URL]
+import sys
+import argparse
+from datetime import date, timedelta
+from sqlalchemy import select, update, func, case, bindparam
+
+from base_datos import DB_URL, setup_database, documentos
+from fechas import parsear_fecha
+from cache_tablas import registrar_cambio
+
+COLUMNAS_REVISION = ["codigo", "nombre_documento", "estado", "fecha_revision", "revision_programada"]
+
+# Los documentos obsoletos ya no se revisan
+def _vigentes():
+    return documentos.c.estado != "Obsoleto"
+
+# Función para recalcular revision_programada a partir del texto fecha_revision.
+# Se agrupan los textos distintos (pocos) y se actualiza con executemany.
+# Con solo_pendientes se procesan únicamente las filas que aún no tienen fecha
+def recalcular_revisiones(conn, solo_pendientes=False):
+    consulta = select(documentos.c.fecha_revision).distinct()
+    if solo_pendientes:
+        consulta = consulta.where(documentos.c.revision_programada.is_(None))
+    textos = conn.execute(consulta).scalars().all()
+
+    cambios = [{"b_texto": texto, "revision_programada": parsear_fecha(texto)}
+               for texto in textos if texto is not None]
+    if cambios:
+        conn.execute(
+            update(documentos).where(documentos.c.fecha_revision == bindparam("b_texto")),
+            cambios
+        )
+        registrar_cambio(conn, "documentos")
+    return {
+        "textos": len(cambios),
+        "reconocidas": sum(1 for c in cambios if c["revision_programada"] is not None),
+    }
+
+# Función base: documentos vigentes con revisión entre dos fechas (incluidas).
+# pandas se importa solo en las consultas que devuelven DataFrames; las
+# migraciones y la ingesta usan este módulo sin ellos
+def documentos_por_revision(conn, desde=None, hasta=None, columnas=None):
+    import pandas as pd
+
+    columnas = columnas or COLUMNAS_REVISION
+    consulta = (
+        select(*[documentos.c[c] for c in columnas])
+        .where(_vigentes(), documentos.c.revision_programada.is_not(None))
+        .order_by(documentos.c.revision_programada, documentos.c.codigo)
+    )
+    if desde is not None:
+        consulta = consulta.where(documentos.c.revision_programada >= desde)
+    if hasta is not None:
+        consulta = consulta.where(documentos.c.revision_programada <= hasta)
+    return pd.read_sql(consulta, conn)
+
+# Revisiones con fecha anterior a hoy
+def revisiones_vencidas(conn, hoy=None):
+    hoy = hoy or date.today()
+    return documentos_por_revision(conn, hasta=hoy - timedelta(days=1))
+
+# Revisiones que vencen hoy
+def revisiones_del_dia(conn, hoy=None):
+    hoy = hoy or date.today()
+    return documentos_por_revision(conn, desde=hoy, hasta=hoy)
+
+# Revisiones que vencen entre hoy y los próximos `dias`
+def revisiones_proximas(conn, dias=30, hoy=None):
+    hoy = hoy or date.today()
+    return documentos_por_revision(conn, desde=hoy, hasta=hoy + timedelta(days=dias))
+
+# Documentos vigentes cuya fecha de revisión no se pudo interpretar
+def revisiones_sin_fecha(conn):
+    import pandas as pd
+
+    return pd.read_sql(
+        select(*[documentos.c[c] for c in COLUMNAS_REVISION])
+        .where(_vigentes(), documentos.c.revision_programada.is_(None))
+        .order_by(documentos.c.codigo),
+        conn
+    )
+
+# Conteo de vencidas, próximas, vigentes y sin fecha en una sola consulta
+def resumen_revisiones(conn, hoy=None, dias_proximas=30):
+    hoy = hoy or date.today()
+    fecha = documentos.c.revision_programada
+    tramo = case(
+        (fecha.is_(None), "sin_fecha"),
+        (fecha < hoy, "vencidas"),
+        (fecha <= hoy + timedelta(days=dias_proximas), "proximas"),
+        else_="vigentes",
+    ).label("tramo")
+    resumen = {"vencidas": 0, "proximas": 0, "vigentes": 0, "sin_fecha": 0}
+    for nombre, cantidad in conn.execute(
+        select(tramo, func.count()).where(_vigentes()).group_by(tramo)
+    ):
+        resumen[nombre] = cantidad
+    return resumen
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calendario de revisiones de procedimientos.")
+    parser.add_argument("--db", default=DB_URL, help=f"URL de la base de datos (por defecto {DB_URL})")
+    parser.add_argument("--dias", type=int, default=30, help="Horizonte de próximas revisiones en días")
+    parser.add_argument("--recalcular", action="store_true",
+                        help="Recalcular las fechas normalizadas de todos los documentos")
+    args = parser.parse_args(argv)
+
+    engine, *_ = setup_database(args.db)
+    if args.recalcular:
+        with engine.begin() as conn:
+            resultado = recalcular_revisiones(conn)
+        print(f"Fechas distintas procesadas: {resultado['textos']} (reconocidas: {resultado['reconocidas']})")
+
+    with engine.connect() as conn:
+        vencidas = revisiones_vencidas(conn)
+        proximas = revisiones_proximas(conn, args.dias)
+        sin_fecha = revisiones_sin_fecha(conn)
+
+    for titulo, df in (("Vencidas", vencidas), (f"Próximos {args.dias} días", proximas)):
+        print(f"\n{titulo}: {len(df)}")
+        for fila in df.itertuples():
+            print(f"  {fila.revision_programada}  {fila.codigo:<15} {fila.nombre_documento}")
+    if not sin_fecha.empty:
+        print(f"\nSin fecha reconocida: {len(sin_fecha)}")
+        for fila in sin_fecha.itertuples():
+            print(f"  {fila.codigo:<15} {fila.fecha_revision!r}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
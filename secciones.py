@@ -0,0 +1,189 @@
+import re
+import json
+from sqlalchemy import select, insert, delete, func
+
+from base_datos import (
+    registros, documento_pasos, documento_riesgos, documento_referencias,
+    documento_cambios, documento_autorizaciones, documento_formatos
+)
+
+# Patrón para buscar formatos tipo F-001, F-123, etc.
+PATRON_FORMATO = re.compile(r'F-\d{3}')
+TABLAS_SECCIONES = [
+    documento_pasos, documento_riesgos, documento_referencias,
+    documento_cambios, documento_autorizaciones, documento_formatos
+]
+
+ROLES_AUTORIZACION = ("Elaboró", "Revisó", "Autorizó")
+
+# Función auxiliar para decodificar una columna JSON de documentos
+def _cargar_lista(valor):
+    if not valor:
+        return []
+    try:
+        lista = json.loads(valor)
+    except ValueError:
+        return []
+    return lista if isinstance(lista, list) else []
+
+def _texto(valor):
+    return valor if isinstance(valor, str) else json.dumps(valor, ensure_ascii=False)
+
+# Función para convertir las autorizaciones en filas (rol, nombre, cargo).
+# Acepta el par de diccionarios nombres/cargos o una lista de {"Nombre", "Puesto"}
+def filas_autorizaciones(autorizaciones):
+    if len(autorizaciones) == 2 and all(isinstance(a, dict) for a in autorizaciones) \
+            and any(rol in autorizaciones[0] for rol in ROLES_AUTORIZACION):
+        nombres, cargos = autorizaciones
+        return [
+            {"rol": rol, "nombre": nombres.get(rol, ""), "cargo": cargos.get(f"Cargo {rol}", "")}
+            for rol in ROLES_AUTORIZACION
+        ]
+    return [
+        {"rol": auth.get("Rol", ""), "nombre": auth.get("Nombre", ""), "cargo": auth.get("Puesto", "")}
+        for auth in autorizaciones if isinstance(auth, dict) and auth.get("Nombre")
+    ]
+
+# Filas de pasos y de riesgos/barreras; también las usa la ingesta en flujo,
+# que las inserta por bloques sin pasar por filas_secciones
+def fila_paso(codigo, orden, paso):
+    return {
+        "documento_codigo": codigo, "orden": orden,
+        "numero": str(paso.get("No.", "")),
+        "responsable": paso.get("Responsable", ""),
+        "descripcion": paso.get("Descripción") or paso.get("Actividad", "")
+    }
+
+def fila_riesgo(codigo, orden, tipo, texto):
+    return {"documento_codigo": codigo, "orden": orden, "tipo": tipo, "texto": _texto(texto)}
+
+# Función para generar las filas de las tablas hijas a partir de una fila de
+# documentos (con las secciones serializadas tal como las produce mapear_documento)
+def filas_secciones(registro):
+    codigo = registro["codigo"]
+    filas = {tabla.name: [] for tabla in TABLAS_SECCIONES}
+
+    for orden, paso in enumerate(_cargar_lista(registro.get("pasos"))):
+        if isinstance(paso, dict):
+            filas["documento_pasos"].append(fila_paso(codigo, orden, paso))
+
+    # Formatos detectados en los pasos, guardados una sola vez por documento
+    formatos = set()
+    for paso in filas["documento_pasos"]:
+        formatos.update(PATRON_FORMATO.findall(paso["descripcion"] or ""))
+    filas["documento_formatos"] = [
+        {"documento_codigo": codigo, "formato": formato} for formato in sorted(formatos)
+    ]
+
+    for tipo, columna in (("riesgo", "riesgos"), ("barrera", "barreras_seguridad")):
+        for orden, texto in enumerate(_cargar_lista(registro.get(columna))):
+            filas["documento_riesgos"].append(fila_riesgo(codigo, orden, tipo, texto))
+
+    for orden, ref in enumerate(_cargar_lista(registro.get("documentos_referencia"))):
+        if isinstance(ref, dict):
+            filas["documento_referencias"].append({
+                "documento_codigo": codigo, "orden": orden,
+                "nombre": ref.get("Nombre del Documento", ""),
+                "codigo_referencia": ref.get("Código", "")
+            })
+
+    for orden, cambio in enumerate(_cargar_lista(registro.get("historial_cambios"))):
+        if isinstance(cambio, dict):
+            filas["documento_cambios"].append({
+                "documento_codigo": codigo, "orden": orden,
+                "numero": str(cambio.get("Número", "")),
+                "fecha": cambio.get("Fecha", ""),
+                "descripcion": cambio.get("Descripción del Cambio", ""),
+                "realizado_por": cambio.get("Realizado por", ""),
+                "aprobado_por": cambio.get("Aprobado por", "")
+            })
+
+    for orden, fila in enumerate(filas_autorizaciones(_cargar_lista(registro.get("autorizaciones")))):
+        filas["documento_autorizaciones"].append({"documento_codigo": codigo, "orden": orden, **fila})
+
+    return filas
+
+# Función para reemplazar las secciones de varios documentos dentro de la
+# transacción actual. `filas` es una lista de resultados de filas_secciones
+def guardar_secciones(conn, codigos, filas):
+    codigos = list(codigos)
+    for tabla in TABLAS_SECCIONES:
+        if codigos:
+            conn.execute(delete(tabla).where(tabla.c.documento_codigo.in_(codigos)))
+        nuevas = [fila for filas_doc in filas for fila in filas_doc[tabla.name]]
+        if nuevas:
+            conn.execute(insert(tabla), nuevas)
+
+# Función para leer una sección de un documento en el orden original
+def cargar_seccion(conn, tabla, codigo):
+    columnas = [c for c in tabla.c if c.name not in ("id", "documento_codigo", "orden")]
+    return conn.execute(
+        select(*columnas)
+        .where(tabla.c.documento_codigo == codigo)
+        .order_by(tabla.c.orden)
+    ).mappings().all()
+
+# Función para obtener los roles que ejecutan los pasos de un documento
+def roles_de_documento(conn, codigo):
+    roles = []
+    for responsable in conn.execute(
+        select(documento_pasos.c.responsable)
+        .where(documento_pasos.c.documento_codigo == codigo)
+        .order_by(documento_pasos.c.orden)
+    ).scalars():
+        if responsable and responsable not in roles:
+            roles.append(responsable)
+    return roles
+
+# Función para obtener los formatos mencionados en los pasos de un documento
+def formatos_de_documento(conn, codigo):
+    return conn.execute(
+        select(documento_formatos.c.formato)
+        .where(documento_formatos.c.documento_codigo == codigo)
+        .order_by(documento_formatos.c.formato)
+    ).scalars().all()
+
+# Función para buscar los documentos cuyos pasos mencionan un formato
+def documentos_con_formato(conn, formato):
+    return conn.execute(
+        select(documento_formatos.c.documento_codigo)
+        .where(documento_formatos.c.formato == formato)
+        .order_by(documento_formatos.c.documento_codigo)
+    ).scalars().all()
+
+# Función para listar los registros con el número de documentos que los mencionan
+def referencias_de_registros(conn):
+    return conn.execute(
+        select(
+            registros.c.codigo,
+            registros.c.nombre_registro,
+            registros.c.documento_origen,
+            func.count(documento_formatos.c.documento_codigo).label("documentos_que_lo_mencionan")
+        )
+        .select_from(registros.outerjoin(documento_formatos, documento_formatos.c.formato == registros.c.codigo))
+        .group_by(registros.c.codigo, registros.c.nombre_registro, registros.c.documento_origen)
+        .order_by(registros.c.codigo)
+    ).mappings().all()
+
+# Función para listar los formatos detectados que aún no tienen registro
+def formatos_sin_registro(conn):
+    return conn.execute(
+        select(
+            documento_formatos.c.formato,
+            func.count().label("documentos"),
+            func.min(documento_formatos.c.documento_codigo).label("primer_documento")
+        )
+        .select_from(documento_formatos.outerjoin(registros, registros.c.codigo == documento_formatos.c.formato))
+        .where(registros.c.id.is_(None))
+        .group_by(documento_formatos.c.formato)
+        .order_by(documento_formatos.c.formato)
+    ).mappings().all()
+
+# Función para buscar los documentos en los que un rol ejecuta algún paso. El
+# responsable se compara completo: "Jefatura" no coincide con "Subjefatura"
+def documentos_por_rol(conn, rol):
+    return conn.execute(
+        select(documento_pasos.c.documento_codigo).distinct()
+        .where(documento_pasos.c.responsable == rol)
+        .order_by(documento_pasos.c.documento_codigo)
+    ).scalars().all()
@@ -0,0 +1,53 @@
+import os
+import sys
+import uuid
+import pytest
+
+# Los módulos de la aplicación están en la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, make_url, text
+from base_datos import setup_database
+from cache_tablas import limpiar_cache
+
+# PostgreSQL para las pruebas de backend (la misma variable que usa la
+# aplicación); sin ella esas pruebas solo corren sobre SQLite
+URL_POSTGRES = os.environ.get("CONTROLDOC_DB_URL", "")
+
+# Base de datos en memoria con el esquema y las migraciones aplicadas
+@pytest.fixture
+def engine():
+    engine, *_ = setup_database("sqlite://")
+    limpiar_cache()
+    yield engine
+    engine.dispose()
+
+# URL de una base vacía en cada backend. En PostgreSQL cada prueba trabaja en
+# un esquema temporal propio que se elimina al terminar, de modo que la base
+# configurada no se modifica
+@pytest.fixture(params=["sqlite", "postgresql"])
+def url_backend(request, tmp_path):
+    limpiar_cache()
+    if request.param == "sqlite":
+        yield f"sqlite:///{tmp_path / 'controldoc.db'}"
+        return
+    if make_url(URL_POSTGRES or "sqlite://").get_backend_name() != "postgresql":
+        pytest.skip("CONTROLDOC_DB_URL no apunta a PostgreSQL")
+
+    esquema = f"controldoc_pruebas_{uuid.uuid4().hex[:12]}"
+    administrador = create_engine(URL_POSTGRES)
+    with administrador.begin() as conn:
+        conn.execute(text(f'CREATE SCHEMA "{esquema}"'))
+    try:
+        url = make_url(URL_POSTGRES).update_query_dict({"options": f"-csearch_path={esquema}"})
+        yield url.render_as_string(hide_password=False)
+    finally:
+        with administrador.begin() as conn:
+            conn.execute(text(f'DROP SCHEMA "{esquema}" CASCADE'))
+        administrador.dispose()
+
+@pytest.fixture
+def engine_backend(url_backend):
+    engine, *_ = setup_database(url_backend)
+    yield engine
+    engine.dispose()
@@ -0,0 +1,64 @@
+from sqlalchemy import insert, select
+
+from base_datos import documentos, registros, personal
+from cache_tablas import version_tabla
+from acceso_datos import (
+    existe_documento, existe_registro, existe_personal, estado_documento, insertar_registro,
+    insertar_personal, eliminar_registro, eliminar_personal, cambiar_activo_personal
+)
+
+def _registro(codigo, **columnas):
+    fila = {"codigo": codigo, "nombre_registro": f"Registro {codigo}", "version": "1.0",
+            "documento_origen": "PR-01", "responsable_recoleccion": "Ana López", "estado": "Activo"}
+    fila.update(columnas)
+    return fila
+
+def test_documento_existe_y_estado(engine):
+    with engine.begin() as conn:
+        conn.execute(insert(documentos), [{"codigo": "PR-01", "estado": "Aprobado"}])
+        assert existe_documento(conn, "PR-01")
+        assert not existe_documento(conn, "PR-02")
+        assert estado_documento(conn, "PR-01") == "Aprobado"
+        assert estado_documento(conn, "PR-02") is None
+
+def test_codigos_con_comillas_viajan_como_parametros(engine):
+    codigo = "F-001' OR '1'='1"
+    with engine.begin() as conn:
+        assert insertar_registro(conn, _registro("F-002"))
+        assert not existe_registro(conn, codigo)
+        assert insertar_registro(conn, _registro(codigo))
+        assert existe_registro(conn, codigo)
+        assert eliminar_registro(conn, codigo) == 1
+        assert existe_registro(conn, "F-002")
+
+def test_insertar_registro_duplicado(engine):
+    with engine.begin() as conn:
+        assert insertar_registro(conn, _registro("F-001"))
+        assert not insertar_registro(conn, _registro("F-001", nombre_registro="Otro"))
+        assert conn.execute(select(registros.c.nombre_registro)).scalars().all() == ["Registro F-001"]
+
+def test_eliminar_registro_inexistente(engine):
+    with engine.begin() as conn:
+        assert eliminar_registro(conn, "F-999") == 0
+
+def test_personal_por_clave_normalizada(engine):
+    with engine.begin() as conn:
+        assert insertar_personal(conn, {"nombre_completo": "Ing. Juan Pérez", "puesto": "Jefe", "activo": 1})
+        assert existe_personal(conn, "JUAN PEREZ")
+        assert not insertar_personal(conn, {"nombre_completo": "Juan Perez", "activo": 1})
+        fila = conn.execute(select(personal)).mappings().one()
+        assert fila["clave_nombre"] == "juan perez"
+
+        cambiar_activo_personal(conn, fila["id"], False)
+        assert conn.execute(select(personal.c.activo)).scalar() == 0
+
+        assert eliminar_personal(conn, "Ing. Juan Pérez") == 1
+        assert not existe_personal(conn, "Juan Pérez")
+
+def test_escrituras_registran_el_cambio(engine):
+    with engine.begin() as conn:
+        antes = version_tabla(conn, "registros"), version_tabla(conn, "personal")
+        insertar_registro(conn, _registro("F-001"))
+        insertar_personal(conn, {"nombre_completo": "Ana López", "activo": 1})
+        assert version_tabla(conn, "registros") > antes[0]
+        assert version_tabla(conn, "personal") > antes[1]
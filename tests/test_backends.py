@@ -0,0 +1,135 @@
+import json
+from datetime import datetime
+from sqlalchemy import select, func, update
+
+from base_datos import setup_database, documentos, documento_pasos, cambios_estado, personal
+from benchmarks.corpus import generar_corpus
+from ingesta import cargar_lote
+from acceso_datos import (
+    existe_documento, estado_documento, insertar_registro, insertar_personal, eliminar_registro,
+    existe_registro, eliminar_personal
+)
+import flujo
+from flujo import aplicar_transicion
+from busqueda import buscar_documentos
+from consultas import contar_documentos, cargar_documento
+from referencias import contar_referencias
+from migrar_base import migrar, verificar
+
+# Las mismas operaciones de la interfaz sobre cada backend (url_backend):
+# SQLite siempre y PostgreSQL cuando CONTROLDOC_DB_URL lo configura
+
+def _cargar(engine, archivos):
+    return [r["resultado"] for r in cargar_lote(engine, archivos, trabajadores=1)]
+
+def test_carga_y_recarga_de_procedimientos(engine_backend):
+    corpus = list(generar_corpus(5))
+    assert _cargar(engine_backend, corpus) == ["insertado"] * 5
+    assert _cargar(engine_backend, corpus) == ["sin cambios"] * 5
+
+    nombre, contenido = corpus[0]
+    procedimiento = json.loads(contenido)
+    procedimiento["Objetivo"] = "Objetivo actualizado."
+    resultados = cargar_lote(engine_backend, [(nombre, json.dumps(procedimiento).encode())], trabajadores=1)
+    assert [(r["resultado"], r["detalle"]) for r in resultados] == [("actualizado", "revisión 2")]
+
+    with engine_backend.connect() as conn:
+        assert contar_documentos(conn) == 5
+        documento = cargar_documento(conn, procedimiento["Código"])
+        assert documento["objetivo"] == "Objetivo actualizado."
+        pasos = conn.execute(
+            select(func.count()).select_from(documento_pasos)
+            .where(documento_pasos.c.documento_codigo == procedimiento["Código"])
+        ).scalar()
+        assert pasos == len(procedimiento["Desarrollo del Proceso"]["table"])
+        # El personal de las autorizaciones se da de alta una sola vez
+        elaboro = procedimiento["Autorizaciones"]["table"][0]["Elaboró"]
+        assert conn.execute(
+            select(func.count()).select_from(personal).where(personal.c.nombre_completo == elaboro)
+        ).scalar() == 1
+        assert contar_referencias(conn, elaboro).get("autorizaciones", 0) >= 1
+
+def test_registros_y_personal(engine_backend):
+    with engine_backend.begin() as conn:
+        assert insertar_registro(conn, {"codigo": "F-001", "nombre_registro": "Bitácora", "estado": "Activo"})
+        assert not insertar_registro(conn, {"codigo": "F-001", "nombre_registro": "Otro", "estado": "Activo"})
+        assert insertar_personal(conn, {"nombre_completo": "Dra. Lucía Torres", "activo": 1})
+        assert not insertar_personal(conn, {"nombre_completo": "LUCIA TORRES", "activo": 1})
+
+    with engine_backend.begin() as conn:
+        assert existe_registro(conn, "F-001")
+        assert eliminar_registro(conn, "F-001") == 1
+        assert eliminar_personal(conn, "Dra. Lucía Torres") == 1
+        assert not existe_registro(conn, "F-001")
+
+def test_transiciones_de_estado(engine_backend):
+    _cargar(engine_backend, list(generar_corpus(2)))
+    with engine_backend.connect() as conn:
+        codigo, otro = conn.execute(select(documentos.c.codigo).order_by(documentos.c.codigo)).scalars().all()
+
+    fecha = datetime(2024, 5, 6, 7, 8, 9)
+    with engine_backend.begin() as conn:
+        resultado = aplicar_transicion(conn, [codigo], "En Revisión", "listo", fecha=fecha)
+        assert resultado["aplicados"] == [codigo]
+        resultado = aplicar_transicion(conn, [otro, "PR-NO-EXISTE"], "Aprobado")
+        assert [r["motivo"] for r in resultado["rechazados"]] == ["no se permite Borrador → Aprobado", "no existe"]
+
+    with engine_backend.connect() as conn:
+        assert estado_documento(conn, codigo) == "En Revisión"
+        assert estado_documento(conn, otro) == "Borrador"
+        historial = conn.execute(select(cambios_estado)).mappings().all()
+        assert [(h["documento_codigo"], h["fecha_cambio"]) for h in historial] == [(codigo, fecha)]
+
+# Otra sesión cambia un documento entre la lectura de los estados y el UPDATE:
+# ese documento se rechaza y no se registra un estado anterior falso
+def test_transicion_con_cambio_concurrente(engine_backend, monkeypatch):
+    _cargar(engine_backend, list(generar_corpus(3)))
+    with engine_backend.connect() as conn:
+        codigos = conn.execute(select(documentos.c.codigo).order_by(documentos.c.codigo)).scalars().all()
+
+    leer_estados = flujo._estados_actuales
+
+    def leer_y_cambiar(conn, bloque):
+        actuales = leer_estados(conn, bloque)
+        conn.execute(update(documentos).where(documentos.c.codigo == codigos[1]).values(estado="Obsoleto"))
+        return actuales
+
+    monkeypatch.setattr(flujo, "_estados_actuales", leer_y_cambiar)
+    with engine_backend.begin() as conn:
+        resultado = aplicar_transicion(conn, codigos, "En Revisión")
+    assert resultado["aplicados"] == [codigos[0], codigos[2]]
+    assert resultado["rechazados"] == [
+        {"codigo": codigos[1], "estado": "Obsoleto", "motivo": "el estado cambió durante la transición"}]
+
+    with engine_backend.connect() as conn:
+        assert estado_documento(conn, codigos[1]) == "Obsoleto"
+        historial = conn.execute(
+            select(cambios_estado.c.documento_codigo, cambios_estado.c.estado_anterior)
+            .order_by(cambios_estado.c.documento_codigo)
+        ).all()
+        assert historial == [(codigos[0], "Borrador"), (codigos[2], "Borrador")]
+
+def test_busqueda(engine_backend):
+    corpus = list(generar_corpus(3))
+    _cargar(engine_backend, corpus)
+    objetivo = json.loads(corpus[1][1])["Nombre del Documento"]
+    with engine_backend.connect() as conn:
+        codigos = [fila["codigo"] for fila in buscar_documentos(conn, objetivo)]
+    assert json.loads(corpus[1][1])["Código"] in codigos
+
+def test_copia_desde_sqlite(url_backend, tmp_path):
+    origen = f"sqlite:///{tmp_path / 'origen.db'}"
+    engine_origen, *_ = setup_database(origen)
+    _cargar(engine_origen, list(generar_corpus(4)))
+    engine_origen.dispose()
+
+    conteos = migrar(origen, url_backend, reemplazar=True)
+    assert conteos["documentos"] == 4
+    assert verificar(origen, url_backend) == {}
+
+    # Las secuencias quedan ajustadas: un alta posterior no choca con los ids copiados
+    destino, *_ = setup_database(url_backend)
+    with destino.begin() as conn:
+        assert existe_documento(conn, "PR-AL-000000")
+        assert insertar_personal(conn, {"nombre_completo": "Persona Nueva", "activo": 1})
+    destino.dispose()
@@ -0,0 +1,25 @@
+import cache_tablas
+from cache_tablas import cargar_con_cache, registrar_cambio, estadisticas_cache
+
+def _cargas(engine, claves):
+    llamadas = []
+    for clave in claves:
+        cargar_con_cache(engine, "documentos", clave, lambda conn, clave=clave: llamadas.append(clave) or [clave])
+    return llamadas
+
+def test_aciertos_e_invalidacion(engine):
+    assert _cargas(engine, ["a", "a", "b"]) == ["a", "b"]
+    with engine.begin() as conn:
+        registrar_cambio(conn, "documentos")
+    assert _cargas(engine, ["a", "b"]) == ["a", "b"]
+
+def test_limite_de_entradas(engine, monkeypatch):
+    monkeypatch.setattr(cache_tablas, "MAX_ENTRADAS", 3)
+    assert _cargas(engine, [("busqueda", i) for i in range(10)]) == [("busqueda", i) for i in range(10)]
+    fila = next(f for f in estadisticas_cache() if f["tabla"] == "documentos")
+    assert fila["entradas"] == 3
+
+    # La entrada usada más recientemente se conserva; la más antigua sale primero
+    assert _cargas(engine, [("busqueda", 7), ("busqueda", 10), ("busqueda", 7), ("busqueda", 8)]) == [
+        ("busqueda", 10), ("busqueda", 8),
+    ]
@@ -0,0 +1,96 @@
+import os
+import json
+import pytest
+from sqlalchemy import select, func
+
+from base_datos import documentos, personal
+from esquema import validar_procedimiento
+from ingesta import cargar_lote
+
+def _procedimiento(**cambios):
+    procedimiento = {
+        "Código": "PR-CA-01",
+        "Nombre del Documento": "Procedimiento de prueba",
+        "Fecha de emisión": "01 JUL 2024",
+        "Fecha de revisión": "01 JUL 2026",
+        "Desarrollo del Proceso": {"table": [
+            {"No.": "1", "Responsable": "Jefatura de Calidad", "Actividad": "Revisa el formato F-001."},
+        ]},
+        "Autorizaciones": {"table": [
+            {"Elaboró": "Ana López", "Revisó": "Luis Pérez", "Autorizó": "María Torres"},
+            {"Cargo Elaboró": "Analista", "Cargo Revisó": "Jefatura", "Cargo Autorizó": "Dirección"},
+        ]},
+    }
+    procedimiento.update(cambios)
+    return procedimiento
+
+def test_procedimiento_valido():
+    assert validar_procedimiento(_procedimiento()) == []
+
+def test_seccion_mal_escrita_con_sugerencia():
+    procedimiento = _procedimiento()
+    procedimiento["Desarrollo del proceso"] = procedimiento.pop("Desarrollo del Proceso")
+    errores = validar_procedimiento(procedimiento)
+    assert "Desarrollo del proceso: sección desconocida (¿'Desarrollo del Proceso'?)" in errores
+    assert "Desarrollo del Proceso: campo requerido" in errores
+
+def test_todos_los_errores_en_una_pasada():
+    procedimiento = _procedimiento(**{
+        "Código": "",
+        "Objetivo": ["no es texto"],
+        "Desarrollo del Proceso": {"table": [
+            {"No.": "1", "Actividad": "Sin responsable"},
+            {"No.": "2", "Responsable": "Jefatura"},
+        ]},
+    })
+    assert sorted(validar_procedimiento(procedimiento)) == [
+        "Código: no puede estar vacío",
+        "Desarrollo del Proceso.table[0].Responsable: campo requerido",
+        "Desarrollo del Proceso.table[1]: se requiere 'Actividad' o 'Descripción'",
+        "Objetivo: se esperaba un texto",
+    ]
+
+@pytest.mark.parametrize("tabla", [
+    [{"Elaboró": "Ana López", "Revisó": "Luis Pérez", "Autorizó": "María Torres"},
+     {"Cargo Elaboró": "Analista", "Cargo Revisó": "Jefatura", "Cargo Autorizó": "Dirección"}],
+    [{"Rol": "Elaboró", "Nombre": "Ana López", "Puesto": "Analista"},
+     {"Rol": "Autorizó", "Nombre": "María Torres", "Puesto": "Dirección"}],
+])
+def test_formatos_de_autorizaciones(tabla):
+    assert validar_procedimiento(_procedimiento(Autorizaciones={"table": tabla})) == []
+
+def test_autorizaciones_incompletas():
+    tabla = [{"Elaboró": "Ana López", "Revisó": "Luis Pérez", "Autorizó": "María Torres"}]
+    assert validar_procedimiento(_procedimiento(Autorizaciones={"table": tabla})) == [
+        "Autorizaciones.table: se esperaban 2 entradas (nombres y cargos), hay 1",
+    ]
+
+def test_fecha_no_reconocida_es_aviso(engine):
+    procedimiento = _procedimiento(**{"Fecha de revisión": "julio 2026"})
+    avisos = []
+    assert validar_procedimiento(procedimiento, avisos) == []
+    assert avisos == ["Fecha de revisión: fecha no reconocida: 'julio 2026'"]
+
+    contenido = json.dumps(procedimiento, ensure_ascii=False).encode()
+    resultado, = cargar_lote(engine, [("pr.json", contenido)], trabajadores=1)
+    assert resultado["resultado"] == "insertado"
+    assert resultado["avisos"] == avisos
+    with engine.connect() as conn:
+        assert conn.execute(select(documentos.c.revision_programada)).scalar() is None
+
+def test_cuarentena(engine, tmp_path):
+    procedimiento = _procedimiento()
+    procedimiento["Desarrollo del proceso"] = procedimiento.pop("Desarrollo del Proceso")
+    contenido = json.dumps(procedimiento, ensure_ascii=False).encode()
+    archivos = [("lote/malo.json", contenido), ("invalido.json", b"{no es json")]
+
+    resultados = cargar_lote(engine, archivos, trabajadores=1, cuarentena=str(tmp_path))
+    assert [r["resultado"] for r in resultados] == ["rechazado", "rechazado"]
+    assert sorted(os.listdir(tmp_path)) == [
+        "invalido.json", "invalido.json.errores.txt", "lote__malo.json", "lote__malo.json.errores.txt",
+    ]
+    assert (tmp_path / "lote__malo.json").read_bytes() == contenido
+    assert "sección desconocida" in (tmp_path / "lote__malo.json.errores.txt").read_text(encoding="utf-8")
+    with engine.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(documentos)).scalar() == 0
+        assert conn.execute(select(func.count()).select_from(personal)).scalar() == 0
@@ -0,0 +1,36 @@
+import io
+from datetime import datetime
+import pandas as pd
+import pytest
+from sqlalchemy import insert
+
+from base_datos import cambios_estado
+from exportacion import exportar_tabla
+
+pytest.importorskip("pyarrow")
+
+def test_parquet_cambios_estado_conserva_fechas(engine):
+    fechas = [datetime(2024, 3, 1, 9, 30, 15), None, datetime(2025, 1, 31, 23, 59, 59, 123456)]
+    with engine.begin() as conn:
+        conn.execute(insert(cambios_estado), [
+            {"documento_codigo": f"PR-{i}", "estado_anterior": "Borrador",
+             "nuevo_estado": "En Revisión", "comentarios": "", "fecha_cambio": fecha}
+            for i, fecha in enumerate(fechas)
+        ])
+
+    destino = io.BytesIO()
+    # Bloques de una fila: el esquema no puede depender del primer bloque
+    assert exportar_tabla(engine, "cambios_estado", "parquet", destino, tamano_bloque=1) == 3
+
+    destino.seek(0)
+    leido = pd.read_parquet(destino)
+    assert list(leido["documento_codigo"]) == ["PR-0", "PR-1", "PR-2"]
+    assert leido["fecha_cambio"].iloc[0] == pd.Timestamp(fechas[0])
+    assert pd.isna(leido["fecha_cambio"].iloc[1])
+    assert leido["fecha_cambio"].iloc[2] == pd.Timestamp(fechas[2])
+
+def test_parquet_tabla_vacia(engine):
+    destino = io.BytesIO()
+    assert exportar_tabla(engine, "cambios_estado", "parquet", destino) == 0
+    destino.seek(0)
+    assert list(pd.read_parquet(destino).columns) == [c.name for c in cambios_estado.columns]
@@ -0,0 +1,51 @@
+import json
+import pytest
+from sqlalchemy import insert, select
+
+from base_datos import documentos, personal
+from identidad import clave_nombre, resolver_personal, conciliar_personal, fusionar_personal
+from referencias import contar_referencias, indexar_documentos_personal
+
+@pytest.mark.parametrize("nombre, clave", [
+    ("Ing. Juan Pérez", "juan perez"),
+    ("JUAN PEREZ", "juan perez"),
+    ("Pérez, Juan", "juan perez"),
+    ("LAE. Ismael Omar Rodríguez Vázquez", "ismael omar rodriguez vazquez"),
+    ("MAF. Ana Peña", "ana peña"),
+    ("Hna. Socorro Alaniz Ortiz", "alaniz ortiz socorro"),
+    ("Q.F.B. Martha Juárez", "juarez martha"),
+    ("", ""),
+    (None, ""),
+])
+def test_clave_nombre(nombre, clave):
+    assert clave_nombre(nombre) == clave
+
+def test_resolver_y_conciliar(engine):
+    with engine.begin() as conn:
+        ids = resolver_personal(conn, [{"nombre_completo": "LAE. Ismael Rodríguez", "activo": 1},
+                                       {"nombre_completo": "Ismael Rodriguez", "activo": 1}])
+        assert list(ids) == ["ismael rodriguez"]
+        conn.execute(insert(personal), [{"nombre_completo": "ISMAEL RODRIGUEZ", "correo": "ir@hospital.mx",
+                                         "activo": 1, "clave_nombre": "ismael rodriguez"}])
+        informe = conciliar_personal(conn)
+        assert informe == [{"conservado": "ISMAEL RODRIGUEZ", "eliminado": "LAE. Ismael Rodríguez"}]
+        assert conn.execute(select(personal.c.nombre_completo)).scalars().all() == ["ISMAEL RODRIGUEZ"]
+
+def test_fusionar_reasigna_las_referencias(engine):
+    with engine.begin() as conn:
+        conn.execute(insert(personal), [
+            {"nombre_completo": "Martha Beatriz Juárez", "activo": 1, "clave_nombre": clave_nombre("Martha Beatriz Juárez")},
+            {"nombre_completo": "Marta Beatriz Juárez", "activo": 1, "clave_nombre": clave_nombre("Marta Beatriz Juárez")},
+        ])
+        fila = {"codigo": "PR-01", "responsable_actualizacion": "Marta Beatriz Juárez", "pasos": "[]",
+                "autorizaciones": json.dumps([{"Rol": "Elaboró", "Nombre": "Marta Beatriz Juárez"}])}
+        conn.execute(insert(documentos), [fila])
+        indexar_documentos_personal(conn, [fila])
+        ids = dict(conn.execute(select(personal.c.nombre_completo, personal.c.id)).all())
+
+        assert fusionar_personal(conn, ids["Martha Beatriz Juárez"], [ids["Marta Beatriz Juárez"]]) == 1
+        assert contar_referencias(conn, "Marta Beatriz Juárez") == {}
+        assert contar_referencias(conn, "Martha Beatriz Juárez") == {
+            "responsable_actualizacion": 1, "autorizaciones": 1,
+        }
+        assert conn.execute(select(documentos.c.responsable_actualizacion)).scalar() == "Martha Beatriz Juárez"
@@ -0,0 +1,21 @@
+import os
+import sys
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# La carga sin interfaz no debe importar pandas (arranque en menos de un segundo)
+def test_ingesta_no_importa_pandas():
+    salida = subprocess.run(
+        [sys.executable, "-c", "import sys, ingesta; print('pandas' in sys.modules)"],
+        cwd=RAIZ, capture_output=True, text=True, check=True
+    ).stdout
+    assert salida.strip() == "False"
+
+def test_bom_aceptado_en_archivos_pequenos(engine):
+    from benchmarks.corpus import generar_corpus
+    from ingesta import cargar_lote
+
+    nombre, contenido = next(generar_corpus(1))
+    resultados = cargar_lote(engine, [(nombre, b"\xef\xbb\xbf" + contenido)], trabajadores=1)
+    assert [r["resultado"] for r in resultados] == ["insertado"]
@@ -0,0 +1,128 @@
+import io
+import json
+import random
+import pytest
+from sqlalchemy import select, text
+
+from base_datos import setup_database, documentos
+from benchmarks.corpus import generar_procedimiento
+from busqueda import TABLA_FTS
+from ingesta import cargar_lote, cargar_archivo_grande
+from lector_json import LectorJSON, recorrer_procedimiento, resumir_json
+from secciones import TABLAS_SECCIONES
+
+# Números y textos que quedan cortados entre bloques con casi cualquier tamaño
+# de lectura: exponentes, signos, escapes y caracteres de varios bytes en UTF-8
+VALORES = {
+    "enteros": [0, -7, 123456789012345678901234567890],
+    "decimales": [1.5, -0.25, 1e-7, 6.02e23, -1.5E+10],
+    "textos": ["ñandú", "€ 10", "😀 emoji", 'comillas "escapadas" \\ y \n salto', "á́"],
+    "literales": [True, False, None],
+    "anidado": {"lista": [[], {}, [1, [2, [3]]]], "vacío": ""},
+}
+
+# Recorrido completo con el lector: objetos clave por clave y listas elemento a
+# elemento, de modo que cada número o texto se decodifica por separado y puede
+# quedar cortado al final del buffer
+def _recorrer(lector):
+    siguiente = lector.siguiente()
+    if siguiente == "{":
+        return {clave: _recorrer(lector) for clave in lector.claves()}
+    if siguiente == "[":
+        return list(lector.elementos())
+    return lector.valor()
+
+def _leer_todo(datos, tamano):
+    lector = LectorJSON(io.BytesIO(datos), tamano_lectura=tamano)
+    documento = _recorrer(lector)
+    lector.terminar()
+    return documento
+
+@pytest.mark.parametrize("tamano", [1, 2, 7])
+def test_valores_cortados_entre_bloques(tamano):
+    for sangria in (None, 1):
+        datos = json.dumps(VALORES, ensure_ascii=False, indent=sangria).encode("utf-8")
+        assert _leer_todo(datos, tamano) == VALORES
+
+def test_recorrer_procedimiento():
+    elementos = []
+    documento = recorrer_procedimiento(
+        io.BytesIO(json.dumps(VALORES).encode()), {("decimales",), ("textos",)},
+        lambda ruta, indice, elemento: elementos.append((ruta, indice, elemento)),
+    )
+    assert [e for ruta, _, e in elementos if ruta == ("decimales",)] == VALORES["decimales"]
+    assert [(i, e) for ruta, i, e in elementos if ruta == ("textos",)] == list(enumerate(VALORES["textos"]))
+    # De las listas recorridas en flujo solo se conserva el primer elemento
+    assert documento == {**VALORES, "decimales": VALORES["decimales"][:1], "textos": VALORES["textos"][:1]}
+
+@pytest.mark.parametrize("tamano", [1, 2, 7, 1 << 16])
+def test_bom_utf8(tamano):
+    datos = b"\xef\xbb\xbf" + json.dumps({"Código": "PR-01", "textos": ["año"]}, ensure_ascii=False).encode()
+    assert _leer_todo(datos, tamano) == {"Código": "PR-01", "textos": ["año"]}
+
+@pytest.mark.parametrize("datos", [
+    b'{"a": [1, 2',
+    b'{"a": "sin cerrar',
+    b'{"a" 1}',
+    b'{"a": 1,}',
+    b'{"a": [1 2]}',
+    b'{"a": 1} {"b": 2}',
+    b'{"a": tru}',
+    b"",
+    b"\xff\xfe{}",
+])
+@pytest.mark.parametrize("tamano", [1, 7])
+def test_entrada_invalida(datos, tamano):
+    with pytest.raises(ValueError):
+        _leer_todo(datos, tamano)
+
+def test_resumen_recortado():
+    documento = {
+        "Código": "PR-01",
+        "Objetivo": "x" * 200,
+        "Desarrollo del Proceso": {"table": [{"No.": str(i), "Actividad": "y" * 50} for i in range(10)]},
+        "vacía": [],
+    }
+    resumen = resumir_json(io.BytesIO(json.dumps(documento).encode()), max_texto=20, max_elementos=2)
+    assert resumen == {
+        "Código": "PR-01",
+        "Objetivo": "x" * 20 + "…",
+        "Desarrollo del Proceso": {"table": [
+            {"No.": "0", "Actividad": "y" * 20 + "…"},
+            {"No.": "1", "Actividad": "y" * 20 + "…"},
+            "… 8 elemento(s) más",
+        ]},
+        "vacía": [],
+    }
+
+def _estado(engine, codigo):
+    with engine.connect() as conn:
+        fila = dict(conn.execute(select(documentos).where(documentos.c.codigo == codigo)).mappings().one())
+        fila.pop("id")
+        secciones = {
+            tabla.name: [
+                {k: v for k, v in f.items() if k != "id"}
+                for f in conn.execute(select(tabla).order_by(*tabla.primary_key.columns)).mappings()
+            ]
+            for tabla in TABLAS_SECCIONES
+        }
+        fts = conn.execute(text(f"SELECT * FROM {TABLA_FTS} WHERE codigo = :c"), {"c": codigo}).all()
+    return fila, secciones, fts
+
+def test_carga_en_flujo_igual_a_carga_normal():
+    procedimiento = generar_procedimiento(3, random.Random(5), pasos=(300, 300))
+    procedimiento["Gestión de Riesgos"]["Ponderación de riesgos"] *= 50
+    datos = json.dumps(procedimiento, ensure_ascii=False, indent=2).encode("utf-8")
+
+    normal, *_ = setup_database("sqlite://")
+    en_flujo, *_ = setup_database("sqlite://")
+    assert cargar_lote(normal, [("pr.json", datos)], trabajadores=1)[0]["resultado"] == "insertado"
+    assert cargar_archivo_grande(en_flujo, "pr.json", io.BytesIO(datos))["resultado"] == "insertado"
+
+    fila_normal, secciones_normal, fts_normal = _estado(normal, procedimiento["Código"])
+    fila_flujo, secciones_flujo, fts_flujo = _estado(en_flujo, procedimiento["Código"])
+    assert fila_flujo == fila_normal
+    assert fila_flujo["huella_contenido"] == fila_normal["huella_contenido"]
+    assert secciones_flujo == secciones_normal
+    assert len(secciones_flujo["documento_pasos"]) == 300
+    assert fts_flujo == fts_normal and len(fts_flujo) == 1
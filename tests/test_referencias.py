@@ -0,0 +1,55 @@
+import json
+from sqlalchemy import insert, select
+
+from base_datos import documentos
+from referencias import contar_referencias, indexar_documentos_personal, reasignar_responsabilidades
+
+def _documento(codigo, **columnas):
+    fila = {
+        "codigo": codigo, "nombre_documento": f"Procedimiento {codigo}", "responsable_actualizacion": "",
+        "responsable_supervision": "", "responsable_ejecucion": "", "pasos": "[]", "autorizaciones": "[]",
+    }
+    fila.update(columnas)
+    return fila
+
+def _cargar(engine, filas):
+    with engine.begin() as conn:
+        conn.execute(insert(documentos), filas)
+        indexar_documentos_personal(conn, filas)
+
+def test_listas_separadas_por_comas(engine):
+    pasos = [{"No.": "1", "Responsable": "Encargado de Almacén, Analista de Almacén", "Descripción": "Recibir"},
+             {"No.": "2", "Responsable": "Dirección Administrativa", "Descripción": "Autorizar"}]
+    _cargar(engine, [
+        _documento("PR-01", responsable_actualizacion="Jefatura de Farmacia, Encargado de Almacén",
+                   responsable_ejecucion="Encargado de Almacén, Analista de Almacén, Dirección Administrativa",
+                   pasos=json.dumps(pasos, ensure_ascii=False)),
+        _documento("PR-02", responsable_actualizacion="ENCARGADO DE ALMACEN"),
+        _documento("PR-03", responsable_actualizacion="Jefatura de Farmacia"),
+    ])
+
+    with engine.begin() as conn:
+        assert contar_referencias(conn, "Encargado de Almacén") == {
+            "responsable_actualizacion": 2, "responsable_ejecucion": 1,
+        }
+        reasignar_responsabilidades(conn, "Encargado de Almacén", "Jefe de Almacén")
+        assert contar_referencias(conn, "Encargado de Almacén") == {}
+        assert contar_referencias(conn, "Jefe de Almacén") == {
+            "responsable_actualizacion": 2, "responsable_ejecucion": 1,
+        }
+        filas = {f["codigo"]: f for f in conn.execute(select(documentos)).mappings()}
+
+    assert filas["PR-01"]["responsable_actualizacion"] == "Jefatura de Farmacia, Jefe de Almacén"
+    assert [p["Responsable"] for p in json.loads(filas["PR-01"]["pasos"])] == [
+        "Jefe de Almacén, Analista de Almacén", "Dirección Administrativa",
+    ]
+    assert filas["PR-02"]["responsable_actualizacion"] == "Jefe de Almacén"
+    assert filas["PR-03"]["responsable_actualizacion"] == "Jefatura de Farmacia"
+
+def test_autorizaciones(engine):
+    autorizaciones = [{"Rol": "Elaboró", "Nombre": "Lic. María Pérez"}]
+    _cargar(engine, [_documento("PR-10", autorizaciones=json.dumps(autorizaciones, ensure_ascii=False))])
+    with engine.begin() as conn:
+        assert contar_referencias(conn, "Maria Perez") == {"autorizaciones": 1}
+        assert reasignar_responsabilidades(conn, "Maria Perez", "Ana López") == {"autorizaciones": 1}
+        assert contar_referencias(conn, "Ana López") == {"autorizaciones": 1}
@@ -0,0 +1,30 @@
+import json
+
+from ingesta import cargar_lote
+from secciones import roles_de_documento, formatos_de_documento, documentos_con_formato, documentos_por_rol
+
+def _procedimiento(codigo, pasos):
+    return (f"{codigo}.json", json.dumps({
+        "Código": codigo,
+        "Desarrollo del Proceso": {"table": [
+            {"No.": str(n), "Responsable": responsable, "Actividad": actividad}
+            for n, (responsable, actividad) in enumerate(pasos, 1)
+        ]},
+    }).encode())
+
+def test_roles_y_formatos_desde_las_tablas_de_secciones(engine):
+    resultados = cargar_lote(engine, [
+        _procedimiento("PR-001", [("Jefatura", "Llenar F-012"), ("Enfermería", "Archivar F-003 y F-012"),
+                                  ("Jefatura", "Firmar")]),
+        _procedimiento("PR-002", [("Subjefatura", "Revisar F-003")]),
+    ], trabajadores=1)
+    assert [r["resultado"] for r in resultados] == ["insertado", "insertado"]
+
+    with engine.connect() as conn:
+        assert roles_de_documento(conn, "PR-001") == ["Jefatura", "Enfermería"]
+        assert formatos_de_documento(conn, "PR-001") == ["F-003", "F-012"]
+        assert documentos_con_formato(conn, "F-003") == ["PR-001", "PR-002"]
+        assert documentos_con_formato(conn, "F-012") == ["PR-001"]
+        # El rol se compara completo: "Jefatura" no coincide con "Subjefatura"
+        assert documentos_por_rol(conn, "Jefatura") == ["PR-001"]
+        assert documentos_por_rol(conn, "Subjefatura") == ["PR-002"]
@@ -0,0 +1,155 @@
+import json
+import difflib
+import hashlib
+from datetime import datetime
+from sqlalchemy import select, insert, func
+
+from base_datos import contenidos, documento_revisiones
+from cache_tablas import registrar_cambio
+
+# Campos del documento que forman parte de cada revisión (el contenido del
+# procedimiento; el estado y los comentarios pertenecen al ciclo documental)
+CAMPOS_VERSIONADOS = [
+    "nombre_documento", "version", "fecha_emision", "fecha_revision", "objetivo",
+    "alcance", "responsable_actualizacion", "responsable_ejecucion",
+    "responsable_supervision", "pasos", "historial_cambios", "riesgos",
+    "barreras_seguridad", "documentos_referencia", "autorizaciones"
+]
+
+# Campos guardados como JSON; se muestran indentados para que el diff sea por línea
+CAMPOS_JSON = {"pasos", "historial_cambios", "riesgos", "barreras_seguridad",
+               "documentos_referencia", "autorizaciones"}
+
+TAMANO_BLOQUE = 500
+
+# Función para calcular la huella de un texto
+def huella(texto):
+    return hashlib.sha256((texto or "").encode("utf-8")).hexdigest()
+
+# Función para obtener las huellas de los campos de un documento y la huella
+# del documento completo (calculada a partir de las huellas de sus campos)
+def huellas_documento(registro):
+    campos = {campo: huella(registro.get(campo) or "") for campo in CAMPOS_VERSIONADOS}
+    return campos, huella(json.dumps(campos, sort_keys=True))
+
+# Función para obtener la última revisión de cada código: {codigo: (revision, huella_documento)}
+def ultimas_revisiones(conn, codigos):
+    codigos = list(codigos)
+    ultimas = {}
+    for inicio in range(0, len(codigos), TAMANO_BLOQUE):
+        bloque = codigos[inicio:inicio + TAMANO_BLOQUE]
+        maximas = (
+            select(documento_revisiones.c.documento_codigo, func.max(documento_revisiones.c.revision).label("revision"))
+            .where(documento_revisiones.c.documento_codigo.in_(bloque))
+            .group_by(documento_revisiones.c.documento_codigo)
+            .subquery()
+        )
+        for codigo, revision, huella_doc in conn.execute(
+            select(documento_revisiones.c.documento_codigo, documento_revisiones.c.revision,
+                   documento_revisiones.c.huella_documento)
+            .join(maximas, (documento_revisiones.c.documento_codigo == maximas.c.documento_codigo)
+                  & (documento_revisiones.c.revision == maximas.c.revision))
+        ):
+            ultimas[codigo] = (revision, huella_doc)
+    return ultimas
+
+# Función para guardar una revisión por cada documento cuyo contenido cambió
+# respecto a su última revisión. Recibe filas de documentos (con "codigo") y
+# devuelve {codigo: número de revisión creada o None si no hubo cambios}.
+# Los contenidos ya almacenados no se vuelven a guardar
+def registrar_revisiones(conn, registros, fecha=None):
+    fecha = fecha or datetime.now()
+    registros = {registro["codigo"]: registro for registro in registros}
+    ultimas = ultimas_revisiones(conn, registros)
+
+    resultado, revisiones, textos = {}, [], {}
+    for codigo, registro in registros.items():
+        campos, huella_doc = huellas_documento(registro)
+        revision_previa, huella_previa = ultimas.get(codigo, (0, None))
+        if huella_doc == huella_previa:
+            resultado[codigo] = None
+            continue
+        for campo, valor in campos.items():
+            textos[valor] = registro.get(campo) or ""
+        revisiones.append({
+            "documento_codigo": codigo,
+            "revision": revision_previa + 1,
+            "version": registro.get("version", ""),
+            "fecha": fecha,
+            "huella_documento": huella_doc,
+            "campos": json.dumps(campos, sort_keys=True),
+        })
+        resultado[codigo] = revision_previa + 1
+
+    if revisiones:
+        huellas = list(textos)
+        existentes = set()
+        for inicio in range(0, len(huellas), TAMANO_BLOQUE):
+            existentes.update(conn.execute(
+                select(contenidos.c.huella).where(contenidos.c.huella.in_(huellas[inicio:inicio + TAMANO_BLOQUE]))
+            ).scalars())
+        nuevos = [{"huella": h, "contenido": t} for h, t in textos.items() if h not in existentes]
+        if nuevos:
+            conn.execute(insert(contenidos), nuevos)
+        conn.execute(insert(documento_revisiones), revisiones)
+        registrar_cambio(conn, "documento_revisiones")
+    return resultado
+
+# Función para listar las revisiones de un documento, de la más reciente a la
+# más antigua. pandas se importa aquí: la ingesta usa este módulo sin DataFrames
+def listar_revisiones(conn, codigo):
+    import pandas as pd
+
+    return pd.read_sql(
+        select(documento_revisiones.c.revision, documento_revisiones.c.version, documento_revisiones.c.fecha)
+        .where(documento_revisiones.c.documento_codigo == codigo)
+        .order_by(documento_revisiones.c.revision.desc()),
+        conn
+    )
+
+def _huellas_revision(conn, codigo, revision):
+    campos = conn.execute(
+        select(documento_revisiones.c.campos)
+        .where(documento_revisiones.c.documento_codigo == codigo, documento_revisiones.c.revision == revision)
+    ).scalar()
+    if campos is None:
+        raise ValueError(f"no existe la revisión {revision} de {codigo}")
+    return json.loads(campos)
+
+def _textos(conn, huellas):
+    return dict(conn.execute(
+        select(contenidos.c.huella, contenidos.c.contenido).where(contenidos.c.huella.in_(list(huellas)))
+    ).all())
+
+# Función para reconstruir una revisión completa: {campo: texto}
+def cargar_revision(conn, codigo, revision):
+    campos = _huellas_revision(conn, codigo, revision)
+    textos = _textos(conn, set(campos.values()))
+    return {campo: textos.get(h, "") for campo, h in campos.items()}
+
+def _lineas(campo, texto):
+    if campo in CAMPOS_JSON and texto:
+        try:
+            texto = json.dumps(json.loads(texto), ensure_ascii=False, indent=2)
+        except ValueError:
+            pass
+    return (texto or "").splitlines()
+
+# Función para comparar dos revisiones. Se comparan primero las huellas y solo
+# se leen los contenidos de los campos que cambiaron; devuelve
+# {campo: diff unificado} únicamente para esos campos
+def comparar_revisiones(conn, codigo, revision_a, revision_b):
+    huellas_a = _huellas_revision(conn, codigo, revision_a)
+    huellas_b = _huellas_revision(conn, codigo, revision_b)
+    cambiados = [c for c in CAMPOS_VERSIONADOS if huellas_a.get(c) != huellas_b.get(c)]
+    if not cambiados:
+        return {}
+    textos = _textos(conn, {huellas_a.get(c) for c in cambiados} | {huellas_b.get(c) for c in cambiados})
+    diferencias = {}
+    for campo in cambiados:
+        diferencias[campo] = "\n".join(difflib.unified_diff(
+            _lineas(campo, textos.get(huellas_a.get(campo), "")),
+            _lineas(campo, textos.get(huellas_b.get(campo), "")),
+            fromfile=f"revisión {revision_a}", tofile=f"revisión {revision_b}", lineterm=""
+        ))
+    return diferencias